@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import gc
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from importlib import metadata
+from typing import Any, Callable
+
+
+@dataclass(frozen=True)
+class Measurement:
+    name: str
+    rows: int
+    warmup: int
+    repeat: int
+    times_s: list[float]
+    peak_bytes: int
+
+    @property
+    def median_s(self) -> float:
+        return statistics.median(self.times_s)
+
+    def to_dict(self) -> dict[str, Any]:
+        data = asdict(self)
+        data.update(
+            min_s=min(self.times_s),
+            median_s=self.median_s,
+            mean_s=statistics.fmean(self.times_s),
+            stdev_s=statistics.stdev(self.times_s) if len(self.times_s) > 1 else 0.0,
+            rows_per_s=self.rows / self.median_s if self.median_s else None,
+        )
+        return data
+
+
+def measure(
+    name: str,
+    rows: int,
+    fn: Callable[[], Any],
+    warmup: int = 1,
+    repeat: int = 5,
+) -> Measurement:
+    """
+    Time `fn` `repeat` times after `warmup` untimed calls, then run it once
+    more under tracemalloc for the peak Python/NumPy allocation. Timed runs
+    are not traced, so tracing overhead never shows up in the timings.
+    """
+    for _ in range(warmup):
+        fn()
+
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return Measurement(name, rows, warmup, repeat, times, peak)
+
+
+def _git(*args: str) -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", *args], capture_output=True, text=True, check=True, timeout=10
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip()
+
+
+def _version(package: str) -> str | None:
+    try:
+        return metadata.version(package)
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def environment() -> dict[str, Any]:
+    """
+    Everything needed to tell whether two result files are comparable.
+    """
+    return {
+        "commit": _git("rev-parse", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "packages": {
+            name: _version(name) for name in ("numpy", "pandas", "scikit-learn", "fastapi")
+        },
+    }
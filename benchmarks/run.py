@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import argparse
+import json
+import tempfile
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+from rich.console import Console
+from rich.table import Table
+from sklearn.model_selection import train_test_split
+from sklearn.tree import DecisionTreeClassifier
+
+from benchmarks.harness import Measurement, environment, measure
+from benchmarks.synthetic import FEATURES, titanic_arrays, titanic_csv, titanic_frame
+
+CASES = ("transform", "train", "inference")
+SINGLE_ROW_CALLS = 1000
+SERVE_CALLS = 300
+SERVE_BATCH_ROWS = 1024
+
+
+def parse_size(text: str) -> int:
+    """
+    "10k" -> 10_000, "1M" -> 1_000_000, "2500" -> 2500.
+    """
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1].lower(), 1)
+    return int(float(text[:-1] if scale > 1 else text) * scale)
+
+
+# A bench builds its inputs when called, so sizes are generated one at a time.
+Bench = Callable[[], list[Measurement]]
+
+
+# ---------------------------------------------------------------------
+# Cases
+# ---------------------------------------------------------------------
+
+
+def transform_benches(args: argparse.Namespace, tmp: Path) -> Iterator[Bench]:
+    from ds_git_homework.processing.transform import add_processed_flag
+
+    for rows in args.sizes:
+        def bench(rows: int = rows) -> list[Measurement]:
+            src = titanic_csv(rows, args.data_dir)
+            return [measure(
+                "transform/add_processed_flag", rows,
+                partial(add_processed_flag, src, tmp / "processed.csv"),
+                args.warmup, args.repeat,
+            )]
+
+        yield bench
+
+
+def train_benches(args: argparse.Namespace, tmp: Path) -> Iterator[Bench]:
+    from ds_git_homework.experiments.train import (
+        _iterate_param_grid,
+        _load_yaml_config,
+        _run_trials,
+    )
+
+    combos = _iterate_param_grid(_load_yaml_config(args.grid)["param_grid"])
+
+    for rows in args.sizes:
+        if rows > args.train_max_rows:
+            continue
+
+        def bench(rows: int = rows) -> list[Measurement]:
+            X, y = titanic_arrays(rows)
+            X_train, X_test, y_train, y_test = train_test_split(
+                X, y, test_size=0.2, random_state=42, stratify=y
+            )
+            data = {"X_train": X_train, "X_test": X_test, "y_train": y_train, "y_test": y_test}
+            return [measure(
+                f"train/grid_{len(combos)}_workers_{args.workers}", rows,
+                lambda: list(_run_trials(combos, 42, data, args.workers)),
+                args.warmup, args.repeat,
+            )]
+
+        yield bench
+
+
+def _fit_serving_model() -> DecisionTreeClassifier:
+    X, y = titanic_arrays(100_000, seed=1)
+    return DecisionTreeClassifier(max_depth=7, random_state=42).fit(X, y)
+
+
+def inference_benches(args: argparse.Namespace, tmp: Path) -> Iterator[Bench]:
+    from fastapi.testclient import TestClient
+
+    from ds_git_homework.serving import app as serving_app
+    from ds_git_homework.serving.compiled_tree import compile_tree
+
+    model = _fit_serving_model()
+    compiled = compile_tree(model)
+    models: dict[str, Any] = {"sklearn": model, "compiled": compiled}
+
+    X_single, _ = titanic_arrays(SINGLE_ROW_CALLS, seed=2)
+
+    def single(m: Any) -> None:
+        for i in range(SINGLE_ROW_CALLS):
+            m.predict(X_single[i:i + 1])
+
+    yield lambda: [
+        measure(f"inference/single_row/{kind}", SINGLE_ROW_CALLS, partial(single, m),
+                args.warmup, args.repeat)
+        for kind, m in models.items()
+    ]
+
+    for rows in args.sizes:
+        def batch(rows: int = rows) -> list[Measurement]:
+            X, _ = titanic_arrays(rows, seed=2)
+            return [
+                measure(f"inference/batch/{kind}", rows, partial(m.predict, X),
+                        args.warmup, args.repeat)
+                for kind, m in models.items()
+            ]
+
+        yield batch
+
+    # End to end through the FastAPI app: parsing, encoding, cache, response.
+    payloads = titanic_frame(max(SERVE_CALLS, SERVE_BATCH_ROWS), seed=3)[FEATURES]
+    payloads = payloads.fillna({"Age": 30.0})
+    records = payloads.to_dict(orient="records")
+    serving_app.SERVED = serving_app.ServedModel("bench", compiled, 0.0)
+    client = TestClient(serving_app.app)
+
+    def serve_single() -> None:
+        if serving_app.CACHE is not None:
+            serving_app.CACHE.clear()
+        for row in records[:SERVE_CALLS]:
+            client.post("/predict", json=row).raise_for_status()
+
+    def serve_batch() -> None:
+        if serving_app.CACHE is not None:
+            serving_app.CACHE.clear()
+        client.post(
+            "/predict_batch", json={"rows": records[:SERVE_BATCH_ROWS]}
+        ).raise_for_status()
+
+    yield lambda: [
+        measure("serve/predict", SERVE_CALLS, serve_single, args.warmup, args.repeat),
+        measure("serve/predict_batch", SERVE_BATCH_ROWS, serve_batch, args.warmup, args.repeat),
+    ]
+
+
+CASE_BENCHES = {
+    "transform": transform_benches,
+    "train": train_benches,
+    "inference": inference_benches,
+}
+
+
+# ---------------------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------------------
+
+
+def _mib(n: int) -> str:
+    return f"{n / 2**20:.1f}"
+
+
+def print_results(results: list[dict[str, Any]], baseline: dict[str, Any] | None) -> None:
+    old = {(r["name"], r["rows"]): r for r in (baseline or {}).get("results", [])}
+
+    table = Table(title="Benchmarks (median of repetitions)")
+    for col in ("case", "rows", "median s", "stdev s", "rows/s", "peak MiB"):
+        if col == "case":
+            table.add_column(col, overflow="fold")
+        else:
+            table.add_column(col, justify="right")
+    if baseline is not None:
+        table.add_column("vs baseline", justify="right")
+
+    for r in results:
+        cells = [
+            r["name"],
+            f"{r['rows']:,}",
+            f"{r['median_s']:.4f}",
+            f"{r['stdev_s']:.4f}",
+            f"{r['rows_per_s']:,.0f}" if r["rows_per_s"] else "-",
+            _mib(r["peak_bytes"]),
+        ]
+        if baseline is not None:
+            prev = old.get((r["name"], r["rows"]))
+            cells.append(f"{r['median_s'] / prev['median_s']:.2f}x" if prev else "-")
+        table.add_row(*cells)
+
+    Console().print(table)
+
+
+def _comparable(env: dict[str, Any], other: dict[str, Any]) -> list[str]:
+    keys = ("python", "platform", "cpu_count")
+    return [f"{k}: {other.get(k)} -> {env.get(k)}" for k in keys if env.get(k) != other.get(k)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Offline benchmarks of the transform, training and inference hot paths"
+    )
+    parser.add_argument(
+        "--sizes",
+        nargs="+",
+        type=parse_size,
+        default=[10_000, 100_000, 1_000_000],
+        help="Dataset sizes, e.g. 10k 100k 1M 10M",
+    )
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=list(CASES))
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed runs per case")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per case")
+    parser.add_argument("--workers", type=int, default=1, help="Grid search processes")
+    parser.add_argument("--grid", type=Path, default=Path("configs/grid.yaml"))
+    parser.add_argument(
+        "--train-max-rows",
+        type=parse_size,
+        default=1_000_000,
+        help="Skip training benchmarks above this size",
+    )
+    parser.add_argument(
+        "--data-dir",
+        type=Path,
+        default=Path("data/bench"),
+        help="Where generated CSVs are kept between runs",
+    )
+    parser.add_argument(
+        "--output",
+        help="JSON results path (default: results/benchmarks/<commit>.json)",
+    )
+    parser.add_argument("--baseline", help="Earlier JSON results to compare against")
+    args = parser.parse_args()
+
+    env = environment()
+    baseline = None
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        for line in _comparable(env, baseline["environment"]):
+            print(f"Warning: baseline environment differs, {line}")
+
+    results: list[dict[str, Any]] = []
+    with tempfile.TemporaryDirectory(prefix="ds_git_homework_bench_") as tmp:
+        for case in args.cases:
+            for bench in CASE_BENCHES[case](args, Path(tmp)):
+                for m in bench():
+                    print(f"{m.name} rows={m.rows}: median {m.median_s:.4f}s")
+                    results.append(m.to_dict())
+
+    print_results(results, baseline)
+
+    output = Path(args.output or f"results/benchmarks/{(env['commit'] or 'unknown')[:12]}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(
+        json.dumps({"environment": env, "results": results}, indent=2), encoding="utf-8"
+    )
+    print(f"\nSaved results to: {output}")
+
+
+if __name__ == "__main__":
+    main()
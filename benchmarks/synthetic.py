@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+FEATURES = ["Pclass", "Sex", "Age", "SibSp", "Parch", "Fare"]
+TARGET = "Survived"
+
+_CHUNK_ROWS = 500_000
+
+
+def titanic_frame(n_rows: int, seed: int = 0, start: int = 0) -> pd.DataFrame:
+    """
+    Titanic-shaped rows: the raw columns with roughly the original
+    distributions, missing ages and a survival signal the trees can learn.
+    """
+    rng = np.random.default_rng([seed, start])
+    n = n_rows
+
+    pclass = rng.choice([1, 2, 3], n, p=[0.24, 0.21, 0.55])
+    female = rng.random(n) < 0.35
+    age = rng.normal(30, 14, n).clip(0.42, 80).round(1)
+    age[rng.random(n) < 0.2] = np.nan
+    sibsp = rng.poisson(0.5, n).clip(0, 8)
+    parch = rng.poisson(0.4, n).clip(0, 6)
+    fare = (rng.lognormal(2.5, 0.8, n) * (4 - pclass)).round(4)
+
+    logit = 2.5 * female - 0.9 * (pclass - 2) - 0.02 * (np.nan_to_num(age, nan=30) - 30) - 0.6
+    survived = (rng.random(n) < 1 / (1 + np.exp(-logit))).astype(int)
+
+    ids = np.arange(start + 1, start + n + 1)
+    return pd.DataFrame({
+        "PassengerId": ids,
+        "Survived": survived,
+        "Pclass": pclass,
+        "Name": [f"Passenger, Mr. {i}" for i in ids],
+        "Sex": np.where(female, "female", "male"),
+        "Age": age,
+        "SibSp": sibsp,
+        "Parch": parch,
+        "Ticket": [f"A/{i % 100_000}" for i in ids],
+        "Fare": fare,
+        "Cabin": "",
+        "Embarked": rng.choice(["S", "C", "Q"], n, p=[0.72, 0.19, 0.09]),
+    })
+
+
+def titanic_csv(n_rows: int, data_dir: Path, seed: int = 0) -> Path:
+    """
+    Write (once) and return a synthetic raw CSV, generated in chunks so
+    10M rows never sit in memory at once.
+    """
+    path = data_dir / f"titanic_{n_rows}_{seed}.csv"
+    if path.is_file():
+        return path
+
+    data_dir.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("w", newline="", encoding="utf-8") as f:
+        for start in range(0, n_rows, _CHUNK_ROWS):
+            chunk = titanic_frame(min(_CHUNK_ROWS, n_rows - start), seed, start)
+            chunk.to_csv(f, index=False, header=start == 0)
+    tmp.replace(path)
+    return path
+
+
+def titanic_arrays(n_rows: int, seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Encoded feature matrix and target, as train.py builds them.
+    """
+    X = np.empty((n_rows, len(FEATURES)), dtype=np.float64)
+    y = np.empty(n_rows, dtype=int)
+    for start in range(0, n_rows, _CHUNK_ROWS):
+        df = titanic_frame(min(_CHUNK_ROWS, n_rows - start), seed, start)
+        df["Sex"] = df["Sex"].map({"male": 0, "female": 1}).astype(float)
+        stop = start + len(df)
+        X[start:stop] = df[FEATURES].to_numpy(dtype=np.float64)
+        y[start:stop] = df[TARGET].to_numpy()
+    return X, y
@@ -2,11 +2,16 @@ from __future__ import annotations
 from typing import Any
 import argparse
 import asyncio
+import json
+import math
+import sys
+import random
 import time
-from typing import List
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, List, TypeVar
 
 import httpx
-import numpy as np
 import pandas as pd
 from rich.console import Console
 from rich.table import Table
@@ -21,51 +26,487 @@ DEFAULT_PAYLOAD = {
     "Fare": 7.25,
 }
 
+T = TypeVar("T")
+R = TypeVar("R")
+
+WORKER_STARTUP_S = 2.0
+
 
 async def _send_request(
     client: httpx.AsyncClient,
     url: str,
     payload: dict[str, Any],
     semaphore: asyncio.Semaphore,
-    timings: List[float],
+    hist: LatencyHistogram,
 ) -> None:
     async with semaphore:
         start = time.perf_counter()
         response = await client.post(url, json=payload)
         response.raise_for_status()
         end = time.perf_counter()
-        timings.append(end - start)
+        hist.record(end - start)
 
 
-async def run_load_test(
+async def run_closed_loop(
     url: str,
-    payload: dict[str, Any],
-    total_requests: int,
+    payloads: List[dict[str, Any]],
     concurrency: int,
-) -> dict[str, float]:
+    timeout: float = 10.0,
+) -> LatencyHistogram:
+    """
+    Send every payload once with at most `concurrency` requests in flight.
+    """
     semaphore = asyncio.Semaphore(concurrency)
-    timings: List[float] = []
+    hist = LatencyHistogram()
 
-    async with httpx.AsyncClient(timeout=10.0) as client:
+    async with httpx.AsyncClient(timeout=timeout) as client:
         tasks = [
-            _send_request(client, url, payload, semaphore, timings)
-            for _ in range(total_requests)
+            _send_request(client, url, payload, semaphore, hist)
+            for payload in payloads
         ]
         await asyncio.gather(*tasks)
 
-    latencies = np.array(timings)
+    return hist
 
+
+def summarize_closed_loop(hist: LatencyHistogram, concurrency: int) -> dict[str, float]:
     return {
         "concurrency": concurrency,
-        "avg": float(latencies.mean()),
-        "q25": float(np.percentile(latencies, 25)),
-        "q50": float(np.percentile(latencies, 50)),
-        "q90": float(np.percentile(latencies, 90)),
-        "q95": float(np.percentile(latencies, 95)),
-        "q99": float(np.percentile(latencies, 99)),
+        "avg": hist.mean(),
+        "q25": hist.percentile(25),
+        "q50": hist.percentile(50),
+        "q90": hist.percentile(90),
+        "q95": hist.percentile(95),
+        "q99": hist.percentile(99),
     }
 
 
+async def run_load_test(
+    url: str,
+    payload: dict[str, Any],
+    total_requests: int,
+    concurrency: int,
+) -> dict[str, float]:
+    hist = await run_closed_loop(url, [payload] * total_requests, concurrency)
+    return summarize_closed_loop(hist, concurrency)
+
+
+# ---------------------------------------------------------------------
+# Open-loop (fixed arrival rate) mode
+# ---------------------------------------------------------------------
+
+
+class LatencyHistogram:
+    """
+    Log-bucketed latency histogram with ~1% relative precision from 1us up.
+    Histograms from several runs or processes can be merged exactly.
+    """
+
+    PRECISION = 0.01
+
+    def __init__(self) -> None:
+        self.counts: dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self._log_base = math.log1p(self.PRECISION)
+
+    def record(self, seconds: float) -> None:
+        micros = max(seconds * 1e6, 1.0)
+        index = math.ceil(math.log(micros) / self._log_base)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+    def merge(self, other: LatencyHistogram) -> None:
+        for index, n in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + n
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def percentile(self, q: float) -> float:
+        if self.count == 0:
+            return math.nan
+        rank = max(1, math.ceil(q / 100 * self.count))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                # Upper edge of the bucket, clamped to the exact extremes.
+                value = math.exp(index * self._log_base) / 1e6
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else math.nan
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "counts": {str(k): v for k, v in self.counts.items()},
+            "count": self.count,
+            "total": self.total,
+            "min": self.min if self.count else None,
+            "max": self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> LatencyHistogram:
+        hist = cls()
+        hist.counts = {int(k): int(v) for k, v in data["counts"].items()}
+        hist.count = int(data["count"])
+        hist.total = float(data["total"])
+        hist.min = math.inf if data["min"] is None else float(data["min"])
+        hist.max = float(data["max"])
+        return hist
+
+
+@dataclass(frozen=True)
+class Stage:
+    """
+    Arrival rate ramping linearly from start_rps to end_rps over duration_s
+    (constant when both are equal).
+    """
+
+    start_rps: float
+    end_rps: float
+    duration_s: float
+
+    @classmethod
+    def parse(cls, text: str) -> Stage:
+        """
+        "100:30" = 100 req/s for 30 s; "50-200:60" = ramp 50 -> 200 req/s over 60 s.
+        """
+        rates, duration = text.split(":")
+        start, _, end = rates.partition("-")
+        return cls(float(start), float(end or start), float(duration))
+
+    def offsets(self) -> List[float]:
+        """
+        Intended send times relative to the stage start.
+        """
+        r0, r1, d = self.start_rps, self.end_rps, self.duration_s
+        total = int((r0 + r1) / 2 * d)
+        if r0 == r1:
+            return [i / r0 for i in range(total)]
+
+        # Solve r0*t + (r1 - r0) * t^2 / (2d) = i for t.
+        a = (r1 - r0) / (2 * d)
+        return [(-r0 + math.sqrt(r0 * r0 + 4 * a * i)) / (2 * a) for i in range(total)]
+
+
+def build_schedule(stages: List[Stage]) -> List[float]:
+    schedule: List[float] = []
+    start = 0.0
+    for stage in stages:
+        schedule.extend(start + t for t in stage.offsets())
+        start += stage.duration_s
+    return schedule
+
+
+async def _send_scheduled(
+    client: httpx.AsyncClient,
+    url: str,
+    payload: dict[str, Any],
+    intended: float,
+    hist: LatencyHistogram,
+    outcome: dict[str, int],
+) -> None:
+    # Latency counts from the intended send time, so a slow server cannot
+    # hide queueing delay by slowing the sender (coordinated omission).
+    # Timed-out requests are recorded too: dropping them would hide exactly
+    # the slowest part of the tail.
+    try:
+        response = await client.post(url, json=payload)
+    except httpx.TimeoutException:
+        hist.record(time.perf_counter() - intended)
+        outcome["timeouts"] += 1
+        return
+    except httpx.HTTPError:
+        # No response, so no latency to record.
+        outcome["errors"] += 1
+        return
+
+    hist.record(time.perf_counter() - intended)
+    outcome["ok" if response.is_success else "errors"] += 1
+
+
+async def run_open_loop(
+    url: str,
+    payloads: List[dict[str, Any]],
+    schedule: List[float],
+    timeout: float = 10.0,
+    max_connections: int = 1000,
+    start_at: float | None = None,
+) -> tuple[LatencyHistogram, dict[str, Any]]:
+    """
+    Send one request at each scheduled offset (seconds) regardless of how
+    many are still in flight, cycling through payloads. Offsets count from
+    `start_at` (wall clock, so that several processes share one timeline)
+    or from now.
+    """
+    hist = LatencyHistogram()
+    outcome = {"ok": 0, "errors": 0, "timeouts": 0}
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_connections,
+    )
+
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        tasks = []
+        t0 = time.perf_counter()
+        if start_at is not None:
+            t0 += max(0.0, start_at - time.time())
+        for i, offset in enumerate(schedule):
+            intended = t0 + offset
+            delay = intended - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(
+                _send_scheduled(client, url, payloads[i % len(payloads)], intended, hist, outcome)
+            ))
+        await asyncio.gather(*tasks)
+        elapsed = max(0.0, time.perf_counter() - t0)
+
+    stats = {
+        "sent": len(schedule),
+        "elapsed": elapsed,
+        "ok": outcome["ok"],
+        "errors": outcome["errors"],
+        "timeouts": outcome["timeouts"],
+    }
+    return hist, stats
+
+
+def summarize_rate_run(
+    hist: LatencyHistogram,
+    stats: dict[str, Any],
+    duration_s: float,
+) -> dict[str, Any]:
+    return {
+        "target_rps": stats["sent"] / duration_s if duration_s else 0.0,
+        "achieved_rps": stats["ok"] / stats["elapsed"] if stats["elapsed"] else 0.0,
+        "sent": stats["sent"],
+        "ok": stats["ok"],
+        "errors": stats["errors"],
+        "timeouts": stats["timeouts"],
+        "error_rate": (
+            (stats["errors"] + stats["timeouts"]) / stats["sent"] if stats["sent"] else 0.0
+        ),
+        "avg": hist.mean(),
+        "q25": hist.percentile(25),
+        "q50": hist.percentile(50),
+        "q90": hist.percentile(90),
+        "q95": hist.percentile(95),
+        "q99": hist.percentile(99),
+        "q999": hist.percentile(99.9),
+        "max": hist.max,
+    }
+
+
+def print_rate_results(summary: dict[str, Any]) -> None:
+    table = Table(title="Open-loop load test (latency in seconds from intended send time)")
+    for col in ("target rps", "achieved rps", "errors", "timeouts",
+                "avg", "q50", "q90", "q99", "q99.9", "max"):
+        table.add_column(col, justify="right")
+    table.add_row(
+        f"{summary['target_rps']:.1f}",
+        f"{summary['achieved_rps']:.1f}",
+        str(summary["errors"]),
+        str(summary["timeouts"]),
+        f"{summary['avg']:.4f}",
+        f"{summary['q50']:.4f}",
+        f"{summary['q90']:.4f}",
+        f"{summary['q99']:.4f}",
+        f"{summary['q999']:.4f}",
+        f"{summary['max']:.4f}",
+    )
+    Console().print(table)
+
+
+# Lower is better for latencies and errors, higher is better for throughput.
+_BASELINE_CHECKS = {
+    "q50": 1, "q90": 1, "q99": 1, "error_rate": 1, "achieved_rps": -1,
+}
+
+
+def compare_to_baseline(
+    summary: dict[str, Any],
+    baseline: dict[str, Any],
+    tolerance: float,
+) -> List[str]:
+    """
+    Return a message for every metric that got worse than the baseline by
+    more than `tolerance` (relative), or that either run has no value for
+    (NaN, e.g. no request got a response).
+    """
+    regressions = []
+    for key, direction in _BASELINE_CHECKS.items():
+        old, new = float(baseline[key]), float(summary[key])
+        if math.isnan(old) or math.isnan(new):
+            regressions.append(f"{key}: {old:.4f} -> {new:.4f} (cannot compare)")
+            continue
+        if direction > 0:
+            worse = new > old * (1 + tolerance) and new - old > 1e-9
+        else:
+            worse = new < old * (1 - tolerance)
+        if worse:
+            regressions.append(f"{key}: {old:.4f} -> {new:.4f}")
+    return regressions
+
+
+# ---------------------------------------------------------------------
+# Replayed traffic and multi-process load generation
+# ---------------------------------------------------------------------
+
+FEATURE_COLUMNS = list(DEFAULT_PAYLOAD)
+
+
+def load_payloads(path: Path) -> tuple[List[dict[str, Any]], List[float] | None]:
+    """
+    Read request bodies from a dataset CSV or a JSON-lines recording.
+
+    Recording lines are either a bare request body or
+    {"ts": <unix seconds>, "payload": {...}}. Timestamps are returned only
+    when every line has one, with both lists sorted by timestamp (recordings
+    merged from several servers are rarely in order).
+    """
+    if path.suffix == ".csv":
+        df = pd.read_csv(path, usecols=FEATURE_COLUMNS).dropna()
+        return [dict(row) for row in df.to_dict(orient="records")], None
+
+    payloads: List[dict[str, Any]] = []
+    timestamps: List[float] = []
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            body = record.get("payload", record)
+            payloads.append({col: body[col] for col in FEATURE_COLUMNS})
+            ts = record.get("ts", record.get("timestamp"))
+            if ts is not None:
+                timestamps.append(float(ts))
+
+    if not payloads:
+        raise ValueError(f"No payloads in {path}")
+    if len(timestamps) != len(payloads):
+        return payloads, None
+    order = sorted(range(len(timestamps)), key=timestamps.__getitem__)
+    return [payloads[i] for i in order], [timestamps[i] for i in order]
+
+
+def sample_payloads(
+    payloads: List[dict[str, Any]],
+    n: int,
+    seed: int = 0,
+) -> List[dict[str, Any]]:
+    return random.Random(seed).choices(payloads, k=n)
+
+
+def replay_schedule(timestamps: List[float], speed: float = 1.0) -> List[float]:
+    """
+    Recorded arrival times as send offsets, compressed by `speed`.
+    """
+    t0 = min(timestamps)
+    return [(ts - t0) / speed for ts in timestamps]
+
+
+def split_work(items: List[T], parts: int) -> List[List[T]]:
+    """
+    Deal items round-robin, so every part spans the whole run.
+    """
+    return [chunk for chunk in (items[i::parts] for i in range(parts)) if chunk]
+
+
+def _closed_loop_worker(
+    url: str,
+    payloads: List[dict[str, Any]],
+    concurrency: int,
+    timeout: float,
+) -> dict[str, Any]:
+    return asyncio.run(run_closed_loop(url, payloads, concurrency, timeout)).to_dict()
+
+
+def _open_loop_worker(
+    url: str,
+    payloads: List[dict[str, Any]],
+    schedule: List[float],
+    timeout: float,
+    start_at: float | None,
+) -> tuple[dict[str, Any], dict[str, Any]]:
+    hist, stats = asyncio.run(
+        run_open_loop(url, payloads, schedule, timeout, start_at=start_at)
+    )
+    return hist.to_dict(), stats
+
+
+def _run_workers(fn: Callable[..., R], jobs: List[tuple[Any, ...]]) -> List[R]:
+    if len(jobs) == 1:
+        return [fn(*jobs[0])]
+    with ProcessPoolExecutor(max_workers=len(jobs)) as pool:
+        futures = [pool.submit(fn, *job) for job in jobs]
+        return [future.result() for future in futures]
+
+
+def run_closed_loop_processes(
+    url: str,
+    payloads: List[dict[str, Any]],
+    concurrency: int,
+    processes: int = 1,
+    timeout: float = 10.0,
+) -> LatencyHistogram:
+    """
+    Closed-loop test with payloads and concurrency split over processes.
+    """
+    processes = max(1, min(processes, concurrency))
+    jobs: List[tuple[Any, ...]] = []
+    for i, part in enumerate(split_work(payloads, processes)):
+        share = concurrency // processes + (i < concurrency % processes)
+        jobs.append((url, part, share, timeout))
+
+    hist = LatencyHistogram()
+    for data in _run_workers(_closed_loop_worker, jobs):
+        hist.merge(LatencyHistogram.from_dict(data))
+    return hist
+
+
+def run_open_loop_processes(
+    url: str,
+    payloads: List[dict[str, Any]],
+    schedule: List[float],
+    processes: int = 1,
+    timeout: float = 10.0,
+) -> tuple[LatencyHistogram, dict[str, Any]]:
+    """
+    Open-loop test with the schedule dealt over processes that all start
+    on the same wall-clock timeline.
+    """
+    # Bodies are dealt alongside the offsets so each request keeps its payload.
+    bodies = [payloads[i % len(payloads)] for i in range(len(schedule))]
+    # Leave time for the workers to start before the first send.
+    start_at = time.time() + WORKER_STARTUP_S if processes > 1 else None
+    jobs: List[tuple[Any, ...]] = [
+        (url, part_bodies, part_schedule, timeout, start_at)
+        for part_bodies, part_schedule in zip(
+            split_work(bodies, processes), split_work(schedule, processes)
+        )
+    ]
+
+    hist = LatencyHistogram()
+    stats: dict[str, Any] = {"sent": 0, "elapsed": 0.0, "ok": 0, "errors": 0, "timeouts": 0}
+    for data, part in _run_workers(_open_loop_worker, jobs):
+        hist.merge(LatencyHistogram.from_dict(data))
+        for key in ("sent", "ok", "errors", "timeouts"):
+            stats[key] += part[key]
+        stats["elapsed"] = max(stats["elapsed"], part["elapsed"])
+    return hist, stats
+
+
 def print_results(results: list[dict[str, float]]) -> None:
     table = Table(title="Load test results (latency in seconds)")
 
@@ -91,6 +532,56 @@ def print_results(results: list[dict[str, float]]) -> None:
     Console().print(table)
 
 
+def run_rate_mode(
+    args: argparse.Namespace,
+    payloads: List[dict[str, Any]],
+    timestamps: List[float] | None,
+) -> int:
+    stages = [Stage.parse(text) for text in args.stage or []]
+    if stages:
+        schedule = build_schedule(stages)
+        duration = sum(stage.duration_s for stage in stages)
+        payloads = sample_payloads(payloads, len(schedule), args.seed)
+    else:
+        assert timestamps is not None
+        schedule = replay_schedule(timestamps, args.speed)
+        duration = max(schedule)
+    print(
+        f"Running open-loop load test: {len(schedule)} requests over {duration:.0f}s "
+        f"from {args.processes} process(es)"
+    )
+
+    hist, stats = run_open_loop_processes(
+        url=args.url,
+        payloads=payloads,
+        schedule=schedule,
+        processes=args.processes,
+        timeout=args.timeout,
+    )
+    summary = summarize_rate_run(hist, stats, duration)
+    print_rate_results(summary)
+
+    report = {"summary": summary, "stages": [vars(s) for s in stages],
+              "payloads": args.payloads, "processes": args.processes,
+              "histogram": hist.to_dict()}
+    output_path = Path(args.json_output)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"\nSaved results to: {output_path}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))["summary"]
+        regressions = compare_to_baseline(summary, baseline, args.tolerance)
+        if regressions:
+            print("Regressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("No regressions against baseline")
+
+    return 0
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="ML model load testing")
     parser.add_argument("--url", required=True, help="Predict endpoint URL")
@@ -107,22 +598,77 @@ def main() -> None:
         default="results/load_test.csv",
         help="CSV output path",
     )
+    parser.add_argument(
+        "--stage",
+        action="append",
+        help="Open-loop stage RATE:SECONDS or START-END:SECONDS (repeatable); "
+             "switches to fixed arrival rate mode",
+    )
+    parser.add_argument("--timeout", type=float, default=10.0, help="Request timeout (s)")
+    parser.add_argument(
+        "--json-output",
+        default="results/load_test.json",
+        help="JSON report path (open-loop mode)",
+    )
+    parser.add_argument("--baseline", help="JSON report to compare against (open-loop mode)")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.10,
+        help="Allowed relative regression against the baseline",
+    )
+
+    parser.add_argument(
+        "--payloads",
+        help="Dataset CSV or JSON-lines request recording to sample request bodies from",
+    )
+    parser.add_argument(
+        "--replay-timing",
+        action="store_true",
+        help="Send the recording in order at its recorded inter-arrival times",
+    )
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=1.0,
+        help="Replay speed-up factor for --replay-timing",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=1,
+        help="Worker processes generating load",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Payload sampling seed")
 
     args = parser.parse_args()
 
+    if args.payloads:
+        payloads, timestamps = load_payloads(Path(args.payloads))
+    else:
+        payloads, timestamps = [DEFAULT_PAYLOAD], None
+
+    if args.replay_timing:
+        if args.stage:
+            parser.error("--replay-timing and --stage are mutually exclusive")
+        if timestamps is None:
+            parser.error("--replay-timing needs a recording with a ts on every line")
+
+    if args.stage or args.replay_timing:
+        sys.exit(run_rate_mode(args, payloads, timestamps))
+
     results: list[dict[str, float]] = []
 
     for n in args.concurrency:
-        print(f"Running load test: concurrency={n}")
-        metrics = asyncio.run(
-            run_load_test(
-                url=args.url,
-                payload=DEFAULT_PAYLOAD,
-                total_requests=args.requests,
-                concurrency=n,
-            )
+        print(f"Running load test: concurrency={n}, processes={args.processes}")
+        hist = run_closed_loop_processes(
+            url=args.url,
+            payloads=sample_payloads(payloads, args.requests, args.seed),
+            concurrency=n,
+            processes=args.processes,
+            timeout=args.timeout,
         )
-        results.append(metrics)
+        results.append(summarize_closed_loop(hist, n))
 
     df = pd.DataFrame(results)
     output_path = Path(args.output)
@@ -1,22 +1,94 @@
 """Console script for ds_git_homework."""
 
+import os
+from pathlib import Path
+from typing import Any, Optional
+
 import typer
 from rich.console import Console
-from typing import Any
+from rich.progress import Progress, SpinnerColumn, TextColumn, TimeElapsedColumn
+
 from ds_git_homework import utils
 
 app = typer.Typer()
 console = Console()
 
 
-@app.command()
-def main() -> Any:
+# A callback rather than a command: with `score` next to it, a plain
+# `ds_git_homework` (no subcommand) still runs main as before.
+@app.callback(invoke_without_command=True)
+def main(ctx: typer.Context) -> Any:
     """Console script for ds_git_homework."""
+    if ctx.invoked_subcommand is not None:
+        return
     console.print("Replace this message by putting your code into "
                   "ds_git_homework.cli.main")
     console.print("See Typer documentation at https://typer.tiangolo.com/")
     utils.do_something_useful()
 
 
+@app.command()
+def score(
+    input_uri: str = typer.Argument(..., help="CSV to score: a local path or s3://bucket/key"),
+    output_uri: str = typer.Argument(
+        ..., help="Where to write predictions: .csv or .parquet, local or s3://"
+    ),
+    run_id: Optional[str] = typer.Option(None, help="Run to score with (default: best run)"),
+    experiment: str = typer.Option(
+        os.environ.get("SERVE_EXPERIMENT", "titanic_tree"), help="MLflow experiment"
+    ),
+    metric: str = typer.Option(
+        os.environ.get("SERVE_METRIC", "accuracy"), help="Metric that picks the best run"
+    ),
+    manifest: Optional[Path] = typer.Option(
+        None, help="Serving manifest naming the model; MLflow is not contacted"
+    ),
+    keep: list[str] = typer.Option([], help="Input column to copy to the output (repeatable)"),
+    chunk_rows: int = typer.Option(100_000, min=1, help="Rows read and scored at a time"),
+    workers: int = typer.Option(0, min=0, help="Scoring processes (default: CPU count)"),
+    compile: bool = typer.Option(True, help="Score decision trees as compiled arrays"),
+) -> None:
+    """Score a CSV with a trained run, chunk by chunk across a process pool."""
+    # Imported here: pandas, sklearn and the S3 client are slow to import
+    # and the other commands do not need them.
+    from ds_git_homework.scoring import resolve_scoring_ref, score_file
+    from ds_git_homework.serving.prefork import cpu_count
+
+    model_ref = resolve_scoring_ref(experiment, metric, run_id=run_id, manifest=manifest)
+    console.print(f"Scoring {input_uri} with run {model_ref.run_id}")
+
+    progress = Progress(
+        SpinnerColumn(),
+        TextColumn("{task.completed:,.0f} rows"),
+        TextColumn("[cyan]{task.fields[rate]:,.0f} rows/s"),
+        TimeElapsedColumn(),
+        console=console,
+    )
+    with progress:
+        task = progress.add_task("score", total=None, rate=0.0)
+
+        def on_chunk(rows: int) -> None:
+            progress.advance(task, rows)
+            done = progress.tasks[task]
+            elapsed = done.elapsed or 0.0
+            progress.update(task, rate=done.completed / elapsed if elapsed else 0.0)
+
+        result = score_file(
+            model_ref,
+            input_uri,
+            output_uri,
+            keep=keep,
+            chunk_rows=chunk_rows,
+            workers=workers or cpu_count(),
+            compile=compile,
+            on_chunk=on_chunk,
+        )
+
+    console.print(
+        f"Scored {result.rows:,} rows in {result.seconds:.1f}s "
+        f"({result.rows_per_s:,.0f} rows/s) -> {output_uri}"
+    )
+
+
 if __name__ == "__main__":
     app()
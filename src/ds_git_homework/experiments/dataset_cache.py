@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import StratifiedKFold
+
+MANIFEST = "columns.json"
+
+
+def dataset_fingerprint(s3_client: Any, bucket: str, key: str) -> str:
+    """
+    Identify an S3 object version by its ETag and size, using one HEAD request.
+    """
+    head = s3_client.head_object(Bucket=bucket, Key=key)
+    etag = str(head["ETag"]).strip('"')
+    size = int(head["ContentLength"])
+    raw = f"s3://{bucket}/{key}:{etag}:{size}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def encode_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Minimal preprocessing shared by every training run.
+    """
+    if "Sex" in df.columns:
+        df["Sex"] = df["Sex"].map({"male": 0, "female": 1}).astype(float)
+    return df
+
+
+def is_cached(cache_dir: Path) -> bool:
+    return (cache_dir / MANIFEST).is_file()
+
+
+def build_column_cache(csv_path: Path, cache_dir: Path) -> None:
+    """
+    Parse the CSV once and store every numeric column as its own .npy file.
+    The directory appears atomically, so a crashed build is never reused.
+    """
+    df = encode_columns(pd.read_csv(csv_path))
+
+    tmp_dir = cache_dir.with_name(cache_dir.name + f".tmp-{os.getpid()}")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    files: dict[str, str] = {}
+    for i, col in enumerate(df.columns):
+        if not pd.api.types.is_numeric_dtype(df[col]):
+            continue
+        name = f"{i:03d}.npy"
+        np.save(tmp_dir / name, df[col].to_numpy(), allow_pickle=False)
+        files[str(col)] = name
+
+    (tmp_dir / MANIFEST).write_text(
+        json.dumps({"rows": len(df), "columns": files}),
+        encoding="utf-8",
+    )
+
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    os.replace(tmp_dir, cache_dir)
+
+
+def load_columns(cache_dir: Path, columns: list[str]) -> dict[str, np.ndarray]:
+    """
+    Memory-map only the requested columns; nothing is parsed or copied.
+    """
+    manifest = json.loads((cache_dir / MANIFEST).read_text(encoding="utf-8"))
+    files: dict[str, str] = manifest["columns"]
+
+    missing = [c for c in columns if c not in files]
+    if missing:
+        raise KeyError(f"Columns {missing} are not numeric columns of the cached dataset")
+
+    return {
+        col: np.load(cache_dir / files[col], mmap_mode="r", allow_pickle=False)
+        for col in columns
+    }
+
+
+def stratified_folds(
+    cache_dir: Path,
+    y: np.ndarray,
+    n_folds: int,
+    random_state: int,
+    split_key: str,
+) -> np.ndarray:
+    """
+    Fold number of every training row, computed once per dataset, split and
+    fold count and stored next to the cached columns.
+    """
+    path = cache_dir / f"folds_{split_key}_k{n_folds}.npy"
+    if path.is_file():
+        cached: np.ndarray = np.load(path, allow_pickle=False)
+        if len(cached) == len(y):
+            return cached
+
+    folds = np.empty(len(y), dtype=np.int16)
+    splitter = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=random_state)
+    for fold, (_, test_idx) in enumerate(splitter.split(np.zeros(len(y)), y)):
+        folds[test_idx] = fold
+
+    tmp = path.with_name(path.name + f".tmp-{os.getpid()}")
+    with tmp.open("wb") as f:
+        np.save(f, folds, allow_pickle=False)
+    os.replace(tmp, path)
+    return folds
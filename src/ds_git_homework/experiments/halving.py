@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import math
+from typing import Any, Callable, Iterable
+
+import numpy as np
+from sklearn.model_selection import train_test_split
+
+# (params, metrics) of one candidate in one round.
+Score = tuple[dict[str, Any], dict[str, float]]
+RunTrials = Callable[[list[dict[str, Any]], dict[str, np.ndarray]], Iterable[Score]]
+OnRound = Callable[[int, int, list[Score], list[dict[str, Any]]], None]
+
+
+def halving_schedule(
+    n_candidates: int,
+    n_train: int,
+    factor: int = 3,
+    finalists: int = 1,
+    min_samples: int = 100,
+) -> list[int]:
+    """
+    Training sample sizes of the pruning rounds. Each round keeps 1/factor
+    of the candidates and trains the survivors on factor times more rows, so
+    the last round uses n_train / factor rows and the finalists get the
+    full training split.
+    """
+    if factor < 2:
+        raise ValueError("factor must be >= 2")
+
+    rounds = 0
+    remaining = n_candidates
+    while remaining > finalists:
+        remaining = math.ceil(remaining / factor)
+        rounds += 1
+
+    sizes = [n_train // factor ** (rounds - i) for i in range(rounds)]
+    return [min(n_train, max(min_samples, size)) for size in sizes]
+
+
+def _rank_key(metrics: dict[str, float], metric: str) -> float:
+    value = metrics.get(metric, math.nan)
+    return -math.inf if math.isnan(value) else value
+
+
+def subsample(
+    data: dict[str, np.ndarray],
+    n_samples: int,
+    random_state: int,
+) -> dict[str, np.ndarray]:
+    """
+    Stratified subsample of the training split; the test split is kept.
+    """
+    if n_samples >= len(data["y_train"]):
+        return data
+    X_sub, _, y_sub, _ = train_test_split(
+        data["X_train"],
+        data["y_train"],
+        train_size=n_samples,
+        random_state=random_state,
+        stratify=data["y_train"],
+    )
+    return {**data, "X_train": X_sub, "y_train": y_sub}
+
+
+def successive_halving(
+    candidates: list[dict[str, Any]],
+    data: dict[str, np.ndarray],
+    run_trials: RunTrials,
+    random_state: int,
+    metric: str = "roc_auc",
+    factor: int = 3,
+    finalists: int = 1,
+    min_samples: int = 100,
+    on_round: OnRound | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Score all candidates on a small subsample, keep the best 1/factor and
+    repeat on larger samples. Returns the finalists, best first.
+    ``on_round(round, n_samples, scores, kept)`` is called after each round.
+    """
+    sizes = halving_schedule(
+        len(candidates), len(data["y_train"]), factor, finalists, min_samples
+    )
+
+    for i, n_samples in enumerate(sizes):
+        scores = list(run_trials(candidates, subsample(data, n_samples, random_state)))
+        ranked = sorted(scores, key=lambda s: _rank_key(s[1], metric), reverse=True)
+        keep = max(finalists, math.ceil(len(candidates) / factor))
+        candidates = [params for params, _ in ranked[:keep]]
+        if on_round is not None:
+            on_round(i, n_samples, scores, candidates)
+
+    return candidates
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Callable, Iterator
+
+# MLflow's limits for one log_batch request.
+_MAX_PARAMS_TAGS = 100
+_MAX_ENTITIES = 1000
+
+
+@dataclass(frozen=True)
+class Artifact:
+    """
+    Bytes written to ``<local_root>/<run_id>/<name>`` and uploaded under
+    ``artifact_path``.
+    """
+
+    name: str
+    data: bytes
+    artifact_path: str | None = None
+
+
+@dataclass(frozen=True)
+class TrialLog:
+    run_name: str
+    params: dict[str, Any]
+    metrics: dict[str, float]
+    tags: dict[str, str] = field(default_factory=dict)
+    artifacts: list[Artifact] = field(default_factory=list)
+    # Log into this run (e.g. one opened by an earlier search round) instead
+    # of creating a new one.
+    run_id: str | None = None
+    # Called from a logger thread with the run id once everything is logged.
+    on_logged: Callable[[str], None] | None = None
+
+
+Batch = tuple[list[Any], list[Any], list[Any]]
+
+
+def _batches(metrics: list[Any], params: list[Any], tags: list[Any]) -> Iterator[Batch]:
+    """
+    Split a run's (metrics, params, tags) into as few log_batch calls as
+    MLflow accepts; a typical trial fits in one.
+    """
+    n_params_tags = len(params) + len(tags)
+    if n_params_tags <= _MAX_PARAMS_TAGS and n_params_tags + len(metrics) <= _MAX_ENTITIES:
+        yield metrics, params, tags
+        return
+    for i in range(0, len(tags), _MAX_PARAMS_TAGS):
+        yield [], [], tags[i:i + _MAX_PARAMS_TAGS]
+    for i in range(0, len(params), _MAX_PARAMS_TAGS):
+        yield [], params[i:i + _MAX_PARAMS_TAGS], []
+    for i in range(0, len(metrics), _MAX_ENTITIES):
+        yield metrics[i:i + _MAX_ENTITIES], [], []
+
+
+class AsyncRunLogger:
+    """
+    Log finished trials to MLflow on background threads.
+
+    Each trial costs one create_run, one log_batch for params, metrics and
+    tags (split only beyond MLflow's batch limits), an artifact upload and
+    set_terminated. Up to ``workers`` trials are logged concurrently while
+    training goes on. ``submit`` blocks once ``max_pending`` trials are
+    queued. Leaving the context waits for the queue to drain and raises if
+    any trial failed to log.
+    """
+
+    def __init__(
+        self,
+        experiment_id: str,
+        local_root: Path,
+        client: Any = None,
+        workers: int = 4,
+        max_pending: int = 64,
+    ) -> None:
+        if client is None:
+            from mlflow.tracking import MlflowClient
+
+            client = MlflowClient()
+
+        self.experiment_id = experiment_id
+        self.local_root = local_root
+        self.client = client
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mlflow-log")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self.errors: list[tuple[str, BaseException]] = []
+        self.logged = 0
+
+    def submit(self, trial: TrialLog) -> None:
+        self._slots.acquire()
+        future = self._executor.submit(self._log, trial)
+        future.add_done_callback(lambda f: self._done(trial, f))
+
+    def _done(self, trial: TrialLog, future: Future[None]) -> None:
+        self._slots.release()
+        exc = future.exception()
+        with self._lock:
+            if exc is None:
+                self.logged += 1
+            else:
+                self.errors.append((trial.run_name, exc))
+
+    def _log(self, trial: TrialLog) -> None:
+        from mlflow.entities import Metric, Param, RunTag
+
+        run_id = trial.run_id
+        tags = [RunTag(k, str(v)) for k, v in trial.tags.items()]
+        if run_id is None:
+            from mlflow.tracking.context.registry import resolve_tags
+
+            run = self.client.create_run(
+                self.experiment_id,
+                tags=resolve_tags(trial.tags),
+                run_name=trial.run_name,
+            )
+            run_id = run.info.run_id
+            tags = []
+        assert run_id is not None
+
+        try:
+            now = int(time.time() * 1000)
+            metrics = [Metric(k, float(v), now, 0) for k, v in trial.metrics.items()]
+            params = [Param(k, str(v)) for k, v in trial.params.items()]
+            for batch_metrics, batch_params, batch_tags in _batches(metrics, params, tags):
+                self.client.log_batch(
+                    run_id, metrics=batch_metrics, params=batch_params, tags=batch_tags
+                )
+
+            for artifact in trial.artifacts:
+                path = self.local_root / run_id / artifact.name
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_bytes(artifact.data)
+                self.client.log_artifact(run_id, str(path), artifact_path=artifact.artifact_path)
+        except BaseException:
+            self.client.set_terminated(run_id, status="FAILED")
+            raise
+
+        self.client.set_terminated(run_id, status="FINISHED")
+        if trial.on_logged is not None:
+            trial.on_logged(run_id)
+
+    def close(self) -> None:
+        """
+        Wait for every queued trial and raise if any of them failed.
+        """
+        self._executor.shutdown(wait=True)
+        if self.errors:
+            for run_name, exc in self.errors:
+                print(f"Failed to log run {run_name}: {exc!r}")
+            raise RuntimeError(f"{len(self.errors)} MLflow run(s) failed to log")
+
+    def __enter__(self) -> AsyncRunLogger:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self.close()
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from types import TracebackType
+
+import numpy as np
+
+
+# Room left on /dev/shm beyond the arrays themselves.
+SHM_HEADROOM = 64 * 1024 * 1024
+
+
+def _default_shared_dir(nbytes: int) -> str | None:
+    """
+    TRAIN_SHARED_DIR if set, else /dev/shm when it has room for nbytes, else
+    None (the system temp dir).
+    """
+    configured = os.environ.get("TRAIN_SHARED_DIR")
+    if configured:
+        return configured
+
+    # /dev/shm is RAM-backed on Linux, so the files never touch the disk.
+    # It can be small though (64 MB by default in Docker).
+    shm = Path("/dev/shm")
+    if not shm.is_dir() or not os.access(shm, os.W_OK):
+        return None
+    if shutil.disk_usage(shm).free < nbytes + SHM_HEADROOM:
+        return None
+    return str(shm)
+
+
+class SharedArrays:
+    """
+    Arrays written once to .npy files that worker processes memory-map.
+
+    Workers get only the file paths, so tasks never pickle the data and all
+    processes read the same pages. The files are removed on exit.
+    """
+
+    def __init__(self, arrays: dict[str, np.ndarray], root: str | None = None) -> None:
+        self._arrays = arrays
+        nbytes = sum(array.nbytes for array in arrays.values())
+        self._root = root if root is not None else _default_shared_dir(nbytes)
+        self._tmp: tempfile.TemporaryDirectory[str] | None = None
+        self.paths: dict[str, str] = {}
+
+    def __enter__(self) -> SharedArrays:
+        self._tmp = tempfile.TemporaryDirectory(prefix="ds_git_homework_", dir=self._root)
+        for name, array in self._arrays.items():
+            path = Path(self._tmp.name) / f"{name}.npy"
+            np.save(path, np.ascontiguousarray(array), allow_pickle=False)
+            self.paths[name] = str(path)
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        if self._tmp is not None:
+            self._tmp.cleanup()
+            self._tmp = None
+
+
+def load_shared_arrays(paths: dict[str, str]) -> dict[str, np.ndarray]:
+    return {
+        name: np.load(path, mmap_mode="r", allow_pickle=False)
+        for name, path in paths.items()
+    }
@@ -3,31 +3,38 @@ from __future__ import annotations
 import argparse
 import os
 import pickle
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
 from pathlib import Path
-from typing import Any, cast
+from typing import Any, Callable, Iterator, cast
 import yaml
 import mlflow
-import pandas as pd
+import numpy as np
 from sklearn.metrics import accuracy_score, f1_score, roc_auc_score
 from sklearn.model_selection import train_test_split
 from sklearn.tree import DecisionTreeClassifier
 
-from ds_git_homework.s3.client import make_s3_client, S3Config
+from ds_git_homework.experiments.dataset_cache import (
+    build_column_cache,
+    dataset_fingerprint,
+    is_cached,
+    load_columns,
+    stratified_folds,
+)
+from ds_git_homework.experiments.halving import Score, successive_halving
+from ds_git_homework.experiments.mlflow_logger import Artifact, AsyncRunLogger, TrialLog
+from ds_git_homework.experiments.parallel import SharedArrays, load_shared_arrays
+from ds_git_homework.experiments.trial_index import (
+    FINGERPRINT_TAG,
+    TrialIndex,
+    trial_fingerprint,
+)
+from ds_git_homework.s3.client import S3_METRICS, get_s3_client, load_s3_config_from_env
 from ds_git_homework.s3.io import download_file
 from itertools import product
 
 
-def _load_env_s3_config() -> S3Config:
-    endpoint_url = os.environ["S3_ENDPOINT_URL"]
-    access_key = os.environ["AWS_ACCESS_KEY_ID"]
-    secret_key = os.environ["AWS_SECRET_ACCESS_KEY"]
-    return S3Config(
-        endpoint_url=endpoint_url,
-        access_key=access_key,
-        secret_key=secret_key,
-    )
-
-
 def _load_yaml_config(path: Path) -> dict[str, Any]:
     with path.open("r", encoding="utf-8") as f:
         data = yaml.safe_load(f)
@@ -49,10 +56,254 @@ def _iterate_param_grid(param_grid: dict[str, list[Any]]) -> list[dict[str, Any]
     return combos
 
 
+@dataclass(frozen=True)
+class TrialResult:
+    params: dict[str, Any]
+    metrics: dict[str, float]
+    model_bytes: bytes
+
+
+def _score(model: Any, X_test: np.ndarray, y_test: np.ndarray) -> dict[str, float]:
+    y_pred = model.predict(X_test)
+
+    metrics = {
+        "accuracy": float(accuracy_score(y_test, y_pred)),
+        "f1": float(f1_score(y_test, y_pred)),
+    }
+
+    if hasattr(model, "predict_proba"):
+        proba = model.predict_proba(X_test)[:, 1]
+        metrics["roc_auc"] = float(roc_auc_score(y_test, proba))
+
+    return metrics
+
+
+def _fit_and_score(
+    params: dict[str, Any],
+    random_state: int,
+    data: dict[str, np.ndarray],
+) -> TrialResult:
+    model = DecisionTreeClassifier(
+        **params,
+        random_state=random_state,
+    )
+    model.fit(data["X_train"], data["y_train"])
+
+    metrics = _score(model, data["X_test"], data["y_test"])
+    return TrialResult(params=params, metrics=metrics, model_bytes=pickle.dumps(model))
+
+
+def _fit_fold(
+    params: dict[str, Any],
+    random_state: int,
+    fold: int,
+    data: dict[str, np.ndarray],
+) -> dict[str, float]:
+    """
+    Train on all folds but `fold` of the training split and score on `fold`.
+    """
+    held_out = data["folds"] == fold
+    X, y = data["X_train"], data["y_train"]
+
+    model = DecisionTreeClassifier(**params, random_state=random_state)
+    model.fit(X[~held_out], y[~held_out])
+    return _score(model, X[held_out], y[held_out])
+
+
+# Train/test arrays of a worker process, memory-mapped once by _init_worker.
+_WORKER_DATA: dict[str, np.ndarray] = {}
+
+
+def _init_worker(paths: dict[str, str]) -> None:
+    _WORKER_DATA.update(load_shared_arrays(paths))
+
+
+def _run_trial(params: dict[str, Any], random_state: int) -> TrialResult:
+    return _fit_and_score(params, random_state, _WORKER_DATA)
+
+
+def _run_fold(params: dict[str, Any], random_state: int, fold: int) -> dict[str, float]:
+    return _fit_fold(params, random_state, fold, _WORKER_DATA)
+
+
+def _run_trials(
+    param_combinations: list[dict[str, Any]],
+    random_state: int,
+    data: dict[str, np.ndarray],
+    workers: int,
+) -> Iterator[TrialResult]:
+    """
+    Yield trial results in grid order, fanning trials out to a process pool
+    when workers > 1. Workers share the arrays through memory-mapped files.
+    """
+    if workers <= 1:
+        for params in param_combinations:
+            yield _fit_and_score(params, random_state, data)
+        return
+
+    with SharedArrays(data) as shared, ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(shared.paths,),
+    ) as executor:
+        yield from executor.map(
+            _run_trial,
+            param_combinations,
+            [random_state] * len(param_combinations),
+        )
+
+
+def _run_cv(
+    param_combinations: list[dict[str, Any]],
+    random_state: int,
+    data: dict[str, np.ndarray],
+    n_folds: int,
+    workers: int,
+) -> list[dict[str, float]]:
+    """
+    Cross-validated metrics (cv_<metric>_mean / _std) of every combination.
+    All (combination x fold) pairs go to the pool at once, so k folds cost
+    k times the CPU but not k times the wall-clock time.
+    """
+    tasks = [(params, fold) for params in param_combinations for fold in range(n_folds)]
+
+    if workers <= 1:
+        fold_metrics = [_fit_fold(params, random_state, fold, data) for params, fold in tasks]
+    else:
+        with SharedArrays(data) as shared, ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(shared.paths,),
+        ) as executor:
+            fold_metrics = list(executor.map(
+                _run_fold,
+                [params for params, _ in tasks],
+                [random_state] * len(tasks),
+                [fold for _, fold in tasks],
+            ))
+
+    summaries = []
+    for i in range(len(param_combinations)):
+        folds = fold_metrics[i * n_folds:(i + 1) * n_folds]
+        summary: dict[str, float] = {}
+        for name in folds[0]:
+            values = np.array([m[name] for m in folds])
+            summary[f"cv_{name}_mean"] = float(values.mean())
+            summary[f"cv_{name}_std"] = float(values.std())
+        summaries.append(summary)
+    return summaries
+
+
+def _logged_fingerprints(experiment_name: str) -> set[str]:
+    """
+    Trial fingerprints of the finished runs already in the MLflow experiment.
+    """
+    runs = mlflow.search_runs(
+        experiment_names=[experiment_name],
+        filter_string="attributes.status = 'FINISHED'",
+        output_format="list",
+    )
+    return {
+        run.data.tags[FINGERPRINT_TAG]
+        for run in runs
+        if FINGERPRINT_TAG in run.data.tags
+    }
+
+
+def _run_name(params: dict[str, Any]) -> str:
+    return "_".join(f"{k}={v}" for k, v in params.items())
+
+
+def _log_halving_round(
+    run_ids: dict[str, str],
+    fingerprint_of: Callable[[dict[str, Any]], str],
+    round_idx: int,
+    n_samples: int,
+    scores: list[Score],
+    kept: list[dict[str, Any]],
+) -> None:
+    """
+    Log one pruning round. Each candidate has a single run whose halving_*
+    metrics are stepped by round; runs are tagged with the round that
+    pruned them.
+    """
+    kept_fps = {fingerprint_of(params) for params in kept}
+    for params, metrics in scores:
+        trial_fp = fingerprint_of(params)
+        run_id = run_ids.get(trial_fp)
+
+        with mlflow.start_run(
+            run_id=run_id,
+            run_name=None if run_id else _run_name(params),
+        ) as run:
+            if run_id is None:
+                run_ids[trial_fp] = run.info.run_id
+                mlflow.set_tag("search", "halving")
+                mlflow.log_params(params)
+
+            round_metrics = {f"halving_{k}": v for k, v in metrics.items()}
+            round_metrics["halving_n_samples"] = n_samples
+            mlflow.log_metrics(round_metrics, step=round_idx)
+            if trial_fp not in kept_fps:
+                mlflow.set_tag("halving_pruned_round", str(round_idx))
+
+    print(
+        f"Halving round {round_idx}: {len(scores)} candidates on {n_samples} rows, "
+        f"kept {len(kept)}"
+    )
+
+
 def main() -> None:
     parser = argparse.ArgumentParser()
     parser.add_argument("--config", required=True, help="Path to experiment YAML config")
     parser.add_argument("--grid", required=True)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Processes used to train grid combinations in parallel",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Rerun grid combinations that were already evaluated on this data",
+    )
+    parser.add_argument(
+        "--search",
+        choices=["grid", "halving"],
+        default="grid",
+        help="Train every combination, or prune them by successive halving on subsamples",
+    )
+    parser.add_argument(
+        "--halving-factor",
+        type=int,
+        default=3,
+        help="Keep 1/factor of the candidates per round and grow the sample by factor",
+    )
+    parser.add_argument(
+        "--halving-finalists",
+        type=int,
+        default=2,
+        help="Candidates trained on the full training split",
+    )
+    parser.add_argument(
+        "--halving-min-samples",
+        type=int,
+        default=100,
+        help="Smallest training sample of a halving round",
+    )
+    parser.add_argument(
+        "--halving-metric",
+        default="roc_auc",
+        help="Metric used to rank candidates between rounds",
+    )
+    parser.add_argument(
+        "--cv",
+        type=int,
+        default=0,
+        metavar="K",
+        help="Also score each trained combination by stratified K-fold cross-validation",
+    )
     args = parser.parse_args()
 
     cfg_path = Path(args.config)
@@ -63,37 +314,39 @@ def main() -> None:
     # MLflow tracking
     tracking_uri = os.environ.get("MLFLOW_TRACKING_URI", "http://localhost:5001")
     mlflow.set_tracking_uri(tracking_uri)
-    mlflow.set_experiment(experiment_name)
+    experiment = mlflow.set_experiment(experiment_name)
 
     # S3
-    s3 = _load_env_s3_config()
-    s3_client = make_s3_client(s3)
+    s3_client = get_s3_client(load_s3_config_from_env())
 
     bucket: str = cfg["s3"]["bucket"]
     processed_key: str = cfg["s3"]["processed_key"]
 
-    # Download dataset
-    local_processed = Path("data/processed") / Path(processed_key).name
-    local_processed.parent.mkdir(parents=True, exist_ok=True)
+    # Columnar dataset cache, keyed by the S3 object's fingerprint
+    fingerprint = dataset_fingerprint(s3_client, bucket, processed_key)
+    cache_dir = Path(os.environ.get("TRAIN_CACHE_DIR", "data/cache")) / fingerprint
 
-    download_file(
-        s3_client=s3_client,
-        bucket=bucket,
-        key=processed_key,
-        dst=local_processed,
-    )
+    if not is_cached(cache_dir):
+        local_processed = Path("data/processed") / Path(processed_key).name
+        local_processed.parent.mkdir(parents=True, exist_ok=True)
 
-    df = pd.read_csv(local_processed)
+        stats = download_file(
+            s3_client=s3_client,
+            bucket=bucket,
+            key=processed_key,
+            dst=local_processed,
+        )
+        print(f"Downloaded {stats}")
+        build_column_cache(local_processed, cache_dir)
+
+    print(S3_METRICS.report())
 
     target_col: str = cfg["target_col"]
     features: list[str] = cfg["features"]
 
-    # Minimal preprocessing
-    if "Sex" in df.columns:
-        df["Sex"] = df["Sex"].map({"male": 0, "female": 1}).astype(float)
-
-    X = df[features].copy()
-    y = df[target_col].astype(int)
+    columns = load_columns(cache_dir, features + [target_col])
+    X = np.column_stack([columns[f] for f in features]).astype(np.float64)
+    y = columns[target_col].astype(int)
 
     split_cfg = cfg["split"]
     X_train, X_test, y_train, y_test = train_test_split(
@@ -110,52 +363,103 @@ def main() -> None:
     param_grid: dict[str, list[Any]] = grid_cfg["param_grid"]
     param_combinations = _iterate_param_grid(param_grid)
 
-    for params in param_combinations:
-        run_name = "_".join(f"{k}={v}" for k, v in params.items())
-
-        with mlflow.start_run(run_name=run_name):
-            mlflow.log_param("model_type", model_cfg["type"])
-            mlflow.log_params(params)
-            mlflow.log_param("features", ",".join(features))
-            mlflow.log_param("target_col", target_col)
-            mlflow.log_param("test_size", split_cfg["test_size"])
-            mlflow.log_param("random_state", split_cfg["random_state"])
-            mlflow.log_param("stratify", True)
-            model = DecisionTreeClassifier(
-                **params,
-                random_state=split_cfg["random_state"],
-            )
-            model.fit(X_train, y_train)
-
-            y_pred = model.predict(X_test)
-
-            acc = float(accuracy_score(y_test, y_pred))
-            f1 = float(f1_score(y_test, y_pred))
-
-            mlflow.log_metric("accuracy", acc)
-            mlflow.log_metric("f1", f1)
-
-            if hasattr(model, "predict_proba"):
-                proba = model.predict_proba(X_test)[:, 1]
-                auc = float(roc_auc_score(y_test, proba))
-                mlflow.log_metric("roc_auc", auc)
-
-            active_run = mlflow.active_run()
-            if active_run is None:
-                raise RuntimeError("MLflow run is not active")
-
-            run_id = active_run.info.run_id
-
-            # Save model locally
-            local_model_dir = Path("data/models") / experiment_name / run_id
-            local_model_dir.mkdir(parents=True, exist_ok=True)
-            local_model_path = local_model_dir / "model.pkl"
-
-            with local_model_path.open("wb") as f:
-                pickle.dump(model, f)
-
-            mlflow.log_artifact(str(local_model_path), artifact_path="model_pickle")
+    # Skip trials already evaluated on the same data, split, columns and params
+    split_params = {
+        "test_size": split_cfg["test_size"],
+        "random_state": split_cfg["random_state"],
+        "stratify": True,
+    }
+    if args.cv:
+        split_params["cv_folds"] = args.cv
+    fingerprint_of = partial(
+        trial_fingerprint, fingerprint, split_params, features, target_col, model_cfg["type"]
+    )
+    trial_index = TrialIndex(
+        Path(os.environ.get("TRAIN_TRIALS_DIR", "data/trials")) / experiment_name
+    )
 
+    random_state = int(split_cfg["random_state"])
+    data = {
+        "X_train": X_train,
+        "y_train": y_train,
+        "X_test": X_test,
+        "y_test": y_test,
+    }
+
+    # Successive halving narrows the grid down to a few finalists
+    run_ids: dict[str, str] = {}
+    if args.search == "halving":
+        param_combinations = successive_halving(
+            param_combinations,
+            data,
+            run_trials=lambda combos, round_data: (
+                (r.params, r.metrics)
+                for r in _run_trials(combos, random_state, round_data, args.workers)
+            ),
+            random_state=random_state,
+            metric=args.halving_metric,
+            factor=args.halving_factor,
+            finalists=args.halving_finalists,
+            min_samples=args.halving_min_samples,
+            on_round=partial(_log_halving_round, run_ids, fingerprint_of),
+        )
+
+    if not args.force:
+        done = trial_index.fingerprints() | _logged_fingerprints(experiment_name)
+        pending = [p for p in param_combinations if fingerprint_of(p) not in done]
+        skipped = len(param_combinations) - len(pending)
+        if skipped:
+            print(f"Skipping {skipped} of {len(param_combinations)} already evaluated trials")
+        param_combinations = pending
+
+    # Cross-validation on the training split, with folds cached per dataset
+    cv_metrics: dict[str, dict[str, float]] = {}
+    if args.cv and param_combinations:
+        folds = stratified_folds(
+            cache_dir,
+            y_train,
+            args.cv,
+            random_state,
+            split_key=f"ts{split_cfg['test_size']}_rs{random_state}",
+        )
+        cv_data = {"X_train": X_train, "y_train": y_train, "folds": folds}
+        cv_results = _run_cv(param_combinations, random_state, cv_data, args.cv, args.workers)
+        cv_metrics = {
+            fingerprint_of(params): metrics
+            for params, metrics in zip(param_combinations, cv_results)
+        }
+
+    run_params = {
+        "model_type": model_cfg["type"],
+        "features": ",".join(features),
+        "target_col": target_col,
+        "test_size": split_cfg["test_size"],
+        "random_state": split_cfg["random_state"],
+        "stratify": True,
+    }
+
+    # Trials are logged on background threads while the next ones train
+    with AsyncRunLogger(
+        experiment.experiment_id,
+        local_root=Path("data/models") / experiment_name,
+        workers=int(os.environ.get("TRAIN_LOG_WORKERS", "4")),
+    ) as run_logger:
+        for result in _run_trials(param_combinations, random_state, data, args.workers):
+            params = result.params
+            run_name = _run_name(params)
+            trial_fp = fingerprint_of(params)
+            metrics = {**result.metrics, **cv_metrics.get(trial_fp, {})}
+
+            run_logger.submit(TrialLog(
+                run_name=run_name,
+                params={**run_params, **params},
+                metrics=metrics,
+                tags={FINGERPRINT_TAG: trial_fp, "dataset_fingerprint": fingerprint},
+                artifacts=[Artifact("model.pkl", result.model_bytes, "model_pickle")],
+                # Finalists of a halving search complete the run of their rounds
+                run_id=run_ids.get(trial_fp),
+                on_logged=partial(trial_index.record, trial_fp, params=params, metrics=metrics),
+            ))
             print(f"Finished run: {run_name}")
 
 
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+FINGERPRINT_TAG = "trial_fingerprint"
+
+
+def trial_fingerprint(
+    dataset_fingerprint: str,
+    split: dict[str, Any],
+    features: list[str],
+    target_col: str,
+    model_type: str,
+    params: dict[str, Any],
+) -> str:
+    """
+    Identify a trial by everything that determines its result: the dataset
+    version, the split, the columns, the model type and its parameters.
+    """
+    raw = json.dumps(
+        {
+            "dataset": dataset_fingerprint,
+            "split": split,
+            "features": features,
+            "target_col": target_col,
+            "model_type": model_type,
+            "params": params,
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+class TrialIndex:
+    """
+    Local record of completed trials, one small JSON file per fingerprint,
+    so concurrent writers never touch the same file.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+
+    def _path(self, fingerprint: str) -> Path:
+        return self.root / f"{fingerprint}.json"
+
+    def get(self, fingerprint: str) -> dict[str, Any] | None:
+        try:
+            data = json.loads(self._path(fingerprint).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        return data if isinstance(data, dict) else None
+
+    def fingerprints(self) -> set[str]:
+        if not self.root.is_dir():
+            return set()
+        return {p.stem for p in self.root.glob("*.json")}
+
+    def record(
+        self,
+        fingerprint: str,
+        run_id: str,
+        params: dict[str, Any],
+        metrics: dict[str, float],
+    ) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        target = self._path(fingerprint)
+        tmp = target.with_name(target.name + ".tmp")
+        tmp.write_text(
+            json.dumps({"run_id": run_id, "params": params, "metrics": metrics}, default=str),
+            encoding="utf-8",
+        )
+        os.replace(tmp, target)
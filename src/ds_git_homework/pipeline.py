@@ -1,22 +1,200 @@
+import argparse
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
 from pathlib import Path
+from typing import Any
 
-from ds_git_homework.processing.transform import add_processed_flag
-from ds_git_homework.s3.client import load_s3_config_from_env, make_s3_client
-from ds_git_homework.s3.io import download_file, upload_file
+from ds_git_homework.processing.transform import add_processed_flag, iter_processed_csv
+from ds_git_homework.s3.client import S3_METRICS, get_s3_client, load_s3_config_from_env
+from ds_git_homework.s3.io import download_file, open_text_stream, upload_file, upload_stream
 
 
-def run_pipeline() -> None:
+@dataclass(frozen=True)
+class ObjectResult:
+    raw_key: str
+    processed_key: str
+    seconds: float
+    bytes_written: int
+    error: str | None = None
+
+
+def _stream_transform(s3: Any, bucket: str, raw_key: str, processed_key: str) -> int:
+    with open_text_stream(s3, bucket=bucket, key=raw_key) as f_in:
+        chunks = (text.encode("utf-8") for text in iter_processed_csv(f_in))
+        return upload_stream(s3, bucket=bucket, key=processed_key, chunks=chunks)
+
+
+def run_pipeline(stream: bool | None = None) -> None:
+    """
+    Add the `processed` flag to S3_RAW_KEY and store it as S3_PROCESSED_KEY.
+
+    With `stream` (default: PIPELINE_STREAMING=1) the object is transformed
+    on the fly from a GET into a multipart upload, without local files.
+    """
     bucket = os.environ["S3_BUCKET"]
     raw_key = os.environ["S3_RAW_KEY"]
     processed_key = os.environ["S3_PROCESSED_KEY"]
 
+    if stream is None:
+        stream = os.environ.get("PIPELINE_STREAMING", "0") == "1"
+
+    s3 = get_s3_client(load_s3_config_from_env())
+
+    if stream:
+        _stream_transform(s3, bucket, raw_key, processed_key)
+        return
+
     raw_local = Path("data/raw/titanic.csv")
     processed_local = Path("data/processed/titanic_processed.csv")
 
+    print(download_file(s3, bucket=bucket, key=raw_key, dst=raw_local))
+    add_processed_flag(raw_local, processed_local)
+    print(upload_file(s3, bucket=bucket, key=processed_key, src=processed_local))
+
+
+# -------------------------
+# Many objects
+# -------------------------
+
+def list_keys(s3: Any, bucket: str, prefix: str) -> list[str]:
+    keys: list[str] = []
+    paginator = s3.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        keys.extend(obj["Key"] for obj in page.get("Contents", []))
+    return keys
+
+
+def _is_under(key: str, prefix: str) -> bool:
+    # "raw" covers "raw/a.csv" but not "rawdata/a.csv".
+    return bool(prefix) and key.startswith(prefix.rstrip("/") + "/")
+
+
+def processed_key_for(raw_key: str, raw_prefix: str, processed_prefix: str) -> str:
+    """
+    Map a raw key to its processed key, keeping the part below the raw_prefix
+    directory, or the whole key when there is no prefix or the key is outside
+    it. raw_prefix only matches at a "/" boundary.
+    """
+    if _is_under(raw_key, raw_prefix):
+        relative = raw_key[len(raw_prefix.rstrip("/")) + 1:]
+    else:
+        relative = raw_key
+    return f"{processed_prefix.rstrip('/')}/{relative}" if processed_prefix else relative
+
+
+def _process_object(s3: Any, bucket: str, raw_key: str, processed_key: str) -> ObjectResult:
+    start = time.perf_counter()
+    try:
+        written = _stream_transform(s3, bucket, raw_key, processed_key)
+    except Exception as exc:
+        return ObjectResult(
+            raw_key=raw_key,
+            processed_key=processed_key,
+            seconds=time.perf_counter() - start,
+            bytes_written=0,
+            error=repr(exc),
+        )
+    return ObjectResult(
+        raw_key=raw_key,
+        processed_key=processed_key,
+        seconds=time.perf_counter() - start,
+        bytes_written=written,
+    )
+
+
+def run_pipeline_many(
+    raw_keys: list[str] | None = None,
+    raw_prefix: str | None = None,
+    processed_prefix: str | None = None,
+    max_workers: int | None = None,
+) -> list[ObjectResult]:
+    """
+    Stream-transform many objects concurrently on a bounded thread pool.
+
+    Keys come from `raw_keys`, else every object under `raw_prefix`
+    (default: S3_RAW_PREFIX) except directory markers and earlier outputs
+    under `processed_prefix`. All threads share one pooled S3 client.
+    Failures are reported per object instead of stopping the run.
+    """
+    bucket = os.environ["S3_BUCKET"]
+    if raw_prefix is None:
+        raw_prefix = os.environ.get("S3_RAW_PREFIX", "")
+    if processed_prefix is None:
+        processed_prefix = os.environ.get("S3_PROCESSED_PREFIX", "processed")
+    if max_workers is None:
+        max_workers = int(os.environ.get("PIPELINE_MAX_WORKERS", "16"))
+
     cfg = load_s3_config_from_env()
-    s3 = make_s3_client(cfg)
+    cfg = replace(cfg, max_pool_connections=max(cfg.max_pool_connections, max_workers))
+    s3 = get_s3_client(cfg)
 
-    download_file(s3, bucket=bucket, key=raw_key, dst=raw_local)
-    add_processed_flag(raw_local, processed_local)
-    upload_file(s3, bucket=bucket, key=processed_key, src=processed_local)
+    if not raw_prefix and not processed_prefix:
+        raise ValueError("Set a raw or a processed prefix: outputs would overwrite their inputs")
+
+    if raw_keys is None:
+        raw_keys = [
+            key for key in list_keys(s3, bucket, raw_prefix)
+            if not key.endswith("/") and not _is_under(key, processed_prefix)
+        ]
+
+    targets = [(key, processed_key_for(key, raw_prefix, processed_prefix)) for key in raw_keys]
+    sources: dict[str, list[str]] = {}
+    for key, processed_key in targets:
+        sources.setdefault(processed_key, []).append(key)
+    clashes = {k: v for k, v in sources.items() if len(v) > 1}
+    if clashes:
+        # Concurrent uploads to one key would silently overwrite each other.
+        raise ValueError(f"Several raw keys map to the same processed key: {clashes}")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(_process_object, s3, bucket, key, processed_key)
+            for key, processed_key in targets
+        ]
+        return [f.result() for f in futures]
+
+
+def print_report(results: list[ObjectResult], wall_seconds: float) -> None:
+    for r in results:
+        status = "ok" if r.error is None else f"FAILED {r.error}"
+        print(f"{r.raw_key} -> {r.processed_key}: {r.seconds:.2f}s "
+              f"{r.bytes_written} bytes {status}")
+
+    failed = sum(r.error is not None for r in results)
+    total_bytes = sum(r.bytes_written for r in results)
+    mb_per_s = total_bytes / wall_seconds / 1e6 if wall_seconds > 0 else 0.0
+    print(f"{len(results)} objects, {failed} failed, {total_bytes} bytes "
+          f"in {wall_seconds:.2f}s ({mb_per_s:.1f} MB/s)")
+    print(S3_METRICS.report())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Add the processed flag to raw datasets")
+    parser.add_argument("--keys", nargs="+", help="Raw keys to process")
+    parser.add_argument("--prefix", help="Process every object under this raw prefix")
+    parser.add_argument("--processed-prefix", help="Prefix for processed objects")
+    parser.add_argument("--workers", type=int, help="Objects processed concurrently")
+    args = parser.parse_args()
+
+    if args.keys is None and args.prefix is None:
+        run_pipeline()
+        print(S3_METRICS.report())
+        return
+
+    start = time.perf_counter()
+    results = run_pipeline_many(
+        raw_keys=args.keys,
+        raw_prefix=args.prefix,
+        processed_prefix=args.processed_prefix,
+        max_workers=args.workers,
+    )
+    print_report(results, time.perf_counter() - start)
+
+    if any(r.error is not None for r in results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
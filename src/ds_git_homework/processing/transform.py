@@ -1,18 +1,37 @@
 import csv
+import io
 from pathlib import Path
+from typing import IO, Iterator
+
+
+def iter_processed_csv(f_in: IO[str], flush_chars: int = 64 * 1024) -> Iterator[str]:
+    """
+    Add the `processed` column row by row, yielding CSV text in pieces of
+    about `flush_chars` characters. Memory does not depend on input size.
+    """
+    reader = csv.DictReader(f_in)
+    fieldnames = list(reader.fieldnames or []) + ["processed"]
+
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=fieldnames)
+    writer.writeheader()
+
+    for row in reader:
+        row["processed"] = "1"
+        writer.writerow(row)
+        if buf.tell() >= flush_chars:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+
+    if buf.tell():
+        yield buf.getvalue()
 
 
 def add_processed_flag(in_csv: Path, out_csv: Path) -> None:
     out_csv.parent.mkdir(parents=True, exist_ok=True)
 
     with in_csv.open("r", newline="", encoding="utf-8") as f_in:
-        reader = csv.DictReader(f_in)
-        fieldnames = list(reader.fieldnames or []) + ["processed"]
-
         with out_csv.open("w", newline="", encoding="utf-8") as f_out:
-            writer = csv.DictWriter(f_out, fieldnames=fieldnames)
-            writer.writeheader()
-
-            for row in reader:
-                row["processed"] = "1"
-                writer.writerow(row)
+            for chunk in iter_processed_csv(f_in):
+                f_out.write(chunk)
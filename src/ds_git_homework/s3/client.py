@@ -1,7 +1,9 @@
 import os
-from dataclasses import dataclass
+import threading
+import time
+from dataclasses import dataclass, replace
+from functools import lru_cache
 from typing import Any
-import boto3
 
 
 @dataclass(frozen=True)
@@ -9,19 +11,194 @@ class S3Config:
     endpoint_url: str
     access_key: str
     secret_key: str
+    max_pool_connections: int = 10
+    # "adaptive" adds client-side rate limiting on throttling to the
+    # exponential backoff of "standard".
+    retry_mode: str = "adaptive"
+    max_attempts: int = 5
+    connect_timeout: float = 5.0
+    read_timeout: float = 60.0
+    tcp_keepalive: bool = True
+
+
+def _env(*names: str, default: str | None = None) -> str:
+    for name in names:
+        value = os.environ.get(name)
+        if value:
+            return value
+    if default is None:
+        raise KeyError(f"None of {', '.join(names)} is set")
+    return default
 
 
 def load_s3_config_from_env() -> S3Config:
-    endpoint_url = os.environ["S3_ENDPOINT_URL"]
-    access_key = os.environ["S3_ACCESS_KEY"]
-    secret_key = os.environ["S3_SECRET_KEY"]
-    return S3Config(endpoint_url=endpoint_url, access_key=access_key, secret_key=secret_key)
+    """
+    S3/MinIO settings from the environment. Credentials are read from
+    S3_ACCESS_KEY/S3_SECRET_KEY or AWS_ACCESS_KEY_ID/AWS_SECRET_ACCESS_KEY.
+    """
+    return S3Config(
+        endpoint_url=_env("S3_ENDPOINT_URL", "MLFLOW_S3_ENDPOINT_URL"),
+        access_key=_env("S3_ACCESS_KEY", "AWS_ACCESS_KEY_ID"),
+        secret_key=_env("S3_SECRET_KEY", "AWS_SECRET_ACCESS_KEY"),
+        max_pool_connections=int(_env("S3_MAX_POOL_CONNECTIONS", default="10")),
+        retry_mode=_env("S3_RETRY_MODE", default="adaptive"),
+        max_attempts=int(_env("S3_MAX_ATTEMPTS", default="5")),
+    )
 
 
-def make_s3_client(cfg: S3Config) -> Any:
-    return boto3.client(
-        service_name="s3",
-        endpoint_url=cfg.endpoint_url,
+# ---------------------------------------------------------------------
+# Instrumentation
+# ---------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class OperationStats:
+    calls: int = 0
+    errors: int = 0
+    seconds: float = 0.0
+    max_seconds: float = 0.0
+    bytes_sent: int = 0
+    bytes_received: int = 0
+
+
+def _body_size(body: Any) -> int:
+    if body is None:
+        return 0
+    if isinstance(body, (bytes, bytearray, str)):
+        return len(body)
+    try:
+        # File-like bodies (botocore wraps bytes in BytesIO): bytes left to send.
+        pos = body.tell()
+        end = body.seek(0, os.SEEK_END)
+        body.seek(pos)
+        return int(end - pos)
+    except (AttributeError, OSError, ValueError):
+        return 0
+
+
+class S3Metrics:
+    """
+    Per-operation call counts, errors, latency and bytes, collected through
+    botocore's before-call/after-call events. Latency covers retries and
+    lasts until the response headers are parsed (a GetObject body is
+    streamed afterwards).
+    """
+
+    _START = "ds_git_homework_start"
+    _SENT = "ds_git_homework_sent"
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._ops: dict[str, OperationStats] = {}
+
+    def register(self, client: Any) -> None:
+        events = client.meta.events
+        events.register("before-call.s3", self._before_call)
+        events.register("after-call.s3", self._after_call)
+        events.register("after-call-error.s3", self._after_call_error)
+
+    def _before_call(self, params: dict[str, Any], context: dict[str, Any], **kwargs: Any) -> None:
+        context[self._START] = time.perf_counter()
+        context[self._SENT] = _body_size(params.get("body"))
+
+    def _after_call(
+        self,
+        http_response: Any,
+        parsed: dict[str, Any],
+        model: Any,
+        context: dict[str, Any],
+        **kwargs: Any,
+    ) -> None:
+        received = int(parsed.get("ContentLength", 0)) if model.has_streaming_output else 0
+        self._record(model.name, context, http_response.status_code >= 300, received)
+
+    def _after_call_error(self, context: dict[str, Any], event_name: str, **kwargs: Any) -> None:
+        self._record(event_name.rsplit(".", 1)[-1], context, True, 0)
+
+    def _record(self, operation: str, context: dict[str, Any], error: bool, received: int) -> None:
+        start = context.pop(self._START, None)
+        if start is None:
+            return
+        seconds = time.perf_counter() - start
+        sent = int(context.pop(self._SENT, 0))
+
+        with self._lock:
+            old = self._ops.get(operation, OperationStats())
+            self._ops[operation] = replace(
+                old,
+                calls=old.calls + 1,
+                errors=old.errors + error,
+                seconds=old.seconds + seconds,
+                max_seconds=max(old.max_seconds, seconds),
+                bytes_sent=old.bytes_sent + sent,
+                bytes_received=old.bytes_received + received,
+            )
+
+    def snapshot(self) -> dict[str, OperationStats]:
+        with self._lock:
+            return dict(self._ops)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._ops.clear()
+
+    def report(self) -> str:
+        lines = []
+        for op, s in sorted(self.snapshot().items()):
+            lines.append(
+                f"{op}: {s.calls} calls, {s.errors} errors, "
+                f"avg {s.seconds / s.calls * 1000:.1f} ms, max {s.max_seconds * 1000:.1f} ms, "
+                f"{s.bytes_sent / 2**20:.1f} MiB sent, {s.bytes_received / 2**20:.1f} MiB received"
+            )
+        return "\n".join(lines)
+
+
+S3_METRICS = S3Metrics()
+
+
+# ---------------------------------------------------------------------
+# Clients
+# ---------------------------------------------------------------------
+
+
+def make_s3_client(cfg: S3Config, metrics: S3Metrics | None = S3_METRICS) -> Any:
+    # boto3 is imported lazily: it is slow to import and not every caller
+    # (e.g. a server starting from a local model cache) needs a client.
+    import boto3
+    from botocore.config import Config
+
+    session = boto3.session.Session(
         aws_access_key_id=cfg.access_key,
         aws_secret_access_key=cfg.secret_key,
     )
+    client = session.client(
+        service_name="s3",
+        endpoint_url=cfg.endpoint_url,
+        config=Config(
+            max_pool_connections=cfg.max_pool_connections,
+            retries={"mode": cfg.retry_mode, "total_max_attempts": cfg.max_attempts},
+            connect_timeout=cfg.connect_timeout,
+            read_timeout=cfg.read_timeout,
+            tcp_keepalive=cfg.tcp_keepalive,
+        ),
+    )
+    if metrics is not None:
+        metrics.register(client)
+    return client
+
+
+@lru_cache(maxsize=None)
+def get_s3_client(cfg: S3Config) -> Any:
+    """
+    One shared session and client per config. boto3 clients are thread-safe,
+    so all callers reuse its pool of warm keep-alive connections instead of
+    paying for new connections and handshakes.
+    """
+    return make_s3_client(cfg)
+
+
+# A forked child (e.g. a pre-forked serving worker) must not reuse the
+# parent's client: its pooled keep-alive sockets would be shared by both
+# processes, interleaving their requests and responses on one connection.
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=get_s3_client.cache_clear)
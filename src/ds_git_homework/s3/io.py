@@ -1,5 +1,110 @@
+import io
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any
+from typing import IO, Any, Iterable
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+# S3 requires every part but the last to be at least 5 MiB.
+MIN_PART_SIZE = 5 * 1024 * 1024
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+
+
+@dataclass(frozen=True)
+class TransferProfile:
+    """
+    How large objects are moved: objects above `threshold` bytes are split
+    into `part_size` parts, transferred `max_concurrency` at a time.
+    """
+
+    part_size: int = DEFAULT_PART_SIZE
+    max_concurrency: int = 10
+    threshold: int = DEFAULT_PART_SIZE
+
+    def __post_init__(self) -> None:
+        if self.part_size < 1 or self.max_concurrency < 1:
+            raise ValueError("part_size and max_concurrency must be positive")
+
+    def transfer_config(self) -> Any:
+        from boto3.s3.transfer import TransferConfig
+
+        return TransferConfig(
+            multipart_threshold=self.threshold,
+            multipart_chunksize=max(self.part_size, MIN_PART_SIZE),
+            max_concurrency=self.max_concurrency,
+            use_threads=self.max_concurrency > 1,
+        )
+
+
+def load_transfer_profile_from_env() -> TransferProfile:
+    mib = 1024 * 1024
+    return TransferProfile(
+        part_size=int(float(os.environ.get("S3_PART_SIZE_MB", "8")) * mib),
+        max_concurrency=int(os.environ.get("S3_MAX_CONCURRENCY", "10")),
+        threshold=int(float(os.environ.get("S3_MULTIPART_THRESHOLD_MB", "8")) * mib),
+    )
+
+
+@dataclass(frozen=True)
+class TransferStats:
+    direction: str
+    uri: str
+    bytes: int
+    seconds: float
+    parts: int
+
+    @property
+    def mib_per_s(self) -> float:
+        return self.bytes / 2**20 / self.seconds if self.seconds > 0 else math.inf
+
+    def __str__(self) -> str:
+        return (
+            f"{self.direction} {self.uri}: {self.bytes / 2**20:.1f} MiB in "
+            f"{self.seconds:.2f}s ({self.mib_per_s:.1f} MiB/s, {self.parts} part(s))"
+        )
+
+
+def _preallocate(fd: int, size: int) -> None:
+    try:
+        os.posix_fallocate(fd, 0, size)
+    except (AttributeError, OSError):
+        # Not supported by the platform or filesystem: a sparse file will do.
+        os.ftruncate(fd, size)
+
+
+def _pwrite_all(fd: int, data: bytes, offset: int) -> None:
+    view = memoryview(data)
+    while view:
+        written = os.pwrite(fd, view, offset)
+        view = view[written:]
+        offset += written
+
+
+def _download_range(
+    s3_client: Any,
+    bucket: str,
+    key: str,
+    etag: str | None,
+    fd: int,
+    start: int,
+    end: int,
+) -> None:
+    request: dict[str, Any] = {"Bucket": bucket, "Key": key, "Range": f"bytes={start}-{end}"}
+    if etag:
+        # Fail instead of mixing parts of two versions if the object changes.
+        request["IfMatch"] = f'"{etag}"'
+    body = s3_client.get_object(**request)["Body"]
+
+    offset = start
+    for chunk in iter(lambda: body.read(DEFAULT_CHUNK_SIZE), b""):
+        _pwrite_all(fd, chunk, offset)
+        offset += len(chunk)
+
+    if offset != end + 1:
+        raise RuntimeError(f"Short read of s3://{bucket}/{key} bytes {start}-{end}")
 
 
 def download_file(
@@ -7,9 +112,63 @@ def download_file(
     bucket: str,
     key: str,
     dst: Path,
-) -> None:
+    profile: TransferProfile | None = None,
+    size: int | None = None,
+    etag: str | None = None,
+) -> TransferStats:
+    """
+    Download an object to `dst`. Objects above the profile's threshold are
+    fetched as parallel byte ranges written in place into a preallocated
+    file, which appears at `dst` only once complete. `size`/`etag` from an
+    earlier HEAD request save another one; all GETs are pinned to the etag.
+    """
+    profile = profile or load_transfer_profile_from_env()
     dst.parent.mkdir(parents=True, exist_ok=True)
-    s3_client.download_file(bucket, key, str(dst))
+    start_time = time.perf_counter()
+
+    if size is None:
+        head = s3_client.head_object(Bucket=bucket, Key=key)
+        size = int(head["ContentLength"])
+        etag = str(head["ETag"]).strip('"') or None
+
+    if size <= profile.threshold and not (etag and size):
+        s3_client.download_file(bucket, key, str(dst), Config=profile.transfer_config())
+        parts = 1
+    else:
+        # boto3's download_file cannot send IfMatch, so an object at or below
+        # the threshold with a known ETag is fetched as one range instead.
+        part_size = profile.part_size if size > profile.threshold else size
+        ranges = [
+            (start, min(start + part_size, size) - 1)
+            for start in range(0, size, part_size)
+        ]
+        parts = len(ranges)
+        tmp = dst.with_name(dst.name + ".download")
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            _preallocate(fd, size)
+            with ThreadPoolExecutor(max_workers=min(profile.max_concurrency, parts)) as pool:
+                futures = [
+                    pool.submit(_download_range, s3_client, bucket, key, etag, fd, start, end)
+                    for start, end in ranges
+                ]
+                try:
+                    for future in futures:
+                        future.result()
+                except BaseException:
+                    # No point fetching the remaining ranges.
+                    pool.shutdown(cancel_futures=True)
+                    raise
+        except BaseException:
+            os.close(fd)
+            tmp.unlink(missing_ok=True)
+            raise
+        os.close(fd)
+        os.replace(tmp, dst)
+
+    return TransferStats(
+        "download", f"s3://{bucket}/{key}", size, time.perf_counter() - start_time, parts
+    )
 
 
 def upload_file(
@@ -17,5 +176,99 @@ def upload_file(
     bucket: str,
     key: str,
     src: Path,
-) -> None:
-    s3_client.upload_file(str(src), bucket, key)
+    profile: TransferProfile | None = None,
+) -> TransferStats:
+    """
+    Upload a file, as a parallel multipart upload above the profile's threshold.
+    """
+    profile = profile or load_transfer_profile_from_env()
+    size = src.stat().st_size
+    start_time = time.perf_counter()
+
+    s3_client.upload_file(str(src), bucket, key, Config=profile.transfer_config())
+
+    part_size = max(profile.part_size, MIN_PART_SIZE)
+    parts = math.ceil(size / part_size) if size > profile.threshold else 1
+    return TransferStats(
+        "upload", f"s3://{bucket}/{key}", size, time.perf_counter() - start_time, parts
+    )
+
+
+def open_text_stream(
+    s3_client: Any,
+    bucket: str,
+    key: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> IO[str]:
+    """
+    Open an S3 object as a text stream read from the network in chunks of
+    `chunk_size` bytes. Newlines are left untranslated, as `csv` expects.
+    """
+    body = s3_client.get_object(Bucket=bucket, Key=key)["Body"]
+    return io.TextIOWrapper(
+        io.BufferedReader(body, buffer_size=chunk_size),
+        encoding="utf-8",
+        newline="",
+    )
+
+
+def upload_stream(
+    s3_client: Any,
+    bucket: str,
+    key: str,
+    chunks: Iterable[bytes],
+    part_size: int = DEFAULT_PART_SIZE,
+) -> int:
+    """
+    Upload an iterable of byte chunks with a multipart upload, holding at
+    most about one part in memory. Returns the number of bytes uploaded.
+    Objects smaller than one part are sent with a single PUT.
+    """
+    if part_size < MIN_PART_SIZE:
+        raise ValueError(f"part_size must be at least {MIN_PART_SIZE} bytes")
+
+    buf = bytearray()
+    total = 0
+    upload_id: str | None = None
+    parts: list[dict[str, Any]] = []
+
+    def flush(data: bytes) -> None:
+        nonlocal upload_id
+        if upload_id is None:
+            upload_id = s3_client.create_multipart_upload(Bucket=bucket, Key=key)["UploadId"]
+        number = len(parts) + 1
+        response = s3_client.upload_part(
+            Bucket=bucket,
+            Key=key,
+            UploadId=upload_id,
+            PartNumber=number,
+            Body=data,
+        )
+        parts.append({"ETag": response["ETag"], "PartNumber": number})
+
+    try:
+        for chunk in chunks:
+            buf += chunk
+            total += len(chunk)
+            while len(buf) >= part_size:
+                flush(bytes(buf[:part_size]))
+                del buf[:part_size]
+
+        if upload_id is None:
+            s3_client.put_object(Bucket=bucket, Key=key, Body=bytes(buf))
+            return total
+
+        if buf:
+            flush(bytes(buf))
+        s3_client.complete_multipart_upload(
+            Bucket=bucket,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={"Parts": parts},
+        )
+    except BaseException:
+        if upload_id is not None:
+            s3_client.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+        raise
+
+    return total
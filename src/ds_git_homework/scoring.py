@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Any, Callable, Iterator
+
+import numpy as np
+import pandas as pd
+
+from ds_git_homework.s3.client import get_s3_client, load_s3_config_from_env
+from ds_git_homework.s3.io import open_text_stream, upload_file
+from ds_git_homework.serving.features import FEATURES, encode_frame
+from ds_git_homework.serving.model_loader import (
+    ModelRef,
+    get_best_run_id,
+    load_model_manifest,
+    load_serving_model,
+    resolve_model_ref,
+)
+
+PREDICTION_COLUMN = "prediction"
+
+
+@dataclass(frozen=True)
+class ScoreResult:
+    run_id: str
+    rows: int
+    seconds: float
+
+    @property
+    def rows_per_s(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+
+def resolve_scoring_ref(
+    experiment_name: str,
+    metric_name: str,
+    run_id: str | None = None,
+    manifest: Path | None = None,
+) -> ModelRef:
+    """
+    Model to score with: a serving manifest, else run_id, else the best run
+    of the experiment by metric_name.
+    """
+    if manifest is not None:
+        return load_model_manifest(manifest)
+    if run_id is None:
+        run_id = get_best_run_id(experiment_name, metric_name)
+    return resolve_model_ref(experiment_name=experiment_name, run_id=run_id)
+
+
+def _split_s3_uri(uri: str) -> tuple[str, str] | None:
+    if not uri.startswith("s3://"):
+        return None
+    bucket, key = uri[len("s3://"):].split("/", 1)
+    return bucket, key
+
+
+# -------------------------
+# Input and output
+# -------------------------
+
+def _open_input(uri: str) -> IO[str]:
+    location = _split_s3_uri(uri)
+    if location is None:
+        return open(uri, encoding="utf-8", newline="")
+    s3 = get_s3_client(load_s3_config_from_env())
+    return open_text_stream(s3, bucket=location[0], key=location[1])
+
+
+def read_chunks(src: IO[str], chunk_rows: int, keep: list[str]) -> Iterator[pd.DataFrame]:
+    """
+    Read the FEATURES and keep columns of a CSV in chunks of chunk_rows rows.
+    """
+    columns = list(dict.fromkeys(FEATURES + keep))
+    with pd.read_csv(src, usecols=columns, chunksize=chunk_rows) as reader:
+        yield from reader
+
+
+class ChunkWriter:
+    """
+    Append scored chunks to a CSV, or to a Parquet file (one row group per
+    chunk) when the path ends in .parquet.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.parquet = path.suffix == ".parquet"
+        self._writer: Any = None
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if not self.parquet:
+            self._file: IO[str] = path.open("w", encoding="utf-8", newline="")
+
+    def write(self, df: pd.DataFrame) -> None:
+        if not self.parquet:
+            df.to_csv(self._file, index=False, header=self._file.tell() == 0)
+            return
+
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as exc:
+            raise RuntimeError("Parquet output needs pyarrow: pip install pyarrow") from exc
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, table.schema)
+        self._writer.write_table(table)
+
+    def close(self) -> None:
+        if self.parquet:
+            if self._writer is not None:
+                self._writer.close()
+        else:
+            self._file.close()
+
+
+# -------------------------
+# Scoring
+# -------------------------
+
+# Set in each pool worker by _init_worker, so the model is sent once per
+# worker rather than with every chunk.
+_MODEL: Any = None
+
+
+def _init_worker(model: Any) -> None:
+    global _MODEL
+    _MODEL = model
+
+
+def score_chunk(chunk: pd.DataFrame, keep: list[str], model: Any = None) -> pd.DataFrame:
+    """
+    Encode a chunk the way serving does and return its keep columns with
+    the predictions.
+    """
+    model = _MODEL if model is None else model
+    predictions = np.asarray(model.predict(encode_frame(chunk)))
+    out = chunk[keep].reset_index(drop=True)
+    out[PREDICTION_COLUMN] = predictions
+    return out
+
+
+def score_file(
+    model_ref: ModelRef,
+    input_uri: str,
+    output_uri: str,
+    keep: list[str] | None = None,
+    chunk_rows: int = 100_000,
+    workers: int = 1,
+    compile: bool = True,
+    on_chunk: Callable[[int], None] | None = None,
+) -> ScoreResult:
+    """
+    Score a CSV (local or s3://) with a run's model and write the keep
+    columns plus predictions, in input order, to a CSV or Parquet file
+    (local or s3://).
+
+    Chunks are scored on `workers` processes. At most two chunks per worker
+    are in flight, so memory is bounded whatever the input size.
+    ``on_chunk`` is called with the row count of every chunk written.
+    """
+    keep = keep or []
+    model = load_serving_model(model_ref, compile=compile)
+
+    destination = _split_s3_uri(output_uri)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        local_output = (
+            Path(output_uri) if destination is None
+            else Path(tmp_dir) / Path(destination[1]).name
+        )
+        start = time.perf_counter()
+        rows = _score_to(model, input_uri, local_output, keep, chunk_rows, workers, on_chunk)
+        seconds = time.perf_counter() - start
+
+        if destination is not None:
+            s3 = get_s3_client(load_s3_config_from_env())
+            print(upload_file(s3, bucket=destination[0], key=destination[1], src=local_output))
+
+    return ScoreResult(run_id=model_ref.run_id, rows=rows, seconds=seconds)
+
+
+def _score_to(
+    model: Any,
+    input_uri: str,
+    output: Path,
+    keep: list[str],
+    chunk_rows: int,
+    workers: int,
+    on_chunk: Callable[[int], None] | None,
+) -> int:
+    rows = 0
+    writer = ChunkWriter(output)
+    try:
+        with _open_input(input_uri) as src:
+            chunks = read_chunks(src, chunk_rows, keep)
+            for scored in _score_chunks(model, chunks, keep, workers):
+                writer.write(scored)
+                rows += len(scored)
+                if on_chunk is not None:
+                    on_chunk(len(scored))
+    finally:
+        writer.close()
+    return rows
+
+
+def _score_chunks(
+    model: Any, chunks: Iterator[pd.DataFrame], keep: list[str], workers: int
+) -> Iterator[pd.DataFrame]:
+    if workers <= 1:
+        for chunk in chunks:
+            yield score_chunk(chunk, keep, model)
+        return
+
+    pending: deque[Future[pd.DataFrame]] = deque()
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(model,)) as pool:
+        for chunk in chunks:
+            pending.append(pool.submit(score_chunk, chunk, keep))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
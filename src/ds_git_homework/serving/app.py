@@ -1,26 +1,99 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import os
-from typing import Any
+import random
+import time
+from dataclasses import dataclass, field
+from functools import partial
+from pathlib import Path
+from typing import Any, cast
 
-import pandas as pd
-from fastapi import FastAPI, HTTPException
+import numpy as np
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 
+from ds_git_homework.s3.client import S3_METRICS
+from ds_git_homework.serving.batching import MicroBatcher
+from ds_git_homework.serving.cache import CacheStats, PredictionCache
+from ds_git_homework.serving.features import FEATURES, encode_sex
+from ds_git_homework.serving.metrics import (
+    REGISTRY,
+    Counter,
+    Gauge,
+    MetricsMiddleware,
+    current_timer,
+)
 from ds_git_homework.serving.model_loader import (
+    ModelRef,
+    ModelRegistry,
+    check_name,
     get_best_run_id,
-    load_model_from_s3,
+    load_model_manifest,
+    load_serving_model,
+    model_nbytes,
     resolve_model_ref,
 )
+from ds_git_homework.serving.streaming import CONTENT_TYPES, PredictionStream
 
 # ---------------------------------------------------------------------
 # App
 # ---------------------------------------------------------------------
 
 app = FastAPI(title="ds_git_homework model serving")
+app.add_middleware(MetricsMiddleware)
+
+COMPILE_TREE = os.environ.get("SERVE_COMPILE_TREE", "1") != "0"
+MAX_BATCH_SIZE = int(os.environ.get("SERVE_MAX_BATCH_SIZE", "1024"))
+STREAM_CHUNK_ROWS = int(os.environ.get("SERVE_STREAM_CHUNK_ROWS", "8192"))
+
+MICROBATCH_ENABLED = os.environ.get("SERVE_MICROBATCH", "1") != "0"
+MICROBATCH_MAX_SIZE = int(os.environ.get("SERVE_MICROBATCH_MAX_SIZE", "64"))
+MICROBATCH_MAX_WAIT_MS = float(os.environ.get("SERVE_MICROBATCH_MAX_WAIT_MS", "0.5"))
+BATCHER: MicroBatcher | None = None
+
+CACHE_SIZE = int(os.environ.get("SERVE_CACHE_SIZE", "10000"))
+CACHE: PredictionCache | None = PredictionCache(CACHE_SIZE) if CACHE_SIZE > 0 else None
+
+MODEL_INFO = Gauge("model_info", "Run currently being served", ("run_id",))
+MODEL_LOAD_SECONDS = Gauge("model_load_seconds", "Time it took to load the served model")
+MODEL_LOADED_AT = Gauge("model_loaded_timestamp_seconds", "When the served model was loaded")
+# Mirrors PredictionCache.stats() at scrape time; typed as a counter for Prometheus.
+CACHE_EVENTS = Counter("prediction_cache_events_total", "Prediction cache events", ("event",))
+# Mirror S3_METRICS (model downloads) at scrape time.
+S3_CALLS = Counter("s3_requests_total", "S3 API calls by operation", ("operation",))
+S3_ERRORS = Counter("s3_request_errors_total", "Failed S3 API calls", ("operation",))
+S3_SECONDS = Counter(
+    "s3_request_seconds_total", "Time spent in S3 API calls", ("operation",)
+)
+S3_BYTES = Counter(
+    "s3_bytes_total", "Bytes sent and received by S3 calls", ("operation", "direction")
+)
+# Mirror MODELS.stats() and MODELS.loaded() at scrape time.
+MODEL_REQUESTS = Counter("model_requests_total", "Requests served per run", ("run_id",))
+MODEL_REQUEST_SECONDS = Counter(
+    "model_request_seconds_total", "Time spent serving requests per run", ("run_id",)
+)
+MODEL_LOADS = Counter("model_registry_loads_total", "Registry model loads", ("run_id",))
+MODEL_EVICTIONS = Counter(
+    "model_registry_evictions_total", "Registry model evictions", ("run_id",)
+)
+MODEL_RESIDENT_BYTES = Gauge(
+    "model_registry_resident_bytes", "Estimated size of models loaded in the registry",
+    ("run_id",),
+)
+for _metric in (
+    MODEL_INFO, MODEL_LOAD_SECONDS, MODEL_LOADED_AT, CACHE_EVENTS,
+    S3_CALLS, S3_ERRORS, S3_SECONDS, S3_BYTES,
+    MODEL_REQUESTS, MODEL_REQUEST_SECONDS, MODEL_LOADS, MODEL_EVICTIONS, MODEL_RESIDENT_BYTES,
+):
+    REGISTRY.register(_metric)
 
-MODEL: Any | None = None
-FEATURES = ["Pclass", "Sex", "Age", "SibSp", "Parch", "Fare"]
+POLL_INTERVAL_S = float(os.environ.get("SERVE_POLL_INTERVAL_S", "0"))
+POLLER: asyncio.Task[None] | None = None
 
 # ---------------------------------------------------------------------
 # Schemas
@@ -40,8 +113,290 @@ class PredictResponse(BaseModel):
     prediction: int
 
 
+class PredictBatchRequest(BaseModel):
+    rows: list[PredictRequest]
+
+
+class PredictBatchResponse(BaseModel):
+    predictions: list[int]
+
+
 class HealthResponse(BaseModel):
     status: str
+    run_id: str | None = None
+    cache: CacheStats | None = None
+    # Runs loaded in the registry besides the default one.
+    models: list[str] = []
+
+
+# ---------------------------------------------------------------------
+# Served model
+# ---------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class ServedModel:
+    run_id: str
+    model: Any
+    loaded_at: float
+    # Seconds spent in each loading stage, e.g. {"load": 0.03, "warmup": 0.001}
+    timings: dict[str, float] = field(default_factory=dict)
+
+
+# Replaced as a whole on every swap, so readers never need a lock:
+# they take one reference and use its model and run_id together.
+SERVED: ServedModel | None = None
+
+
+def _experiment_name() -> str:
+    return os.environ.get("SERVE_EXPERIMENT", "titanic_tree")
+
+
+def _manifest() -> ModelRef | None:
+    manifest_path = os.environ.get("SERVE_MODEL_MANIFEST")
+    if not manifest_path:
+        return None
+    return load_model_manifest(Path(manifest_path))
+
+
+def _target_run_id() -> str:
+    """
+    Run that should be served: SERVE_MODEL_MANIFEST or SERVE_RUN_ID_FILE
+    (both re-read on every poll), then SERVE_RUN_ID, then the best run of
+    the experiment.
+    """
+    manifest = _manifest()
+    if manifest is not None:
+        return manifest.run_id
+
+    run_id_file = os.environ.get("SERVE_RUN_ID_FILE")
+    if run_id_file:
+        run_id = Path(run_id_file).read_text(encoding="utf-8").strip()
+        if run_id:
+            return run_id
+
+    env_run_id = os.environ.get("SERVE_RUN_ID")
+    if env_run_id is not None:
+        return env_run_id
+
+    metric_name = os.environ.get("SERVE_METRIC", "accuracy")
+    return get_best_run_id(_experiment_name(), metric_name)
+
+
+def _resolve_ref(experiment_name: str | None, run_id: str) -> ModelRef:
+    manifest = _manifest()
+    if (
+        manifest is not None
+        and manifest.run_id == run_id
+        and experiment_name in (None, manifest.experiment_name)
+    ):
+        return manifest
+    return resolve_model_ref(experiment_name=experiment_name, run_id=run_id)
+
+
+def _load_served_model(run_id: str, timings: dict[str, float]) -> ServedModel:
+    """
+    Load, compile and warm up a run's model off the request path.
+    """
+    start = time.perf_counter()
+    # The served run is set by the operator: accept it whatever its experiment.
+    model_ref = _resolve_ref(None, run_id)
+    timings["resolve_ref"] = time.perf_counter() - start
+    return _warm_model(model_ref, timings)
+
+
+def _warm_model(model_ref: ModelRef, timings: dict[str, float]) -> ServedModel:
+    start = time.perf_counter()
+    model = load_serving_model(model_ref, compile=COMPILE_TREE)
+    timings["load"] = time.perf_counter() - start
+
+    # First calls pay for lazy imports and allocations; do that here.
+    start = time.perf_counter()
+    model.predict(np.zeros((1, len(FEATURES))))
+    model.predict(np.zeros((2, len(FEATURES))))
+    timings["warmup"] = time.perf_counter() - start
+
+    return ServedModel(
+        run_id=model_ref.run_id, model=model, loaded_at=time.time(), timings=timings
+    )
+
+
+def refresh_model() -> bool:
+    """
+    Swap in the target run if it differs from the one being served.
+    """
+    global SERVED
+
+    timings: dict[str, float] = {}
+    start = time.perf_counter()
+    run_id = _target_run_id()
+    timings["resolve_run"] = time.perf_counter() - start
+
+    current = SERVED
+    if current is not None and current.run_id == run_id:
+        return False
+
+    served = _load_served_model(run_id, timings)
+    SERVED = served
+
+    breakdown = " ".join(f"{name}={seconds:.3f}s" for name, seconds in timings.items())
+    print(f"Loaded run {run_id}: {breakdown} total={sum(timings.values()):.3f}s", flush=True)
+    return True
+
+
+async def _poll_model() -> None:
+    while True:
+        await asyncio.sleep(POLL_INTERVAL_S)
+        try:
+            if await run_in_threadpool(refresh_model):
+                served = SERVED
+                print(f"Now serving run {served.run_id if served else None}", flush=True)
+        except Exception as exc:
+            print(f"Model refresh failed, keeping current model: {exc!r}", flush=True)
+        # Experiments routed by name follow their best run at the same pace.
+        try:
+            for experiment_name, run_id in await run_in_threadpool(refresh_routes):
+                print(f"Now routing {experiment_name} to run {run_id}", flush=True)
+        except Exception as exc:
+            print(f"Route refresh failed, keeping current routes: {exc!r}", flush=True)
+
+
+# ---------------------------------------------------------------------
+# Model routing
+# ---------------------------------------------------------------------
+
+# Besides the default model, requests can name an experiment (its best run)
+# and/or a run with ?experiment=&run_id=, or be split between runs by weight.
+# Those models are loaded on first use and kept within SERVE_REGISTRY_MAX_MB.
+REGISTRY_MAX_MB = float(os.environ.get("SERVE_REGISTRY_MAX_MB", "512"))
+
+# (experiment, run_id): the experiment's best run when run_id is None, else
+# that run, checked to belong to the experiment unless that is None.
+Route = tuple[str | None, str | None]
+
+
+def _parse_split(spec: str) -> list[tuple[Route, float]]:
+    """
+    Parse SERVE_AB_SPLIT, e.g. "run-a=0.9,other_experiment/run-b=0.1".
+    Runs without an experiment belong to SERVE_EXPERIMENT.
+    """
+    split: list[tuple[Route, float]] = []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        target, _, weight = item.rpartition("=")
+        experiment, _, run_id = target.rpartition("/")
+        if not run_id or float(weight) <= 0:
+            raise ValueError(f"Invalid SERVE_AB_SPLIT entry: {item!r}")
+        split.append(((experiment or _experiment_name(), run_id), float(weight)))
+    return split
+
+
+AB_SPLIT = _parse_split(os.environ.get("SERVE_AB_SPLIT", ""))
+
+# Resolved routes, at most SERVE_MAX_ROUTES (oldest dropped first). Routes to
+# an experiment's best run are re-resolved by refresh_routes; routes naming a
+# run never change.
+MAX_ROUTES = int(os.environ.get("SERVE_MAX_ROUTES", "1024"))
+ROUTES: dict[Route, ModelRef] = {}
+
+
+def _load_routed_model(model_ref: ModelRef) -> ServedModel:
+    return _warm_model(model_ref, {})
+
+
+MODELS: ModelRegistry[ServedModel] = ModelRegistry(
+    load=_load_routed_model,
+    max_bytes=int(REGISTRY_MAX_MB * 1024 * 1024),
+    size_of=lambda served: model_nbytes(served.model),
+)
+
+
+def _choose_split(route_key: str | None) -> Route:
+    """
+    Pick a run of AB_SPLIT by weight. The same route_key always gets the same run.
+    """
+    if route_key is None:
+        point = random.random()
+    else:
+        digest = hashlib.blake2b(route_key.encode(), digest_size=8).digest()
+        point = int.from_bytes(digest, "big") / 2**64
+
+    total = sum(weight for _, weight in AB_SPLIT)
+    for route, weight in AB_SPLIT:
+        point -= weight / total
+        if point < 0:
+            return route
+    return AB_SPLIT[-1][0]
+
+
+def _resolve_route(route: Route) -> ModelRef:
+    model_ref = ROUTES.get(route)
+    if model_ref is None:
+        experiment_name, run_id = route
+        if run_id is None:
+            experiment_name = experiment_name or _experiment_name()
+            run_id = get_best_run_id(experiment_name, os.environ.get("SERVE_METRIC", "accuracy"))
+        model_ref = _resolve_ref(experiment_name, check_name(run_id, "run id"))
+        while len(ROUTES) >= MAX_ROUTES:
+            ROUTES.pop(next(iter(ROUTES)), None)
+        ROUTES[route] = model_ref
+    return model_ref
+
+
+def refresh_routes() -> list[tuple[str, str]]:
+    """
+    Re-resolve the routes to an experiment's best run and swap in those
+    whose best run changed. Returns the (experiment, new run) of each.
+    """
+    metric_name = os.environ.get("SERVE_METRIC", "accuracy")
+    changed = []
+    # Copy the keys: requests may add routes meanwhile.
+    for route in list(ROUTES):
+        experiment_name, run_id = route
+        if run_id is not None or experiment_name is None:
+            continue
+        best_run_id = get_best_run_id(experiment_name, metric_name)
+        current = ROUTES.get(route)
+        if current is not None and current.run_id != best_run_id:
+            ROUTES[route] = _resolve_ref(experiment_name, best_run_id)
+            changed.append((experiment_name, best_run_id))
+    return changed
+
+
+def is_routed(experiment: str | None, run_id: str | None) -> bool:
+    return experiment is not None or run_id is not None or bool(AB_SPLIT)
+
+
+def route_model(
+    experiment: str | None, run_id: str | None, route_key: str | None = None
+) -> ServedModel:
+    """
+    Model that should answer a request. Blocks while a model is loaded, so
+    call it off the event loop.
+    """
+    if experiment is None and run_id is None:
+        route = _choose_split(route_key)
+    elif run_id is None:
+        route = (experiment, None)
+    else:
+        # A run is served whatever its experiment, unless one is named.
+        route = (experiment, run_id)
+
+    try:
+        if experiment is not None:
+            check_name(experiment, "experiment")
+        model_ref = _resolve_route(route)
+    except Exception as exc:
+        raise HTTPException(status_code=404, detail=f"No model for {route}: {exc}") from exc
+
+    served = SERVED
+    if served is not None and served.run_id == model_ref.run_id:
+        return served
+    try:
+        return MODELS.get(model_ref)
+    except Exception as exc:
+        raise HTTPException(
+            status_code=503, detail=f"Failed to load run {model_ref.run_id}: {exc}"
+        ) from exc
 
 
 # ---------------------------------------------------------------------
@@ -51,23 +406,90 @@ class HealthResponse(BaseModel):
 
 @app.on_event("startup")
 def startup_load_model() -> None:
-    global MODEL
+    # Workers forked by serving/prefork.py inherit the model loaded by the parent.
+    if SERVED is None:
+        refresh_model()
 
-    experiment_name = os.environ.get("SERVE_EXPERIMENT", "titanic_tree")
-    metric_name = os.environ.get("SERVE_METRIC", "accuracy")
-    os.environ.get("S3_BUCKET", "datasets")
-    os.environ.get("MODEL_S3_PREFIX", "models")
 
-    run_id = os.environ.get("SERVE_RUN_ID")
-    if run_id is None:
-        run_id = get_best_run_id(experiment_name, metric_name)
+@app.on_event("startup")
+async def startup_poller() -> None:
+    global POLLER
+
+    if POLL_INTERVAL_S > 0:
+        POLLER = asyncio.get_running_loop().create_task(_poll_model())
+
+
+@app.on_event("shutdown")
+async def shutdown_poller() -> None:
+    global POLLER
+
+    task, POLLER = POLLER, None
+    if task is not None:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
 
-    model_ref = resolve_model_ref(
-        experiment_name=experiment_name,
-        run_id=run_id
+
+@app.on_event("startup")
+async def startup_batcher() -> None:
+    global BATCHER
+
+    if not MICROBATCH_ENABLED:
+        return
+
+    BATCHER = MicroBatcher(
+        predict_fn=_predict_array,
+        max_batch_size=MICROBATCH_MAX_SIZE,
+        max_wait_ms=MICROBATCH_MAX_WAIT_MS,
     )
+    BATCHER.start()
 
-    MODEL = load_model_from_s3(model_ref)
+
+@app.on_event("shutdown")
+async def shutdown_batcher() -> None:
+    global BATCHER
+
+    if BATCHER is not None:
+        await BATCHER.stop()
+        BATCHER = None
+
+
+# ---------------------------------------------------------------------
+# Feature encoding
+# ---------------------------------------------------------------------
+
+
+def encode_row(req: PredictRequest) -> tuple[float, ...]:
+    """
+    Encode one request in FEATURES order, the same way train.py does.
+    """
+    return (
+        float(req.Pclass),
+        encode_sex(req.Sex),
+        req.Age,
+        float(req.SibSp),
+        float(req.Parch),
+        req.Fare,
+    )
+
+
+def encode_rows(reqs: list[PredictRequest]) -> np.ndarray:
+    """
+    Encode requests straight into a (n_rows, len(FEATURES)) float array.
+    """
+    X = np.empty((len(reqs), len(FEATURES)), dtype=np.float64)
+    for i, req in enumerate(reqs):
+        X[i] = encode_row(req)
+    return X
+
+
+def _predict_array(X: np.ndarray) -> np.ndarray:
+    served = SERVED
+    if served is None:
+        raise RuntimeError("Model is not loaded")
+    return np.asarray(served.model.predict(X))
 
 
 # ---------------------------------------------------------------------
@@ -76,29 +498,174 @@ def startup_load_model() -> None:
 
 
 @app.post("/predict", response_model=PredictResponse)
-def predict(req: PredictRequest) -> PredictResponse:
-    if MODEL is None:
-        raise HTTPException(status_code=503, detail="Model is not loaded")
+async def predict(
+    req: PredictRequest,
+    experiment: str | None = None,
+    run_id: str | None = None,
+    route_key: str | None = None,
+) -> PredictResponse:
+    timer = current_timer()
+    timer.begin()
 
-    sex_num = 0 if req.Sex.lower() == "male" else 1
+    routed = is_routed(experiment, run_id)
+    if routed:
+        served = await run_in_threadpool(route_model, experiment, run_id, route_key)
+    else:
+        if SERVED is None:
+            raise HTTPException(status_code=503, detail="Model is not loaded")
+        served = SERVED
+    start = time.perf_counter()
 
-    row = {
-        "Pclass": req.Pclass,
-        "Sex": float(sex_num),
-        "Age": req.Age,
-        "SibSp": req.SibSp,
-        "Parch": req.Parch,
-        "Fare": req.Fare,
-    }
+    row = encode_row(req)
+    timer.lap("encode")
 
-    X = pd.DataFrame([row], columns=FEATURES)
-    pred = int(MODEL.predict(X)[0])
+    # The prediction cache and the batcher only serve the default model.
+    cache = CACHE if served is SERVED else None
+    pred = cache.get(served.run_id, row) if cache is not None else None
+    if pred is None:
+        X = np.array([row], dtype=np.float64)
+        if BATCHER is not None and not routed:
+            # The batch is scored by whichever model is current when it flushes.
+            pred = await BATCHER.submit(X[0])
+        else:
+            pred = int((await run_in_threadpool(served.model.predict, X))[0])
 
+        if cache is not None and SERVED is served:
+            cache.put(served.run_id, row, pred)
+    timer.lap("predict")
+
+    MODELS.record(served.run_id, time.perf_counter() - start)
+    timer.end()
     return PredictResponse(prediction=pred)
 
 
+@app.post("/predict_batch", response_model=PredictBatchResponse)
+def predict_batch(
+    req: PredictBatchRequest,
+    experiment: str | None = None,
+    run_id: str | None = None,
+    route_key: str | None = None,
+) -> PredictBatchResponse:
+    timer = current_timer()
+    timer.begin()
+
+    if is_routed(experiment, run_id):
+        served = route_model(experiment, run_id, route_key)
+    else:
+        if SERVED is None:
+            raise HTTPException(status_code=503, detail="Model is not loaded")
+        served = SERVED
+    start = time.perf_counter()
+
+    if len(req.rows) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch of {len(req.rows)} rows exceeds limit of {MAX_BATCH_SIZE}",
+        )
+
+    cache = CACHE if served is SERVED else None
+    if cache is None:
+        X = encode_rows(req.rows)
+        timer.lap("encode")
+        predictions = [int(p) for p in served.model.predict(X)] if req.rows else []
+        timer.lap("predict")
+    else:
+        rows = [encode_row(r) for r in req.rows]
+        timer.lap("encode")
+
+        # Only rows missing from the cache go through the model.
+        cached: list[int | None] = [cache.get(served.run_id, row) for row in rows]
+        missing = [i for i, p in enumerate(cached) if p is None]
+        if missing:
+            X = np.array([rows[i] for i in missing], dtype=np.float64)
+            for i, pred in zip(missing, served.model.predict(X)):
+                cached[i] = int(pred)
+                cache.put(served.run_id, rows[i], int(pred))
+        predictions = cast(list[int], cached)
+        timer.lap("predict")
+
+    MODELS.record(served.run_id, time.perf_counter() - start)
+    timer.end()
+    return PredictBatchResponse(predictions=predictions)
+
+
+@app.post("/predict_stream")
+async def predict_stream(
+    request: Request,
+    experiment: str | None = None,
+    run_id: str | None = None,
+    route_key: str | None = None,
+) -> PredictionStream:
+    """
+    Score an NDJSON or raw float32 body of any size (see serving/streaming.py)
+    in chunks of SERVE_STREAM_CHUNK_ROWS rows, streaming predictions back.
+    """
+    media_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    content_type = CONTENT_TYPES.get(media_type)
+    if content_type is None:
+        raise HTTPException(
+            status_code=415,
+            detail=f"Unsupported content type {media_type!r}, use one of {sorted(CONTENT_TYPES)}",
+        )
+
+    if is_routed(experiment, run_id):
+        served = await run_in_threadpool(route_model, experiment, run_id, route_key)
+    else:
+        if SERVED is None:
+            raise HTTPException(status_code=503, detail="Model is not loaded")
+        served = SERVED
+
+    return PredictionStream(
+        predict=served.model.predict,
+        content_type=content_type,
+        chunk_rows=STREAM_CHUNK_ROWS,
+        on_done=partial(MODELS.record, served.run_id),
+    )
+
+
 @app.get("/health", response_model=HealthResponse)
 def health() -> HealthResponse:
+    served = SERVED
     return HealthResponse(
-        status="ok" if MODEL is not None else "model_not_loaded"
+        status="ok" if served is not None else "model_not_loaded",
+        run_id=served.run_id if served is not None else None,
+        cache=CACHE.stats() if CACHE is not None else None,
+        models=[model_ref.run_id for model_ref in MODELS.loaded()],
+    )
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> PlainTextResponse:
+    served = SERVED
+    MODEL_INFO.clear()
+    if served is not None:
+        MODEL_INFO.set(1, served.run_id)
+        MODEL_LOAD_SECONDS.set(sum(served.timings.values()))
+        MODEL_LOADED_AT.set(served.loaded_at)
+
+    if CACHE is not None:
+        stats = CACHE.stats()
+        CACHE_EVENTS.set(stats.hits, "hit")
+        CACHE_EVENTS.set(stats.misses, "miss")
+        CACHE_EVENTS.set(stats.evictions, "eviction")
+
+    for op, s3_stats in S3_METRICS.snapshot().items():
+        S3_CALLS.set(s3_stats.calls, op)
+        S3_ERRORS.set(s3_stats.errors, op)
+        S3_SECONDS.set(s3_stats.seconds, op)
+        S3_BYTES.set(s3_stats.bytes_sent, op, "sent")
+        S3_BYTES.set(s3_stats.bytes_received, op, "received")
+
+    for model_run_id, model_stats in MODELS.stats().items():
+        MODEL_REQUESTS.set(model_stats.requests, model_run_id)
+        MODEL_REQUEST_SECONDS.set(model_stats.seconds, model_run_id)
+        MODEL_LOADS.set(model_stats.loads, model_run_id)
+        MODEL_EVICTIONS.set(model_stats.evictions, model_run_id)
+    MODEL_RESIDENT_BYTES.clear()
+    for model_ref, nbytes in MODELS.loaded().items():
+        MODEL_RESIDENT_BYTES.set(nbytes, model_ref.run_id)
+
+    return PlainTextResponse(
+        REGISTRY.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
     )
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+META_SUFFIX = ".meta.json"
+_CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class ArtifactMeta:
+    """
+    What we know about a cached artifact: the S3 object it came from
+    (ETag and size) and the checksum of the bytes written locally.
+    """
+
+    etag: str | None
+    size: int
+    sha256: str
+
+
+def file_digest(path: Path, algorithm: str = "sha256") -> str:
+    h = hashlib.new(algorithm)
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def meta_path(path: Path) -> Path:
+    return path.with_name(path.name + META_SUFFIX)
+
+
+def read_meta(path: Path) -> ArtifactMeta | None:
+    try:
+        data = json.loads(meta_path(path).read_text(encoding="utf-8"))
+        return ArtifactMeta(
+            etag=data["etag"],
+            size=int(data["size"]),
+            sha256=str(data["sha256"]),
+        )
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def write_meta(path: Path, meta: ArtifactMeta) -> None:
+    target = meta_path(path)
+    tmp = target.with_name(target.name + ".tmp")
+    tmp.write_text(json.dumps(asdict(meta)), encoding="utf-8")
+    os.replace(tmp, target)
+
+
+def is_cached(
+    path: Path,
+    etag: str | None = None,
+    size: int | None = None,
+) -> bool:
+    """
+    True if ``path`` holds an intact copy of the artifact.
+
+    The local bytes must match the checksum recorded when they were
+    downloaded. When ``etag``/``size`` come from a HEAD request they must
+    also match, otherwise the object changed remotely.
+    """
+    meta = read_meta(path)
+    if meta is None or not path.is_file():
+        return False
+    if etag is not None and meta.etag != etag:
+        return False
+    if size is not None and meta.size != size:
+        return False
+    if path.stat().st_size != meta.size:
+        return False
+    if file_digest(path) != meta.sha256:
+        return False
+
+    # Mark as recently used for eviction.
+    os.utime(meta_path(path))
+    return True
+
+
+def verify_download(path: Path, etag: str | None, size: int) -> ArtifactMeta:
+    """
+    Check a freshly downloaded file against the object's size and, for
+    single-part uploads (whose ETag is the MD5 of the body), its ETag.
+    """
+    actual_size = path.stat().st_size
+    if actual_size != size:
+        raise RuntimeError(
+            f"Downloaded {path} has {actual_size} bytes, expected {size}"
+        )
+
+    if etag is not None and len(etag) == 32 and "-" not in etag:
+        md5 = file_digest(path, "md5")
+        if md5 != etag:
+            raise RuntimeError(f"Checksum mismatch for {path}: md5 {md5} != ETag {etag}")
+
+    return ArtifactMeta(etag=etag, size=size, sha256=file_digest(path))
+
+
+def _dir_size(path: Path) -> int:
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+
+def _last_used(path: Path) -> float:
+    metas = list(path.glob(f"*{META_SUFFIX}"))
+    return max((m.stat().st_mtime for m in metas), default=path.stat().st_mtime)
+
+
+def evict_to_budget(root: Path, max_bytes: int, keep: Path) -> list[Path]:
+    """
+    Delete least recently used ``<root>/<run_id>`` directories until the
+    cache fits in ``max_bytes``. ``keep`` is never removed.
+    """
+    if not root.is_dir():
+        return []
+
+    run_dirs = [d for d in root.iterdir() if d.is_dir()]
+    sizes = {d: _dir_size(d) for d in run_dirs}
+    total = sum(sizes.values())
+
+    removed: list[Path] = []
+    keep = keep.resolve()
+    for d in sorted(run_dirs, key=_last_used):
+        if total <= max_bytes:
+            break
+        if d.resolve() == keep:
+            continue
+        shutil.rmtree(d, ignore_errors=True)
+        total -= sizes[d]
+        removed.append(d)
+
+    return removed
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Callable
+
+import numpy as np
+
+PredictFn = Callable[[np.ndarray], np.ndarray]
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent single-row predictions into one vectorized call.
+
+    Rows are collected until ``max_batch_size`` is reached or ``max_wait_ms``
+    has passed since the first row of the batch arrived. Rows that queue up
+    while a batch is being scored are picked up by the next batch without
+    waiting, so batches grow with load on their own.
+    """
+
+    def __init__(
+        self,
+        predict_fn: PredictFn,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 0.5,
+    ) -> None:
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be >= 1")
+        if max_wait_ms < 0:
+            raise ValueError("max_wait_ms must be >= 0")
+
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_s = max_wait_ms / 1000.0
+
+        self._queue: asyncio.Queue[tuple[np.ndarray, asyncio.Future[int]]] | None = None
+        self._task: asyncio.Task[None] | None = None
+        # Rows taken off the queue and not answered yet: the batch being
+        # collected or scored.
+        self._batch: list[tuple[np.ndarray, asyncio.Future[int]]] = []
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+        pending, self._batch = self._batch, []
+        queue, self._queue = self._queue, None
+        while queue is not None and not queue.empty():
+            pending.append(queue.get_nowait())
+        for _, fut in pending:
+            if not fut.done():
+                fut.set_exception(RuntimeError("Batcher stopped"))
+
+    async def submit(self, row: np.ndarray) -> int:
+        """
+        Queue one encoded row and wait for its prediction.
+        """
+        if self._queue is None:
+            raise RuntimeError("Batcher is not running")
+
+        fut: asyncio.Future[int] = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((row, fut))
+        return await fut
+
+    async def _collect(
+        self,
+        queue: asyncio.Queue[tuple[np.ndarray, asyncio.Future[int]]],
+        batch: list[tuple[np.ndarray, asyncio.Future[int]]],
+    ) -> None:
+        # Rows go straight into `batch`, so stop() sees them if cancelled here.
+        loop = asyncio.get_running_loop()
+        batch.append(await queue.get())
+        deadline = loop.time() + self.max_wait_s
+
+        while len(batch) < self.max_batch_size:
+            if not queue.empty():
+                batch.append(queue.get_nowait())
+                continue
+
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+    async def _run(self) -> None:
+        assert self._queue is not None
+        queue = self._queue
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch: list[tuple[np.ndarray, asyncio.Future[int]]] = []
+            self._batch = batch
+            await self._collect(queue, batch)
+            # Callers that went away (client disconnect) are not scored.
+            batch[:] = [(row, fut) for row, fut in batch if not fut.done()]
+            if not batch:
+                continue
+
+            X = np.stack([row for row, _ in batch])
+            try:
+                preds = await loop.run_in_executor(None, self.predict_fn, X)
+            except Exception as exc:
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(exc)
+                continue
+
+            for (_, fut), pred in zip(batch, preds):
+                if not fut.done():
+                    fut.set_result(int(pred))
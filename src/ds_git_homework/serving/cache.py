@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Hashable
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    max_size: int
+
+
+class PredictionCache:
+    """
+    Size-bounded LRU cache of predictions keyed on encoded feature tuples.
+
+    Every lookup carries the version of the model that would answer it. When
+    the version changes, all entries are dropped, so a swapped model never
+    serves predictions made by its predecessor.
+    """
+
+    def __init__(self, max_size: int = 10_000) -> None:
+        if max_size < 1:
+            raise ValueError("max_size must be >= 1")
+
+        self.max_size = max_size
+        self._entries: OrderedDict[Hashable, int] = OrderedDict()
+        self._version: Hashable = None
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, version: Hashable, key: Hashable) -> int | None:
+        with self._lock:
+            self._check_version(version)
+            value = self._entries.get(key)
+            if value is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def put(self, version: Hashable, key: Hashable, value: int) -> None:
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                size=len(self._entries),
+                max_size=self.max_size,
+            )
+
+    def _check_version(self, version: Hashable) -> None:
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class CompiledTree:
+    """
+    Flat-array copy of a fitted sklearn decision tree.
+
+    Leaves point to themselves, so every row can be walked ``max_depth``
+    steps without tracking which rows are already done. Predictions match
+    ``DecisionTreeClassifier.predict``: inputs are compared as float32
+    against float64 thresholds and NaNs follow ``missing_go_to_left``.
+    """
+
+    feature: np.ndarray
+    threshold: np.ndarray
+    children: np.ndarray
+    missing_left: np.ndarray
+    leaf_class: np.ndarray
+    max_depth: int
+    n_features_in_: int
+    classes_: np.ndarray
+
+    def predict(self, X: Any) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(
+                f"Expected input of shape (n, {self.n_features_in_}), got {X.shape}"
+            )
+
+        if X.shape[0] == 1:
+            return self.leaf_class[[self._walk_one(X[0])]]
+
+        n_rows, n_features = X.shape
+        flat = np.ascontiguousarray(X).ravel()
+        offsets = np.arange(n_rows, dtype=np.intp) * n_features
+        has_nan = bool(np.isnan(flat).any())
+
+        # children[2 * node] is the left child, children[2 * node + 1] the right one.
+        node = np.zeros(n_rows, dtype=np.intp)
+        for _ in range(self.max_depth):
+            x = flat.take(offsets + self.feature.take(node))
+            go_right = x > self.threshold.take(node)
+            if has_nan:
+                go_right |= np.isnan(x) & ~self.missing_left.take(node)
+            node = self.children.take(2 * node + go_right)
+
+        return self.leaf_class.take(node)
+
+    def _walk_one(self, x: np.ndarray) -> int:
+        node = 0
+        for _ in range(self.max_depth):
+            value = x[self.feature[node]]
+            if value != value:  # NaN
+                go_right = not self.missing_left[node]
+            else:
+                go_right = bool(value > self.threshold[node])
+            node = int(self.children[2 * node + go_right])
+        return node
+
+
+def compile_tree(model: Any) -> CompiledTree:
+    """
+    Build a CompiledTree from a fitted single-output DecisionTreeClassifier.
+    """
+    tree = model.tree_
+    if tree.n_outputs != 1:
+        raise ValueError("Only single-output trees can be compiled")
+
+    n_nodes = tree.node_count
+    node_ids = np.arange(n_nodes, dtype=np.intp)
+    is_leaf = tree.children_left == -1
+
+    children = np.empty(2 * n_nodes, dtype=np.intp)
+    children[0::2] = np.where(is_leaf, node_ids, tree.children_left)
+    children[1::2] = np.where(is_leaf, node_ids, tree.children_right)
+    feature = np.where(is_leaf, 0, tree.feature).astype(np.intp)
+
+    missing = getattr(tree, "missing_go_to_left", None)
+    if missing is None:
+        missing_left = np.zeros(n_nodes, dtype=bool)
+    else:
+        missing_left = np.asarray(missing, dtype=bool)
+
+    classes = np.asarray(model.classes_)
+    leaf_class = classes.take(np.argmax(tree.value[:, 0, :], axis=1))
+
+    return CompiledTree(
+        feature=feature,
+        threshold=np.asarray(tree.threshold, dtype=np.float64),
+        children=children,
+        missing_left=missing_left,
+        leaf_class=leaf_class,
+        max_depth=int(tree.max_depth),
+        n_features_in_=int(model.n_features_in_),
+        classes_=classes,
+    )
+
+
+def save_compiled_tree(tree: CompiledTree, path: Path) -> None:
+    """
+    Store the arrays in an .npz file. Raises ValueError for classes that
+    would need pickling (object dtype).
+    """
+    if tree.classes_.dtype == object:
+        raise ValueError("Object-dtype classes cannot be stored without pickle")
+
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("wb") as f:
+        np.savez(
+            f,
+            feature=tree.feature,
+            threshold=tree.threshold,
+            children=tree.children,
+            missing_left=tree.missing_left,
+            leaf_class=tree.leaf_class,
+            classes=tree.classes_,
+            shape=np.array([tree.max_depth, tree.n_features_in_]),
+        )
+    os.replace(tmp, path)
+
+
+def load_compiled_tree(path: Path) -> CompiledTree:
+    with np.load(path, allow_pickle=False) as data:
+        max_depth, n_features = (int(v) for v in data["shape"])
+        return CompiledTree(
+            feature=data["feature"],
+            threshold=data["threshold"],
+            children=data["children"],
+            missing_left=data["missing_left"],
+            leaf_class=data["leaf_class"],
+            max_depth=max_depth,
+            n_features_in_=n_features,
+            classes_=data["classes"],
+        )
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Mapping
+
+import numpy as np
+
+if TYPE_CHECKING:
+    # Only for annotations: serving starts without importing pandas.
+    import pandas as pd
+
+# Model input columns, in the order the models were fitted on.
+FEATURES = ["Pclass", "Sex", "Age", "SibSp", "Parch", "Fare"]
+
+
+def encode_sex(value: str) -> float:
+    return 0.0 if value.lower() == "male" else 1.0
+
+
+def encode_record(record: Mapping[str, Any]) -> tuple[float, ...]:
+    """
+    Encode one row given by feature name in FEATURES order, the same way
+    train.py does.
+    """
+    return (
+        float(record["Pclass"]),
+        encode_sex(str(record["Sex"])),
+        float(record["Age"]),
+        float(record["SibSp"]),
+        float(record["Parch"]),
+        float(record["Fare"]),
+    )
+
+
+def encode_frame(df: pd.DataFrame) -> np.ndarray:
+    """
+    Encode the FEATURES columns of a DataFrame into a (n_rows, len(FEATURES))
+    float array, row for row like encode_record. Missing values stay NaN,
+    as in training.
+    """
+    X = np.empty((len(df), len(FEATURES)), dtype=np.float64)
+    for j, col in enumerate(FEATURES):
+        values = df[col]
+        if col == "Sex":
+            male = values.astype(str).str.lower().to_numpy() == "male"
+            X[:, j] = np.where(values.isna().to_numpy(), np.nan, np.where(male, 0.0, 1.0))
+        else:
+            X[:, j] = values.to_numpy(dtype=np.float64, na_value=np.nan)
+    return X
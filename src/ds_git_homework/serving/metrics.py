@@ -0,0 +1,283 @@
+from __future__ import annotations
+
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Awaitable, Callable, Iterable
+
+# Minimal Prometheus text-format metrics. Each observation is a bisect and a
+# few additions under an uncontended lock, cheap enough to stay on under load.
+
+LATENCY_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+)
+
+Labels = tuple[str, ...]
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Labels = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+
+    def header(self) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+
+    def render(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Labels = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def set(self, value: float, *labels: str) -> None:
+        """
+        Overwrite the value, e.g. to mirror a count kept elsewhere.
+        """
+        with self._lock:
+            self._values[labels] = value
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = dict(self._values)
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}"
+            for k, v in sorted(values.items())
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Labels = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+        # Per label set: [count per bucket..., +Inf count, sum]
+        self._values: dict[Labels, list[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(labels)
+            if row is None:
+                row = self._values[labels] = [0.0] * (len(self.buckets) + 2)
+            row[i] += 1
+            row[-1] += value
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = {k: list(v) for k, v in self._values.items()}
+
+        lines = self.header()
+        bounds = [*self.buckets, float("inf")]
+        for labels, row in sorted(values.items()):
+            cumulative = 0.0
+            for bound, count in zip(bounds, row):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} "
+                    f"{_format_value(cumulative)}"
+                )
+            label_str = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_str} {row[-1]!r}")
+            lines.append(f"{self.name}_count{label_str} {_format_value(cumulative)}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: list[_Metric] = []
+
+    def register(self, metric: _Metric) -> None:
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUESTS = Counter("http_requests_total", "HTTP requests by path and status", ("path", "status"))
+ERRORS = Counter("http_request_errors_total", "Requests that failed with 5xx", ("path",))
+IN_FLIGHT = Gauge("http_requests_in_flight", "Requests currently being processed", ("path",))
+LATENCY = Histogram("http_request_duration_seconds", "End-to-end request latency", ("path",))
+STAGES = Histogram(
+    "predict_stage_duration_seconds",
+    "Latency of each prediction stage: parse, encode, predict, serialize",
+    ("path", "stage"),
+)
+
+for _metric in (REQUESTS, ERRORS, IN_FLIGHT, LATENCY, STAGES):
+    REGISTRY.register(_metric)
+
+
+# ---------------------------------------------------------------------
+# Per-request stage timing
+# ---------------------------------------------------------------------
+
+
+class StageTimer:
+    """
+    Timestamps of one request, filled in by the handler and read by the
+    middleware. ``parse`` is the time from request arrival until the handler
+    starts (body read and validation); ``serialize`` is the time from handler
+    return until the response starts.
+    """
+
+    __slots__ = ("start", "handler_start", "handler_end", "last", "stages")
+
+    def __init__(self) -> None:
+        self.start = time.perf_counter()
+        self.handler_start: float | None = None
+        self.handler_end: float | None = None
+        self.last = self.start
+        self.stages: list[tuple[str, float]] = []
+
+    def begin(self) -> None:
+        self.handler_start = self.last = time.perf_counter()
+
+    def lap(self, stage: str) -> None:
+        now = time.perf_counter()
+        self.stages.append((stage, now - self.last))
+        self.last = now
+
+    def end(self) -> None:
+        self.handler_end = time.perf_counter()
+
+
+_TIMER: contextvars.ContextVar[StageTimer | None] = contextvars.ContextVar(
+    "stage_timer", default=None
+)
+
+
+def current_timer() -> StageTimer:
+    """
+    Timer of the current request; a throwaway one outside the middleware.
+    """
+    timer = _TIMER.get()
+    return timer if timer is not None else StageTimer()
+
+
+ASGIApp = Callable[
+    [dict[str, Any], Callable[[], Awaitable[Any]], Callable[[Any], Awaitable[None]]],
+    Awaitable[None],
+]
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording request counts, errors, in-flight
+    requests, latency and the stages reported through StageTimer.
+    """
+
+    def __init__(self, app: ASGIApp, paths: set[str] | None = None) -> None:
+        self.app = app
+        self.paths = paths
+
+    def _path_label(self, scope: dict[str, Any]) -> str:
+        path = str(scope.get("path", ""))
+        if self.paths is None:
+            router = getattr(scope.get("app"), "routes", None)
+            if router is None:
+                return path
+            self.paths = {getattr(r, "path", "") for r in router}
+        # Unknown paths share one label to keep cardinality bounded.
+        return path if path in self.paths else "other"
+
+    async def __call__(
+        self,
+        scope: dict[str, Any],
+        receive: Callable[[], Awaitable[Any]],
+        send: Callable[[Any], Awaitable[None]],
+    ) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path = self._path_label(scope)
+        timer = StageTimer()
+        token = _TIMER.set(timer)
+        status = 500
+        response_start: float | None = None
+
+        async def send_wrapper(message: Any) -> None:
+            nonlocal status, response_start
+            if message["type"] == "http.response.start":
+                status = int(message["status"])
+                response_start = time.perf_counter()
+            await send(message)
+
+        IN_FLIGHT.inc(path)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _TIMER.reset(token)
+            IN_FLIGHT.dec(path)
+            end = time.perf_counter()
+
+            REQUESTS.inc(path, str(status))
+            if status >= 500:
+                ERRORS.inc(path)
+            LATENCY.observe(end - timer.start, path)
+
+            if timer.handler_start is not None:
+                STAGES.observe(timer.handler_start - timer.start, path, "parse")
+                for stage, seconds in timer.stages:
+                    STAGES.observe(seconds, path, stage)
+                if timer.handler_end is not None and response_start is not None:
+                    STAGES.observe(response_start - timer.handler_end, path, "serialize")
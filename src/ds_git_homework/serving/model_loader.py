@@ -1,15 +1,33 @@
 from __future__ import annotations
 
+import argparse
+import json
 import os
 import pickle
-from dataclasses import dataclass
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, fields, replace
 from pathlib import Path
-from typing import Any, Tuple
+from typing import Any, Callable, Generic, Tuple, TypeVar
 
-from mlflow.tracking import MlflowClient
+import numpy as np
 
-from ds_git_homework.s3.client import S3Config, make_s3_client
+from ds_git_homework.s3.client import get_s3_client, load_s3_config_from_env
 from ds_git_homework.s3.io import download_file
+from ds_git_homework.serving import artifact_cache
+from ds_git_homework.serving.compiled_tree import (
+    CompiledTree,
+    compile_tree,
+    load_compiled_tree,
+    save_compiled_tree,
+)
+from ds_git_homework.serving.features import FEATURES
+
+# mlflow and sklearn are imported where they are needed: together they take
+# seconds to import, and a server started from a manifest and a cached
+# compiled tree needs neither.
 
 
 # -------------------------
@@ -23,6 +41,24 @@ class ModelRef:
     artifact_uri: str
 
 
+def load_model_manifest(path: Path) -> ModelRef:
+    """
+    Read a ModelRef written by write_model_manifest, so serving can start
+    without contacting MLflow.
+    """
+    data = json.loads(path.read_text(encoding="utf-8"))
+    return ModelRef(
+        experiment_name=data["experiment_name"],
+        run_id=data["run_id"],
+        artifact_uri=data["artifact_uri"],
+    )
+
+
+def write_model_manifest(model_ref: ModelRef, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(asdict(model_ref), indent=2) + "\n", encoding="utf-8")
+
+
 # -------------------------
 # MLflow helpers
 # -------------------------
@@ -31,6 +67,8 @@ def get_best_run_id(
     experiment_name: str,
     metric_name: str,
 ) -> str:
+    from mlflow.tracking import MlflowClient
+
     client = MlflowClient()
 
     experiment = client.get_experiment_by_name(experiment_name)
@@ -51,22 +89,40 @@ def get_best_run_id(
     return run_id
 
 
+def check_name(name: str, what: str = "name") -> str:
+    """
+    Reject names that could escape a directory when used as a path
+    component (run ids and experiment names may come from clients).
+    """
+    if not name or "/" in name or "\\" in name or ".." in name:
+        raise ValueError(f"Invalid {what}: {name!r}")
+    return name
+
+
 def resolve_model_ref(
-    experiment_name: str,
+    experiment_name: str | None,
     run_id: str,
 ) -> ModelRef:
     """
-    Resolve MLflow artifact URI for a given run.
+    Resolve MLflow artifact URI for a given run. The experiment is taken
+    from the run; naming a different one raises LookupError.
     """
+    from mlflow.tracking import MlflowClient
+
+    check_name(run_id, "run id")
     client = MlflowClient()
     run = client.get_run(run_id)
 
+    run_experiment = client.get_experiment(run.info.experiment_id).name
+    if experiment_name is not None and experiment_name != run_experiment:
+        raise LookupError(f"Run {run_id} is not in experiment '{experiment_name}'")
+
     artifact_uri = run.info.artifact_uri
     if not artifact_uri.startswith("s3://"):
         raise RuntimeError(f"Unsupported artifact URI: {artifact_uri}")
 
     return ModelRef(
-        experiment_name=experiment_name,
+        experiment_name=run_experiment,
         run_id=run_id,
         artifact_uri=artifact_uri,
     )
@@ -76,17 +132,6 @@ def resolve_model_ref(
 # S3 helpers
 # -------------------------
 
-def _load_env_s3_config() -> S3Config:
-    """
-    Unified env names for MinIO / S3.
-    """
-    return S3Config(
-        endpoint_url=os.environ["S3_ENDPOINT_URL"],
-        access_key=os.environ["AWS_ACCESS_KEY_ID"],
-        secret_key=os.environ["AWS_SECRET_ACCESS_KEY"],
-    )
-
-
 def _parse_s3_uri(uri: str) -> Tuple[str, str]:
     """
     Parse s3://bucket/key -> (bucket, key)
@@ -103,30 +148,323 @@ def _parse_s3_uri(uri: str) -> Tuple[str, str]:
 # Model loading
 # -------------------------
 
-def load_model_from_s3(model_ref: ModelRef) -> Any:
+def _fetch_model_file(model_ref: ModelRef, local_path: Path) -> None:
     """
-    Download model.pkl from MLflow artifacts and load it.
+    Make sure local_path holds the run's model.pkl, downloading it only when
+    the local copy is missing, corrupted or differs from the S3 object.
     """
-    s3_cfg = _load_env_s3_config()
-    s3_client = make_s3_client(s3_cfg)
+    trust_run_id = os.environ.get("SERVE_MODEL_CACHE_TRUST_RUN_ID", "0") == "1"
+    if trust_run_id and artifact_cache.is_cached(local_path):
+        # MLflow run artifacts are immutable: a verified copy is enough.
+        return
+
+    s3_client = get_s3_client(load_s3_config_from_env())
 
     model_uri = f"{model_ref.artifact_uri}/model_pickle/model.pkl"
     bucket, key = _parse_s3_uri(model_uri)
 
-    local_path = (
-        Path("data/serving")
-        / model_ref.experiment_name
-        / model_ref.run_id
-        / "model.pkl"
+    head = s3_client.head_object(Bucket=bucket, Key=key)
+    etag = str(head["ETag"]).strip('"') or None
+    size = int(head["ContentLength"])
+
+    if artifact_cache.is_cached(local_path, etag=etag, size=size):
+        return
+
+    # A temp file of our own: other processes or threads may be fetching
+    # the same model into this directory right now.
+    fd, tmp_name = tempfile.mkstemp(
+        dir=local_path.parent, prefix=local_path.name + ".", suffix=".part"
     )
+    os.close(fd)
+    tmp_path = Path(tmp_name)
+    try:
+        stats = download_file(
+            s3_client=s3_client,
+            bucket=bucket,
+            key=key,
+            dst=tmp_path,
+            size=size,
+            etag=etag,
+        )
+        print(f"Downloaded {stats}")
+        meta = artifact_cache.verify_download(tmp_path, etag=etag, size=size)
+    except Exception:
+        tmp_path.unlink(missing_ok=True)
+        if artifact_cache.is_cached(local_path, etag=etag, size=size):
+            # Another loader finished the same download meanwhile.
+            return
+        raise
+
+    os.replace(tmp_path, local_path)
+    artifact_cache.write_meta(local_path, meta)
+
+
+def _ensure_local_model(model_ref: ModelRef) -> Path:
+    """
+    Return the path of a verified local copy of the run's model.pkl.
+
+    Downloads are cached under SERVE_MODEL_CACHE_DIR/<run_id> (run ids are
+    unique across experiments); old runs are evicted once the cache exceeds
+    SERVE_MODEL_CACHE_MAX_MB.
+    """
+    cache_root = Path(os.environ.get("SERVE_MODEL_CACHE_DIR", "data/serving"))
+    max_bytes = int(float(os.environ.get("SERVE_MODEL_CACHE_MAX_MB", "1024")) * 1024 * 1024)
+
+    local_path = cache_root / check_name(model_ref.run_id, "run id") / "model.pkl"
     local_path.parent.mkdir(parents=True, exist_ok=True)
 
-    download_file(
-        s3_client=s3_client,
-        bucket=bucket,
-        key=key,
-        dst=local_path,
-    )
+    _fetch_model_file(model_ref, local_path)
+    artifact_cache.evict_to_budget(cache_root, max_bytes, keep=local_path.parent)
+    return local_path
+
+
+def load_model_from_s3(model_ref: ModelRef) -> Any:
+    """
+    Download model.pkl from MLflow artifacts and load it.
+    """
+    local_path = _ensure_local_model(model_ref)
 
     with local_path.open("rb") as f:
         return pickle.load(f)
+
+
+# -------------------------
+# Compiled inference
+# -------------------------
+
+def compile_model(model: Any) -> Any:
+    """
+    Replace a fitted DecisionTreeClassifier with its flat-array CompiledTree.
+    Any other model is returned unchanged.
+    """
+    from sklearn.tree import DecisionTreeClassifier
+
+    if isinstance(model, DecisionTreeClassifier) and model.n_outputs_ == 1:
+        return compile_tree(model)
+    return model
+
+
+def drop_feature_names(model: Any) -> Any:
+    """
+    Serving predicts on plain arrays in FEATURES order. A model fitted on a
+    DataFrame would warn about that on every call, so once its columns are
+    checked against FEATURES it forgets their names.
+    """
+    names = getattr(model, "feature_names_in_", None)
+    if names is None:
+        return model
+    if list(names) != FEATURES:
+        raise ValueError(f"Model was fitted on {list(names)}, serving sends {FEATURES}")
+    del model.feature_names_in_
+    return model
+
+
+def _load_cached_compiled(compiled_path: Path, model_path: Path) -> CompiledTree | None:
+    # The compiled copy records the checksum of the model.pkl it came from.
+    model_meta = artifact_cache.read_meta(model_path)
+    if model_meta is None or not artifact_cache.is_cached(compiled_path, etag=model_meta.sha256):
+        return None
+    try:
+        return load_compiled_tree(compiled_path)
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def load_serving_model(model_ref: ModelRef, compile: bool = True) -> Any:
+    """
+    Load a run's model ready for serving.
+
+    With `compile`, decision trees are served as a CompiledTree. The compiled
+    arrays are cached next to model.pkl, so later starts skip unpickling and
+    importing sklearn altogether.
+    """
+    model_path = _ensure_local_model(model_ref)
+    compiled_path = model_path.with_name("model.compiled.npz")
+
+    if compile:
+        cached = _load_cached_compiled(compiled_path, model_path)
+        if cached is not None:
+            return cached
+
+    with model_path.open("rb") as f:
+        model = drop_feature_names(pickle.load(f))
+
+    if not compile:
+        return model
+
+    model = compile_model(model)
+    model_meta = artifact_cache.read_meta(model_path)
+    if isinstance(model, CompiledTree) and model_meta is not None:
+        try:
+            save_compiled_tree(model, compiled_path)
+        except ValueError:
+            # Classes that need pickling (object dtype) are not cached.
+            return model
+        meta = artifact_cache.ArtifactMeta(
+            etag=model_meta.sha256,
+            size=compiled_path.stat().st_size,
+            sha256=artifact_cache.file_digest(compiled_path),
+        )
+        artifact_cache.write_meta(compiled_path, meta)
+
+    return model
+
+
+# -------------------------
+# Model registry
+# -------------------------
+
+T = TypeVar("T")
+
+
+def model_nbytes(model: Any) -> int:
+    """
+    Approximate memory held by a loaded model: the array sizes of a
+    CompiledTree, the pickled size of anything else.
+    """
+    if isinstance(model, CompiledTree):
+        arrays = (getattr(model, f.name) for f in fields(model))
+        return sum(a.nbytes for a in arrays if isinstance(a, np.ndarray))
+    return len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+@dataclass(frozen=True)
+class ModelStats:
+    requests: int = 0
+    seconds: float = 0.0
+    max_seconds: float = 0.0
+    loads: int = 0
+    load_seconds: float = 0.0
+    evictions: int = 0
+
+
+class ModelRegistry(Generic[T]):
+    """
+    Several models kept loaded side by side, keyed by run id (a run has one
+    model whatever experiment it was requested under).
+
+    A model is loaded on first use and kept until the loaded models together
+    exceed ``max_bytes``. Then the least recently used ones are dropped; the
+    newest one always stays, even if it alone is over budget. Concurrent
+    requests for a model that is not loaded yet wait for a single load.
+    Request counts and latency are kept per run, loaded or not.
+    """
+
+    def __init__(
+        self,
+        load: Callable[[ModelRef], T],
+        max_bytes: int,
+        size_of: Callable[[T], int] = model_nbytes,
+    ) -> None:
+        self._load = load
+        self._size_of = size_of
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._models: OrderedDict[str, tuple[ModelRef, T, int]] = OrderedDict()
+        self._loading: dict[str, threading.Lock] = {}
+        self._stats: dict[str, ModelStats] = {}
+
+    def _cached(self, run_id: str) -> T | None:
+        # Caller holds self._lock.
+        entry = self._models.get(run_id)
+        if entry is None:
+            return None
+        self._models.move_to_end(run_id)
+        return entry[1]
+
+    def get(self, ref: ModelRef) -> T:
+        run_id = ref.run_id
+        with self._lock:
+            model = self._cached(run_id)
+            if model is not None:
+                return model
+            load_lock = self._loading.setdefault(run_id, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                model = self._cached(run_id)
+                if model is not None:
+                    return model
+
+            start = time.perf_counter()
+            try:
+                model = self._load(ref)
+                nbytes = self._size_of(model)
+            except BaseException:
+                with self._lock:
+                    self._loading.pop(run_id, None)
+                raise
+            seconds = time.perf_counter() - start
+
+            with self._lock:
+                self._models[run_id] = (ref, model, nbytes)
+                self._loading.pop(run_id, None)
+                old = self._stats.get(ref.run_id, ModelStats())
+                self._stats[ref.run_id] = replace(
+                    old, loads=old.loads + 1, load_seconds=old.load_seconds + seconds
+                )
+                evicted = self._evict()
+
+        for old_ref in evicted:
+            print(f"Evicted run {old_ref.run_id} from the model registry", flush=True)
+        return model
+
+    def _evict(self) -> list[ModelRef]:
+        # Caller holds self._lock.
+        evicted = []
+        total = sum(nbytes for _, _, nbytes in self._models.values())
+        while total > self.max_bytes and len(self._models) > 1:
+            _, (ref, _, nbytes) = self._models.popitem(last=False)
+            total -= nbytes
+            old = self._stats.get(ref.run_id, ModelStats())
+            self._stats[ref.run_id] = replace(old, evictions=old.evictions + 1)
+            evicted.append(ref)
+        return evicted
+
+    def record(self, run_id: str, seconds: float) -> None:
+        """
+        Count one request served by run_id and the time it took.
+        """
+        with self._lock:
+            old = self._stats.get(run_id, ModelStats())
+            self._stats[run_id] = replace(
+                old,
+                requests=old.requests + 1,
+                seconds=old.seconds + seconds,
+                max_seconds=max(old.max_seconds, seconds),
+            )
+
+    def loaded(self) -> dict[ModelRef, int]:
+        """
+        Loaded models and their estimated sizes, least recently used first.
+        """
+        with self._lock:
+            return {ref: nbytes for ref, _, nbytes in self._models.values()}
+
+    def stats(self) -> dict[str, ModelStats]:
+        with self._lock:
+            return dict(self._stats)
+
+
+# -------------------------
+# Manifest CLI
+# -------------------------
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Resolve the model to serve and write it to a manifest file"
+    )
+    parser.add_argument("--experiment", default=os.environ.get("SERVE_EXPERIMENT", "titanic_tree"))
+    parser.add_argument("--metric", default=os.environ.get("SERVE_METRIC", "accuracy"))
+    parser.add_argument("--run-id", help="Run to serve (default: best run by --metric)")
+    parser.add_argument("--output", required=True, help="Path of the manifest JSON")
+    args = parser.parse_args()
+
+    run_id = args.run_id or get_best_run_id(args.experiment, args.metric)
+    model_ref = resolve_model_ref(experiment_name=args.experiment, run_id=run_id)
+    write_model_manifest(model_ref, Path(args.output))
+    print(f"Wrote manifest for run {run_id} to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
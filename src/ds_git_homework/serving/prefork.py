@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import argparse
+import gc
+import os
+import signal
+import socket
+import threading
+import time
+from types import FrameType
+
+# Pre-fork launcher for serving/app.py.
+#
+# The parent resolves and loads the model once, then forks SERVE_WORKERS
+# uvicorn workers that all accept on one listening socket. Workers inherit
+# the loaded model and imported modules, so they start instantly and share
+# those pages copy-on-write instead of each holding (and downloading) a copy.
+# The parent only supervises: it restarts workers that die and stops them
+# all on SIGTERM/SIGINT.
+
+RESTART_WINDOW_S = 60.0
+MAX_RESTARTS = 10
+
+
+def cpu_count() -> int:
+    # CPUs this process may run on (e.g. a cpuset), not all of the host's.
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _bind(host: str, port: int, backlog: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _exit_with_parent(parent_pid: int) -> None:
+    # A worker left behind by a killed parent shuts itself down.
+    while os.getppid() == parent_pid:
+        time.sleep(1.0)
+    os.kill(os.getpid(), signal.SIGTERM)
+
+
+def _run_worker(sock: socket.socket, parent_pid: int, log_level: str) -> None:
+    import uvicorn
+
+    from ds_git_homework.serving.app import app
+
+    # Only the parent decides when workers stop: keep a terminal's Ctrl+C
+    # from reaching them directly, next to the SIGTERM the parent forwards.
+    os.setpgid(0, 0)
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, signal.SIG_DFL)
+    gc.enable()
+    threading.Thread(target=_exit_with_parent, args=(parent_pid,), daemon=True).start()
+
+    server = uvicorn.Server(uvicorn.Config(app, log_level=log_level))
+    server.run(sockets=[sock])
+
+
+class Supervisor:
+    """
+    Fork ``workers`` processes serving on ``sock`` and keep that many
+    running until SIGTERM or SIGINT, then stop them gracefully (SIGKILL
+    after ``graceful_timeout`` seconds). Gives up if workers keep dying.
+    """
+
+    def __init__(
+        self,
+        sock: socket.socket,
+        workers: int,
+        log_level: str = "info",
+        graceful_timeout: float = 30.0,
+    ) -> None:
+        self.sock = sock
+        self.workers = workers
+        self.log_level = log_level
+        self.graceful_timeout = graceful_timeout
+        self.pids: set[int] = set()
+        self.restarts: list[float] = []
+        self.stop_deadline: float | None = None
+        self.exit_code = 0
+
+    def _spawn(self) -> None:
+        parent_pid = os.getpid()
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                _run_worker(self.sock, parent_pid, self.log_level)
+                code = 0
+            finally:
+                os._exit(code)
+        self.pids.add(pid)
+
+    def _stop(self, signum: int, frame: FrameType | None = None) -> None:
+        if self.stop_deadline is not None:
+            return
+        print(f"Stopping {len(self.pids)} worker(s)", flush=True)
+        self.stop_deadline = time.monotonic() + self.graceful_timeout
+        for pid in self.pids:
+            os.kill(pid, signal.SIGTERM)
+
+    def _on_exit(self, pid: int, status: int) -> None:
+        self.pids.discard(pid)
+        if self.stop_deadline is not None:
+            return
+
+        now = time.monotonic()
+        self.restarts = [t for t in self.restarts if now - t < RESTART_WINDOW_S] + [now]
+        print(
+            f"Worker {pid} exited with code {os.waitstatus_to_exitcode(status)}, restarting",
+            flush=True,
+        )
+        if len(self.restarts) > MAX_RESTARTS:
+            print(f"Workers restarted {MAX_RESTARTS} times in {RESTART_WINDOW_S:.0f}s, giving up")
+            self.exit_code = 1
+            self._stop(signal.SIGTERM)
+            return
+        self._spawn()
+
+    def run(self) -> int:
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        for _ in range(self.workers):
+            self._spawn()
+        print(f"Started {self.workers} worker(s): {sorted(self.pids)}", flush=True)
+
+        while self.pids:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid:
+                self._on_exit(pid, status)
+                continue
+            if self.stop_deadline is not None and time.monotonic() > self.stop_deadline:
+                for pid in self.pids:
+                    os.kill(pid, signal.SIGKILL)
+                self.stop_deadline = float("inf")
+            time.sleep(0.1)
+        return self.exit_code
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Serve the model from pre-forked workers sharing one loaded copy"
+    )
+    parser.add_argument("--host", default=os.environ.get("SERVE_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("SERVE_PORT", "8000")))
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.environ.get("SERVE_WORKERS", "0")) or cpu_count(),
+        help="Worker processes (default: SERVE_WORKERS or the CPU count)",
+    )
+    parser.add_argument("--backlog", type=int, default=2048)
+    parser.add_argument("--graceful-timeout", type=float, default=30.0)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    # No collections while the model is loaded: objects created now are
+    # frozen below and never touched by the collector, so their pages stay
+    # shared with the workers.
+    gc.disable()
+
+    import uvicorn  # noqa: F401  (imported once here, shared by the workers)
+
+    from ds_git_homework.serving import app as serving_app
+
+    serving_app.refresh_model()
+    sock = _bind(args.host, args.port, args.backlog)
+    print(f"Listening on {args.host}:{args.port}", flush=True)
+
+    gc.freeze()
+    raise SystemExit(
+        Supervisor(sock, args.workers, args.log_level, args.graceful_timeout).run()
+    )
+
+
+if __name__ == "__main__":
+    main()
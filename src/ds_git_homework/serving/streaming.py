@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import json
+import tempfile
+import time
+from typing import Any, AsyncIterator, Callable
+
+import numpy as np
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.types import Receive, Scope, Send
+
+from ds_git_homework.serving.features import FEATURES, encode_record
+
+# Wire formats of /predict_stream.
+#
+# NDJSON: one row per line, either an object keyed by FEATURES (like a
+#   /predict body) or an array of already encoded values in FEATURES order.
+#   Answered with one prediction per line.
+# Binary: little-endian float32 rows of len(FEATURES) encoded values
+#   (Sex: male=0, female=1), no header. Answered with little-endian int32
+#   predictions.
+NDJSON = "application/x-ndjson"
+BINARY = "application/octet-stream"
+CONTENT_TYPES = {NDJSON: NDJSON, "application/jsonl": NDJSON, BINARY: BINARY}
+
+ROW_DTYPE = np.dtype("<f4")
+PREDICTION_DTYPE = np.dtype("<i4")
+
+# Longest NDJSON line accepted; a row is ~100 bytes. Bounds what is buffered
+# while waiting for a newline.
+MAX_LINE_BYTES = 64 << 10
+
+Body = AsyncIterator[bytes]
+
+
+async def binary_chunks(body: Body, chunk_rows: int) -> AsyncIterator[np.ndarray]:
+    """
+    Yield (<= chunk_rows, len(FEATURES)) float32 arrays from a raw binary body.
+    At most one chunk plus one body message is buffered.
+    """
+    row_bytes = ROW_DTYPE.itemsize * len(FEATURES)
+    chunk_bytes = row_bytes * chunk_rows
+    buffer = bytearray()
+
+    async for data in body:
+        buffer += data
+        while len(buffer) >= chunk_bytes:
+            # Copy out of the buffer: it is resized while the chunk is scored.
+            yield np.frombuffer(bytes(buffer[:chunk_bytes]), dtype=ROW_DTYPE).reshape(
+                chunk_rows, len(FEATURES)
+            )
+            del buffer[:chunk_bytes]
+
+    if len(buffer) % row_bytes:
+        raise ValueError(
+            f"Body is not a whole number of rows of {len(FEATURES)} float32 values"
+        )
+    if buffer:
+        yield np.frombuffer(bytes(buffer), dtype=ROW_DTYPE).reshape(-1, len(FEATURES))
+
+
+def _parse_line(line: bytes, lineno: int) -> tuple[float, ...]:
+    try:
+        value = json.loads(line)
+        if isinstance(value, dict):
+            return encode_record(value)
+        if isinstance(value, list) and len(value) == len(FEATURES):
+            return tuple(float(v) for v in value)
+    except (ValueError, KeyError, TypeError, AttributeError) as exc:
+        raise ValueError(f"Line {lineno}: {exc}") from exc
+    raise ValueError(f"Line {lineno}: expected an object or an array of {len(FEATURES)} numbers")
+
+
+async def ndjson_chunks(body: Body, chunk_rows: int) -> AsyncIterator[np.ndarray]:
+    """
+    Yield (<= chunk_rows, len(FEATURES)) float64 arrays from an NDJSON body.
+    Blank lines are skipped; lines over MAX_LINE_BYTES are rejected.
+    """
+    rows: list[tuple[float, ...]] = []
+    tail = b""
+    lineno = 0
+
+    async for data in body:
+        lines = (tail + data).split(b"\n")
+        tail = lines.pop()
+        if len(tail) > MAX_LINE_BYTES:
+            raise ValueError(f"Line {lineno + len(lines) + 1}: longer than {MAX_LINE_BYTES} bytes")
+        for line in lines:
+            lineno += 1
+            if len(line) > MAX_LINE_BYTES:
+                raise ValueError(f"Line {lineno}: longer than {MAX_LINE_BYTES} bytes")
+            if line.strip():
+                rows.append(_parse_line(line, lineno))
+            if len(rows) == chunk_rows:
+                yield np.array(rows, dtype=np.float64)
+                rows = []
+
+    if tail.strip():
+        rows.append(_parse_line(tail, lineno + 1))
+    if rows:
+        yield np.array(rows, dtype=np.float64)
+
+
+def encode_predictions(content_type: str, predictions: np.ndarray) -> bytes:
+    if content_type == BINARY:
+        return np.asarray(predictions).astype(PREDICTION_DTYPE).tobytes()
+    lines = "\n".join(map(str, np.asarray(predictions).tolist()))
+    return (lines + "\n").encode() if lines else b""
+
+
+Predict = Callable[[np.ndarray], Any]
+
+# Predictions beyond this many bytes are spooled to a temporary file.
+SPOOL_MAX_BYTES = 1 << 20
+SEND_BYTES = 64 << 10
+
+
+class PredictionStream(Response):
+    """
+    Score the request body chunk by chunk while it is being received, then
+    stream the predictions back.
+
+    Unlike StreamingResponse, this owns the ASGI receive channel, so the
+    body is never held in memory. Predictions are spooled (to disk beyond
+    SPOOL_MAX_BYTES) until the body ends rather than sent right away: most
+    HTTP/1.1 clients only read the response after sending the whole body, so
+    answering early would deadlock once the socket buffers fill. This also
+    means a bad row anywhere in the body gets a clean 400.
+    """
+
+    def __init__(
+        self,
+        predict: Predict,
+        content_type: str,
+        chunk_rows: int,
+        on_done: Callable[[float], None] | None = None,
+    ) -> None:
+        # Like StreamingResponse, no body is rendered up front.
+        self.status_code = 200
+        self.media_type = content_type
+        self.background = None
+        self.init_headers()
+        self.predict = predict
+        self.content_type = content_type
+        self.chunk_rows = chunk_rows
+        self.on_done = on_done
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        start = time.perf_counter()
+        body = Request(scope, receive).stream()
+        chunks = binary_chunks if self.content_type == BINARY else ndjson_chunks
+
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as out:
+            try:
+                async for X in chunks(body, self.chunk_rows):
+                    predictions = await run_in_threadpool(self.predict, X)
+                    out.write(encode_predictions(self.content_type, predictions))
+            except ValueError as exc:
+                await JSONResponse({"detail": str(exc)}, status_code=400)(scope, receive, send)
+                return
+
+            size = out.tell()
+            out.seek(0)
+            await send({
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": [*self.raw_headers, (b"content-length", str(size).encode())],
+            })
+            sent = 0
+            while True:
+                data = out.read(SEND_BYTES)
+                sent += len(data)
+                await send({"type": "http.response.body", "body": data, "more_body": sent < size})
+                if sent >= size:
+                    break
+
+        if self.on_done is not None:
+            self.on_done(time.perf_counter() - start)
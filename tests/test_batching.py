@@ -0,0 +1,95 @@
+"""Tests for `ds_git_homework.serving.batching`."""
+from __future__ import annotations
+
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+from ds_git_homework.serving.batching import MicroBatcher
+
+
+def test_concurrent_rows_are_coalesced() -> None:
+    batch_sizes: list[int] = []
+
+    def predict_fn(X: np.ndarray) -> np.ndarray:
+        batch_sizes.append(len(X))
+        return X[:, 0] * 10
+
+    async def scenario() -> list[int]:
+        batcher = MicroBatcher(predict_fn, max_batch_size=8, max_wait_ms=50)
+        batcher.start()
+        try:
+            rows = [np.array([float(i), 0.0]) for i in range(20)]
+            return list(await asyncio.gather(*(batcher.submit(r) for r in rows)))
+        finally:
+            await batcher.stop()
+
+    preds = asyncio.run(scenario())
+
+    assert preds == [i * 10 for i in range(20)]
+    assert sum(batch_sizes) == 20
+    assert max(batch_sizes) <= 8
+    assert len(batch_sizes) < 20
+
+
+def test_predict_errors_reach_every_caller() -> None:
+    def predict_fn(X: np.ndarray) -> np.ndarray:
+        raise ValueError("boom")
+
+    async def scenario() -> None:
+        batcher = MicroBatcher(predict_fn, max_wait_ms=5)
+        batcher.start()
+        try:
+            results = await asyncio.gather(
+                batcher.submit(np.zeros(2)),
+                batcher.submit(np.ones(2)),
+                return_exceptions=True,
+            )
+        finally:
+            await batcher.stop()
+        assert all(isinstance(r, ValueError) for r in results)
+
+    asyncio.run(scenario())
+
+
+def test_stop_fails_rows_being_collected_or_scored() -> None:
+    scoring = threading.Event()
+    release = threading.Event()
+
+    def predict_fn(X: np.ndarray) -> np.ndarray:
+        scoring.set()
+        release.wait(5)
+        return X[:, 0]
+
+    async def scenario() -> list[object]:
+        # A batch stuck in predict_fn and a row still queued behind it.
+        batcher = MicroBatcher(predict_fn, max_batch_size=2, max_wait_ms=1000)
+        batcher.start()
+        tasks = [asyncio.create_task(batcher.submit(np.full(2, i))) for i in range(3)]
+        while not scoring.is_set():
+            await asyncio.sleep(0.01)
+        await batcher.stop()
+        release.set()
+
+        # A row taken off the queue by a batch still waiting for more.
+        batcher = MicroBatcher(predict_fn, max_batch_size=8, max_wait_ms=1000)
+        batcher.start()
+        tasks.append(asyncio.create_task(batcher.submit(np.zeros(2))))
+        await asyncio.sleep(0.05)
+        await batcher.stop()
+
+        return list(await asyncio.wait_for(
+            asyncio.gather(*tasks, return_exceptions=True), timeout=5
+        ))
+
+    results = asyncio.run(scenario())
+    assert len(results) == 4
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_submit_requires_running_batcher() -> None:
+    batcher = MicroBatcher(lambda X: X[:, 0])
+    with pytest.raises(RuntimeError):
+        asyncio.run(batcher.submit(np.zeros(2)))
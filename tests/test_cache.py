@@ -0,0 +1,28 @@
+"""Tests for `ds_git_homework.serving.cache`."""
+from __future__ import annotations
+
+from ds_git_homework.serving.cache import PredictionCache
+
+
+def test_least_recently_used_entry_is_evicted() -> None:
+    cache = PredictionCache(max_size=2)
+    cache.put("v1", (1.0,), 0)
+    cache.put("v1", (2.0,), 1)
+    assert cache.get("v1", (1.0,)) == 0  # (2.0,) is now the oldest
+
+    cache.put("v1", (3.0,), 1)
+
+    assert cache.get("v1", (2.0,)) is None
+    assert cache.get("v1", (1.0,)) == 0
+    assert cache.get("v1", (3.0,)) == 1
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.evictions, stats.size) == (3, 1, 1, 2)
+
+
+def test_model_change_invalidates_entries() -> None:
+    cache = PredictionCache(max_size=10)
+    cache.put("run-a", (1.0,), 1)
+
+    assert cache.get("run-b", (1.0,)) is None
+    assert cache.get("run-a", (1.0,)) is None
+    assert cache.stats().size == 0
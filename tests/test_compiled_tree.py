@@ -0,0 +1,114 @@
+"""Parity tests for `ds_git_homework.serving.compiled_tree`."""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.tree import DecisionTreeClassifier
+
+from ds_git_homework.serving.compiled_tree import CompiledTree, compile_tree
+from ds_git_homework.serving.model_loader import compile_model
+
+FEATURES = ["Pclass", "Sex", "Age", "SibSp", "Parch", "Fare"]
+
+
+def _titanic_like(n: int, seed: int, missing_age: bool = True) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "Pclass": rng.integers(1, 4, n).astype(float),
+        "Sex": rng.integers(0, 2, n).astype(float),
+        "Age": np.round(rng.uniform(0.5, 80, n), 1),
+        "SibSp": rng.integers(0, 6, n).astype(float),
+        "Parch": rng.integers(0, 5, n).astype(float),
+        "Fare": np.round(rng.lognormal(3, 1, n), 4),
+    })
+    if missing_age:
+        df.loc[rng.random(n) < 0.2, "Age"] = np.nan
+    return df
+
+
+def _labels(df: pd.DataFrame, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    score = df["Sex"] * 2 - df["Pclass"] + (df["Age"].fillna(30) < 12) + rng.normal(0, 1, len(df))
+    labels: np.ndarray = (score > -0.5).astype(int).to_numpy()
+    return labels
+
+
+@pytest.mark.parametrize("max_depth", [1, 3, 7, None])
+@pytest.mark.parametrize("criterion", ["gini", "entropy"])
+def test_batch_parity_with_sklearn(max_depth: int | None, criterion: str) -> None:
+    train = _titanic_like(2000, seed=1)
+    model = DecisionTreeClassifier(
+        max_depth=max_depth, criterion=criterion, random_state=0
+    ).fit(train[FEATURES], _labels(train, seed=2))
+    compiled = compile_tree(model)
+
+    test = _titanic_like(5000, seed=3)
+    expected = model.predict(test[FEATURES])
+
+    np.testing.assert_array_equal(compiled.predict(test[FEATURES].to_numpy()), expected)
+
+
+def test_single_row_parity_with_sklearn() -> None:
+    train = _titanic_like(1000, seed=4)
+    model = DecisionTreeClassifier(max_depth=6, random_state=0).fit(
+        train[FEATURES], _labels(train, seed=5)
+    )
+    compiled = compile_tree(model)
+
+    test = _titanic_like(300, seed=6)
+    expected = model.predict(test[FEATURES])
+    X = test[FEATURES].to_numpy()
+
+    singles = [compiled.predict(X[i:i + 1])[0] for i in range(len(X))]
+    np.testing.assert_array_equal(singles, expected)
+
+
+def test_threshold_edges_use_float32_comparison() -> None:
+    train = _titanic_like(1000, seed=7, missing_age=False)
+    model = DecisionTreeClassifier(random_state=0).fit(
+        train[FEATURES], _labels(train, seed=8)
+    )
+    compiled = compile_tree(model)
+
+    # Probe each split exactly at, just below and just above its threshold.
+    tree = model.tree_
+    internal = np.flatnonzero(tree.children_left != -1)
+    base = train[FEATURES].to_numpy()[: len(internal) * 3].copy()
+    for i, node in enumerate(internal):
+        t = tree.threshold[node]
+        for j, value in enumerate((t, np.nextafter(t, -np.inf), np.nextafter(t, np.inf))):
+            base[(i * 3 + j) % len(base), tree.feature[node]] = value
+
+    np.testing.assert_array_equal(compiled.predict(base), model.predict(base))
+
+
+def test_string_classes_are_preserved() -> None:
+    train = _titanic_like(500, seed=9)
+    y = np.where(_labels(train, seed=10) == 1, "survived", "died")
+    model = DecisionTreeClassifier(max_depth=4, random_state=0).fit(train[FEATURES], y)
+
+    X = train[FEATURES].to_numpy()
+    np.testing.assert_array_equal(compile_tree(model).predict(X), model.predict(X))
+
+
+def test_rejects_wrong_feature_count() -> None:
+    train = _titanic_like(200, seed=11)
+    model = DecisionTreeClassifier(max_depth=2).fit(train[FEATURES], _labels(train, 12))
+
+    with pytest.raises(ValueError):
+        compile_tree(model).predict(np.zeros((1, 3)))
+
+
+def test_compile_model_only_touches_single_output_trees() -> None:
+    train = _titanic_like(200, seed=13)
+    y = _labels(train, seed=14)
+
+    single = DecisionTreeClassifier(max_depth=2).fit(train[FEATURES], y)
+    multi = DecisionTreeClassifier(max_depth=2).fit(
+        train[FEATURES], np.column_stack([y, 1 - y])
+    )
+
+    assert isinstance(compile_model(single), CompiledTree)
+    assert compile_model(multi) is multi
+    assert compile_model("not a model") == "not a model"
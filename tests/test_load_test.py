@@ -0,0 +1,197 @@
+"""Tests for the open-loop helpers in `scripts/load_test.py`."""
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import json
+import math
+import socket
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+import httpx
+import pytest
+
+_PATH = Path(__file__).resolve().parents[1] / "scripts" / "load_test.py"
+_spec = importlib.util.spec_from_file_location("load_test", _PATH)
+assert _spec is not None and _spec.loader is not None
+load_test = importlib.util.module_from_spec(_spec)
+sys.modules["load_test"] = load_test
+_spec.loader.exec_module(load_test)
+
+
+def test_histogram_percentiles_within_precision() -> None:
+    hist = load_test.LatencyHistogram()
+    for ms in range(1, 1001):
+        hist.record(ms / 1000)
+
+    assert hist.count == 1000
+    assert hist.min == 0.001 and hist.max == 1.0
+    assert hist.mean() == pytest.approx(0.5005)
+    for q in (50, 90, 99):
+        assert hist.percentile(q) == pytest.approx(q / 100, rel=0.011)
+    assert hist.percentile(100) == 1.0
+
+
+def test_merged_histograms_round_trip_through_json() -> None:
+    parts = [load_test.LatencyHistogram() for _ in range(3)]
+    whole = load_test.LatencyHistogram()
+    for i in range(300):
+        parts[i % 3].record(i / 1000)
+        whole.record(i / 1000)
+
+    merged = load_test.LatencyHistogram()
+    for part in parts:
+        merged.merge(load_test.LatencyHistogram.from_dict(json.loads(json.dumps(part.to_dict()))))
+
+    assert merged.counts == whole.counts
+    assert (merged.count, merged.min, merged.max) == (whole.count, whole.min, whole.max)
+    assert merged.total == pytest.approx(whole.total)
+    assert merged.percentile(99) == whole.percentile(99)
+
+
+def test_empty_histogram_round_trips() -> None:
+    empty = load_test.LatencyHistogram.from_dict(load_test.LatencyHistogram().to_dict())
+    assert empty.count == 0 and empty.min == math.inf
+
+
+def test_empty_histogram_has_no_percentiles() -> None:
+    hist = load_test.LatencyHistogram()
+    assert math.isnan(hist.percentile(50)) and math.isnan(hist.mean())
+
+
+def test_stage_offsets() -> None:
+    constant = load_test.Stage.parse("10:2").offsets()
+    assert constant == pytest.approx([i / 10 for i in range(20)])
+
+    ramp = load_test.Stage.parse("10-30:10").offsets()
+    assert len(ramp) == 200
+    assert ramp == sorted(ramp) and ramp[0] == 0 and ramp[-1] < 10
+    # Four times the requests in the second half: 25 req/s vs 15 on average.
+    second_half = sum(t >= 5 for t in ramp)
+    assert second_half == pytest.approx(125, abs=1)
+
+
+def test_split_work_deals_round_robin() -> None:
+    assert load_test.split_work(list(range(7)), 3) == [[0, 3, 6], [1, 4], [2, 5]]
+    assert load_test.split_work([1, 2], 4) == [[1], [2]]
+
+
+def _record(ts: float, fare: float) -> str:
+    payload = {**load_test.DEFAULT_PAYLOAD, "Fare": fare}
+    return json.dumps({"ts": ts, "payload": payload})
+
+
+def test_load_payloads_sorts_recordings_by_time(tmp_path: Path) -> None:
+    recording = tmp_path / "requests.jsonl"
+    recording.write_text(
+        "\n".join([_record(105.0, 3.0), _record(100.0, 1.0), "", _record(102.5, 2.0)]) + "\n",
+        encoding="utf-8",
+    )
+
+    payloads, timestamps = load_test.load_payloads(recording)
+
+    assert timestamps == [100.0, 102.5, 105.0]
+    assert [p["Fare"] for p in payloads] == [1.0, 2.0, 3.0]
+    assert load_test.replay_schedule(timestamps, speed=2.0) == [0.0, 1.25, 2.5]
+
+
+def test_load_payloads_without_timestamps(tmp_path: Path) -> None:
+    recording = tmp_path / "requests.jsonl"
+    recording.write_text(
+        _record(5.0, 1.0) + "\n" + json.dumps(load_test.DEFAULT_PAYLOAD) + "\n",
+        encoding="utf-8",
+    )
+    payloads, timestamps = load_test.load_payloads(recording)
+    assert timestamps is None and len(payloads) == 2
+
+    dataset = tmp_path / "titanic.csv"
+    dataset.write_text(
+        "PassengerId,Pclass,Sex,Age,SibSp,Parch,Fare\n"
+        "1,3,male,22,1,0,7.25\n"
+        "2,1,female,,1,0,71.28\n",
+        encoding="utf-8",
+    )
+    payloads, timestamps = load_test.load_payloads(dataset)
+    # Rows with missing features are dropped.
+    assert timestamps is None
+    assert payloads == [{"Pclass": 3, "Sex": "male", "Age": 22.0, "SibSp": 1,
+                         "Parch": 0, "Fare": 7.25}]
+
+
+def _stats(**overrides: float) -> dict[str, float]:
+    return {"sent": 100, "elapsed": 10.0, "ok": 90, "errors": 6, "timeouts": 4, **overrides}
+
+
+def test_summarize_counts_successes_only() -> None:
+    hist = load_test.LatencyHistogram()
+    for _ in range(96):
+        hist.record(0.01)
+
+    summary = load_test.summarize_rate_run(hist, _stats(), duration_s=10.0)
+
+    assert summary["ok"] == 90
+    assert summary["achieved_rps"] == pytest.approx(9.0)
+    assert summary["target_rps"] == pytest.approx(10.0)
+    assert summary["error_rate"] == pytest.approx(0.1)
+
+
+def _dead_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port: int = sock.getsockname()[1]
+        return port
+
+
+def test_open_loop_against_a_dead_port() -> None:
+    url = f"http://127.0.0.1:{_dead_port()}/predict"
+    hist, stats = asyncio.run(
+        load_test.run_open_loop(url, [load_test.DEFAULT_PAYLOAD], [0.0, 0.01, 0.02, 0.03])
+    )
+
+    summary = load_test.summarize_rate_run(hist, stats, duration_s=0.04)
+
+    assert summary["ok"] == 0 and summary["errors"] == 4
+    assert summary["achieved_rps"] == 0.0
+    assert summary["error_rate"] == 1.0
+
+
+def test_timeouts_are_recorded_in_the_histogram() -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        raise httpx.ReadTimeout("timed out", request=request)
+
+    async def scenario() -> tuple[Any, dict[str, int]]:
+        hist = load_test.LatencyHistogram()
+        outcome = {"ok": 0, "errors": 0, "timeouts": 0}
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            intended = time.perf_counter() - 0.5
+            await load_test._send_scheduled(
+                client, "http://test/predict", {}, intended, hist, outcome
+            )
+        return hist, outcome
+
+    hist, outcome = asyncio.run(scenario())
+
+    assert outcome == {"ok": 0, "errors": 0, "timeouts": 1}
+    assert hist.count == 1 and hist.max >= 0.5
+
+
+SUMMARY = {"q50": 0.01, "q90": 0.02, "q99": 0.05, "error_rate": 0.0, "achieved_rps": 100.0}
+
+
+def test_baseline_comparison_flags_regressions_only() -> None:
+    assert load_test.compare_to_baseline(dict(SUMMARY), SUMMARY, 0.1) == []
+    faster = {**SUMMARY, "q99": 0.04, "achieved_rps": 120.0}
+    assert load_test.compare_to_baseline(faster, SUMMARY, 0.1) == []
+
+    slower = {**SUMMARY, "q99": 0.06, "achieved_rps": 80.0}
+    regressions = load_test.compare_to_baseline(slower, SUMMARY, 0.1)
+    assert [line.split(":")[0] for line in regressions] == ["q99", "achieved_rps"]
+
+
+def test_baseline_comparison_does_not_pass_on_nan() -> None:
+    no_data = {**SUMMARY, "q50": math.nan, "q90": math.nan, "q99": math.nan}
+    regressions = load_test.compare_to_baseline(no_data, SUMMARY, 0.1)
+    assert [line.split(":")[0] for line in regressions] == ["q50", "q90", "q99"]
@@ -0,0 +1,84 @@
+"""Tests for `ds_git_homework.experiments.mlflow_logger`."""
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+
+from ds_git_homework.experiments.mlflow_logger import Artifact, AsyncRunLogger, TrialLog
+
+
+class FakeClient:
+    def __init__(self, fail_upload_for: str | None = None) -> None:
+        self.calls: list[tuple[Any, ...]] = []
+        self.fail_upload_for = fail_upload_for
+        self._lock = threading.Lock()
+        self._next = 0
+
+    def _record(self, *call: Any) -> None:
+        with self._lock:
+            self.calls.append(call)
+
+    def create_run(self, experiment_id: str, tags: dict[str, Any], run_name: str) -> Any:
+        with self._lock:
+            self._next += 1
+            run_id = f"run-{self._next}"
+        self._record("create_run", run_name, tags)
+        return SimpleNamespace(info=SimpleNamespace(run_id=run_id))
+
+    def log_batch(self, run_id: str, metrics: Any, params: Any, tags: Any) -> None:
+        self._record("log_batch", run_id, len(metrics), len(params), len(tags))
+
+    def log_artifact(self, run_id: str, path: str, artifact_path: str | None) -> None:
+        if run_id == self.fail_upload_for:
+            raise OSError("upload failed")
+        self._record("log_artifact", run_id, Path(path).read_bytes(), artifact_path)
+
+    def set_terminated(self, run_id: str, status: str) -> None:
+        self._record("set_terminated", run_id, status)
+
+
+def _trial(name: str, **kwargs: Any) -> TrialLog:
+    return TrialLog(
+        run_name=name,
+        params={"max_depth": 3, "criterion": "gini"},
+        metrics={"accuracy": 0.8, "f1": 0.7},
+        tags={"trial_fingerprint": name},
+        artifacts=[Artifact("model.pkl", name.encode(), "model_pickle")],
+        **kwargs,
+    )
+
+
+def test_logs_each_trial_in_one_batch(tmp_path: Path) -> None:
+    client = FakeClient()
+    logged: list[str] = []
+
+    with AsyncRunLogger("1", tmp_path, client=client, workers=2, max_pending=1) as run_logger:
+        run_logger.submit(_trial("a", on_logged=logged.append))
+        run_logger.submit(_trial("b", run_id="existing", on_logged=logged.append))
+
+    assert sorted(logged) == ["existing", "run-1"]
+    assert run_logger.logged == 2
+
+    batches = [c for c in client.calls if c[0] == "log_batch"]
+    # Tags of a new run go with create_run, an existing run gets them in the batch.
+    assert sorted(batches) == [("log_batch", "existing", 2, 2, 1), ("log_batch", "run-1", 2, 2, 0)]
+    assert ("log_artifact", "run-1", b"a", "model_pickle") in client.calls
+    assert (tmp_path / "existing" / "model.pkl").read_bytes() == b"b"
+    assert [c[2] for c in client.calls if c[0] == "set_terminated"] == ["FINISHED"] * 2
+
+
+def test_reports_failures_after_draining(tmp_path: Path) -> None:
+    client = FakeClient(fail_upload_for="run-1")
+
+    with pytest.raises(RuntimeError, match="1 MLflow run"):
+        with AsyncRunLogger("1", tmp_path, client=client, workers=1) as run_logger:
+            run_logger.submit(_trial("a"))
+            run_logger.submit(_trial("b"))
+
+    assert run_logger.logged == 1
+    assert ("set_terminated", "run-1", "FAILED") in client.calls
+    assert ("set_terminated", "run-2", "FINISHED") in client.calls
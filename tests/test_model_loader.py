@@ -0,0 +1,300 @@
+"""Tests for the local model cache in `ds_git_homework.serving.model_loader`."""
+from __future__ import annotations
+
+import hashlib
+import io
+import pickle
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from ds_git_homework.serving import model_loader
+from ds_git_homework.serving.features import FEATURES
+from ds_git_homework.serving.model_loader import ModelRef
+
+
+class FakeS3:
+    def __init__(self, objects: dict[tuple[str, str], bytes]) -> None:
+        self.objects = objects
+        self.calls: list[str] = []
+
+    def head_object(self, Bucket: str, Key: str) -> dict[str, Any]:
+        self.calls.append("head")
+        body = self.objects[(Bucket, Key)]
+        return {"ETag": f'"{hashlib.md5(body).hexdigest()}"', "ContentLength": len(body)}
+
+    def get_object(self, Bucket: str, Key: str, Range: str, IfMatch: str) -> dict[str, Any]:
+        self.calls.append("get")
+        body = self.objects[(Bucket, Key)]
+        assert IfMatch == f'"{hashlib.md5(body).hexdigest()}"'
+        start, end = map(int, Range.removeprefix("bytes=").split("-"))
+        return {"Body": io.BytesIO(body[start:end + 1])}
+
+
+REF = ModelRef(experiment_name="exp", run_id="run1", artifact_uri="s3://mlflow/artifacts/run1")
+KEY = ("mlflow", "artifacts/run1/model_pickle/model.pkl")
+
+
+@pytest.fixture
+def s3(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> FakeS3:
+    fake = FakeS3({KEY: pickle.dumps({"model": 1})})
+    monkeypatch.setattr(model_loader, "load_s3_config_from_env", lambda: None)
+    monkeypatch.setattr(model_loader, "get_s3_client", lambda cfg: fake)
+    monkeypatch.setenv("SERVE_MODEL_CACHE_DIR", str(tmp_path / "serving"))
+    return fake
+
+
+def test_second_load_skips_download(s3: FakeS3) -> None:
+    assert model_loader.load_model_from_s3(REF) == {"model": 1}
+    assert model_loader.load_model_from_s3(REF) == {"model": 1}
+    assert s3.calls == ["head", "get", "head"]
+
+
+def test_concurrent_loaders_do_not_clobber_each_other(
+    s3: FakeS3, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    both_downloaded = threading.Barrier(2, timeout=5)
+
+    get_object = s3.get_object
+
+    def get_object_then_wait(**kwargs: Any) -> dict[str, Any]:
+        body = io.BytesIO(get_object(**kwargs)["Body"].read())
+        both_downloaded.wait()
+        return {"Body": body}
+
+    monkeypatch.setattr(s3, "get_object", get_object_then_wait)
+    with ThreadPoolExecutor(2) as pool:
+        paths = list(pool.map(lambda _: model_loader._ensure_local_model(REF), range(2)))
+
+    assert paths[0] == paths[1]
+    assert pickle.loads(paths[0].read_bytes()) == {"model": 1}
+    assert not list(paths[0].parent.glob("*.part"))
+
+
+def test_changed_object_is_downloaded_again(s3: FakeS3) -> None:
+    model_loader.load_model_from_s3(REF)
+    s3.objects[KEY] = pickle.dumps({"model": 2})
+
+    assert model_loader.load_model_from_s3(REF) == {"model": 2}
+    assert s3.calls.count("get") == 2
+
+
+def test_corrupted_local_copy_is_replaced(s3: FakeS3, tmp_path: Path) -> None:
+    model_loader.load_model_from_s3(REF)
+    local = tmp_path / "serving" / "run1" / "model.pkl"
+    local.write_bytes(b"x" * local.stat().st_size)
+
+    assert model_loader.load_model_from_s3(REF) == {"model": 1}
+    assert s3.calls.count("get") == 2
+
+
+def test_trusted_run_id_needs_no_s3(s3: FakeS3, monkeypatch: pytest.MonkeyPatch) -> None:
+    model_loader.load_model_from_s3(REF)
+    monkeypatch.setenv("SERVE_MODEL_CACHE_TRUST_RUN_ID", "1")
+    s3.calls.clear()
+
+    assert model_loader.load_model_from_s3(REF) == {"model": 1}
+    assert s3.calls == []
+
+
+def test_old_runs_are_evicted_over_budget(
+    s3: FakeS3, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    old = tmp_path / "serving" / "old_run"
+    old.mkdir(parents=True)
+    (old / "model.pkl").write_bytes(b"x" * 4096)
+    monkeypatch.setenv("SERVE_MODEL_CACHE_MAX_MB", str(1024 / (1024 * 1024)))
+
+    model_loader.load_model_from_s3(REF)
+
+    assert not old.exists()
+    assert (tmp_path / "serving" / "run1" / "model.pkl").exists()
+
+
+def test_compiled_tree_is_cached_next_to_model(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    import numpy as np
+    from sklearn.tree import DecisionTreeClassifier
+
+    from ds_git_homework.serving.compiled_tree import CompiledTree
+
+    X = np.random.default_rng(0).normal(size=(200, 6))
+    model = DecisionTreeClassifier(max_depth=4).fit(X, (X[:, 0] > 0).astype(int))
+    fake = FakeS3({KEY: pickle.dumps(model)})
+    monkeypatch.setattr(model_loader, "load_s3_config_from_env", lambda: None)
+    monkeypatch.setattr(model_loader, "get_s3_client", lambda cfg: fake)
+    monkeypatch.setenv("SERVE_MODEL_CACHE_DIR", str(tmp_path / "serving"))
+
+    first = model_loader.load_serving_model(REF)
+    assert (tmp_path / "serving" / "run1" / "model.compiled.npz").exists()
+
+    monkeypatch.setattr(pickle, "load", lambda f: pytest.fail("unpickled"))
+    second = model_loader.load_serving_model(REF)
+
+    assert isinstance(second, CompiledTree)
+    np.testing.assert_array_equal(second.predict(X), first.predict(X))
+    np.testing.assert_array_equal(second.predict(X), model.predict(X))
+
+
+def test_models_fitted_on_frames_predict_on_arrays_without_warnings(s3: FakeS3) -> None:
+    import warnings
+
+    import numpy as np
+    import pandas as pd
+    from sklearn.linear_model import LogisticRegression
+
+    X = pd.DataFrame(np.random.default_rng(0).normal(size=(100, 6)), columns=FEATURES)
+    model = LogisticRegression().fit(X, (X["Sex"] > 0).astype(int))
+    s3.objects[KEY] = pickle.dumps(model)
+
+    served = model_loader.load_serving_model(REF, compile=False)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        np.testing.assert_array_equal(served.predict(X.to_numpy()), model.predict(X))
+
+    s3.objects[KEY] = pickle.dumps(LogisticRegression().fit(X[FEATURES[::-1]], X["Sex"] > 0))
+    with pytest.raises(ValueError, match="fitted on"):
+        model_loader.load_serving_model(REF, compile=False)
+
+
+def test_manifest_start_skips_mlflow_and_sklearn(tmp_path: Path) -> None:
+    import subprocess
+    import sys
+
+    import numpy as np
+    from sklearn.tree import DecisionTreeClassifier
+
+    X = np.random.default_rng(0).normal(size=(200, 6))
+    model = DecisionTreeClassifier(max_depth=3).fit(X, (X[:, 1] > 0).astype(int))
+    body = pickle.dumps(model)
+    fake = FakeS3({KEY: body})
+
+    # Warm the local cache the way a first start (or an image build) would.
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(model_loader, "load_s3_config_from_env", lambda: None)
+        mp.setattr(model_loader, "get_s3_client", lambda cfg: fake)
+        mp.setenv("SERVE_MODEL_CACHE_DIR", str(tmp_path / "serving"))
+        model_loader.load_serving_model(REF)
+
+    manifest = tmp_path / "manifest.json"
+    model_loader.write_model_manifest(REF, manifest)
+    assert model_loader.load_model_manifest(manifest) == REF
+
+    script = (
+        "import sys\n"
+        "from ds_git_homework.serving import app\n"
+        "app.refresh_model()\n"
+        "assert app.SERVED.run_id == 'run1'\n"
+        "heavy = [m for m in ('sklearn', 'mlflow', 'boto3', 'pandas') if m in sys.modules]\n"
+        "assert not heavy, heavy\n"
+    )
+    env = {
+        "PATH": "/usr/bin:/bin",
+        "SERVE_MODEL_MANIFEST": str(manifest),
+        "SERVE_MODEL_CACHE_TRUST_RUN_ID": "1",
+        "SERVE_MODEL_CACHE_DIR": str(tmp_path / "serving"),
+    }
+    result = subprocess.run(
+        [sys.executable, "-c", script], env=env, capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+    assert "Loaded run run1" in result.stdout
+
+
+def test_registry_evicts_least_recently_used() -> None:
+    loads: list[str] = []
+
+    def load(ref: ModelRef) -> str:
+        loads.append(ref.run_id)
+        return str(ref.run_id)
+
+    refs = [ModelRef("exp", run_id, f"s3://mlflow/{run_id}") for run_id in ("a", "b", "c")]
+    registry = model_loader.ModelRegistry(load, max_bytes=20, size_of=lambda model: 10)
+
+    assert registry.get(refs[0]) == "a"
+    assert registry.get(refs[1]) == "b"
+    assert registry.get(refs[0]) == "a"
+    registry.get(refs[2])
+
+    assert [ref.run_id for ref in registry.loaded()] == ["a", "c"]
+    assert registry.get(refs[1]) == "b"
+    assert loads == ["a", "b", "c", "b"]
+
+    registry.record("a", 0.5)
+    stats = registry.stats()
+    assert (stats["a"].requests, stats["a"].seconds, stats["a"].evictions) == (1, 0.5, 1)
+    assert (stats["b"].loads, stats["b"].evictions) == (2, 1)
+
+
+def test_registry_keys_models_by_run_id() -> None:
+    loads: list[ModelRef] = []
+
+    def load(ref: ModelRef) -> str:
+        loads.append(ref)
+        return str(ref.run_id)
+
+    registry = model_loader.ModelRegistry(load, max_bytes=10**6, size_of=lambda m: 1)
+
+    registry.get(ModelRef("exp", "run1", "s3://mlflow/run1"))
+    registry.get(ModelRef("made-up", "run1", "s3://mlflow/run1"))
+
+    assert len(loads) == 1 and len(registry.loaded()) == 1
+
+
+def test_names_that_escape_the_cache_are_rejected(
+    s3: FakeS3, tmp_path: Path
+) -> None:
+    for name in ("", "../x", "a/b", "a\\b", ".."):
+        with pytest.raises(ValueError):
+            model_loader.check_name(name)
+    assert model_loader.check_name("0123abcd") == "0123abcd"
+
+    with pytest.raises(ValueError):
+        model_loader.load_model_from_s3(ModelRef("exp", "../../x", "s3://mlflow/artifacts/run1"))
+    assert not (tmp_path / "x").exists()
+
+
+def test_run_must_belong_to_the_named_experiment(monkeypatch: pytest.MonkeyPatch) -> None:
+    from types import SimpleNamespace
+
+    import mlflow.tracking
+
+    class FakeClient:
+        def get_run(self, run_id: str) -> Any:
+            uri = f"s3://mlflow/artifacts/{run_id}"
+            info = SimpleNamespace(experiment_id="1", artifact_uri=uri)
+            return SimpleNamespace(info=info)
+
+        def get_experiment(self, experiment_id: str) -> Any:
+            return SimpleNamespace(name="exp")
+
+    monkeypatch.setattr(mlflow.tracking, "MlflowClient", FakeClient)
+
+    assert model_loader.resolve_model_ref(None, "run1") == REF
+    assert model_loader.resolve_model_ref("exp", "run1").experiment_name == "exp"
+    with pytest.raises(LookupError):
+        model_loader.resolve_model_ref("other", "run1")
+
+
+def test_registry_loads_each_model_once_under_concurrency() -> None:
+    started = threading.Event()
+    release = threading.Event()
+    loads: list[str] = []
+
+    def load(ref: ModelRef) -> str:
+        loads.append(ref.run_id)
+        started.set()
+        release.wait(5)
+        return str(ref.run_id)
+
+    registry = model_loader.ModelRegistry(load, max_bytes=100, size_of=lambda model: 1)
+    with ThreadPoolExecutor(4) as pool:
+        futures = [pool.submit(registry.get, REF) for _ in range(4)]
+        started.wait(5)
+        release.set()
+        assert [f.result() for f in futures] == ["run1"] * 4
+    assert loads == ["run1"]
@@ -0,0 +1,245 @@
+"""Tests for the streaming S3-to-S3 transform."""
+from __future__ import annotations
+
+import io
+from pathlib import Path
+from typing import Any
+
+import pytest
+from botocore.response import StreamingBody
+
+from ds_git_homework import pipeline
+from ds_git_homework.processing.transform import add_processed_flag
+from ds_git_homework.s3.client import S3Config
+from ds_git_homework.s3.io import MIN_PART_SIZE, TransferProfile, download_file, upload_stream
+
+RAW = (
+    'PassengerId,Name,Survived\r\n'
+    '1,"Braund, Mr. Owen Harris",0\r\n'
+    '2,"Line\nbreak ""quoted""",1\r\n'
+    '3,Плотников,1\r\n'
+)
+
+
+class FakeS3:
+    def __init__(self) -> None:
+        self.objects: dict[tuple[str, str], bytes] = {}
+        self.uploads: dict[str, list[bytes]] = {}
+        self.aborted: list[str] = []
+
+    def get_object(
+        self, Bucket: str, Key: str, Range: str | None = None, IfMatch: str | None = None
+    ) -> dict[str, Any]:
+        body = self.objects[(Bucket, Key)]
+        if IfMatch is not None and IfMatch != '"etag"':
+            raise RuntimeError("PreconditionFailed")
+        if Range is not None:
+            start, end = map(int, Range.removeprefix("bytes=").split("-"))
+            body = body[start:end + 1]
+        return {"Body": StreamingBody(io.BytesIO(body), len(body))}
+
+    def head_object(self, Bucket: str, Key: str) -> dict[str, Any]:
+        return {"ETag": '"etag"', "ContentLength": len(self.objects[(Bucket, Key)])}
+
+    def put_object(self, Bucket: str, Key: str, Body: bytes) -> None:
+        self.objects[(Bucket, Key)] = Body
+
+    def create_multipart_upload(self, Bucket: str, Key: str) -> dict[str, str]:
+        upload_id = f"upload-{len(self.uploads)}"
+        self.uploads[upload_id] = []
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket: str, Key: str, UploadId: str,
+                    PartNumber: int, Body: bytes) -> dict[str, str]:
+        self.uploads[UploadId].append(Body)
+        return {"ETag": f"etag-{PartNumber}"}
+
+    def complete_multipart_upload(self, Bucket: str, Key: str, UploadId: str,
+                                  MultipartUpload: dict[str, Any]) -> None:
+        assert len(MultipartUpload["Parts"]) == len(self.uploads[UploadId])
+        self.objects[(Bucket, Key)] = b"".join(self.uploads[UploadId])
+
+    def abort_multipart_upload(self, Bucket: str, Key: str, UploadId: str) -> None:
+        self.aborted.append(UploadId)
+
+    def get_paginator(self, name: str) -> Any:
+        objects = self.objects
+
+        class Paginator:
+            def paginate(self, Bucket: str, Prefix: str) -> list[dict[str, Any]]:
+                keys = sorted(k for b, k in objects if b == Bucket and k.startswith(Prefix))
+                return [{"Contents": [{"Key": k} for k in keys]}]
+
+        return Paginator()
+
+
+@pytest.fixture
+def s3(monkeypatch: pytest.MonkeyPatch) -> FakeS3:
+    fake = FakeS3()
+    cfg = S3Config(endpoint_url="http://s3", access_key="a", secret_key="s")
+    monkeypatch.setattr(pipeline, "load_s3_config_from_env", lambda: cfg)
+    monkeypatch.setattr(pipeline, "get_s3_client", lambda cfg: fake)
+    monkeypatch.setenv("S3_BUCKET", "datasets")
+    return fake
+
+
+def test_streaming_pipeline_matches_file_transform(
+    s3: FakeS3, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    s3.objects[("datasets", "raw/titanic.csv")] = RAW.encode("utf-8")
+    monkeypatch.setenv("S3_RAW_KEY", "raw/titanic.csv")
+    monkeypatch.setenv("S3_PROCESSED_KEY", "processed/titanic.csv")
+
+    pipeline.run_pipeline(stream=True)
+
+    raw_path = tmp_path / "raw.csv"
+    raw_path.write_bytes(RAW.encode("utf-8"))
+    add_processed_flag(raw_path, tmp_path / "processed.csv")
+
+    assert s3.objects[("datasets", "processed/titanic.csv")] == (
+        (tmp_path / "processed.csv").read_bytes()
+    )
+
+
+def test_upload_stream_splits_into_parts() -> None:
+    s3 = FakeS3()
+    chunk = b"x" * (1024 * 1024)
+
+    total = upload_stream(s3, "b", "k", (chunk for _ in range(12)), part_size=MIN_PART_SIZE)
+
+    assert total == 12 * len(chunk)
+    sizes = [len(p) for p in s3.uploads["upload-0"]]
+    assert sizes == [MIN_PART_SIZE, MIN_PART_SIZE, 2 * len(chunk)]
+    assert s3.objects[("b", "k")] == chunk * 12
+
+
+def test_upload_stream_aborts_on_error() -> None:
+    s3 = FakeS3()
+
+    def chunks() -> Any:
+        yield b"x" * MIN_PART_SIZE
+        raise RuntimeError("source failed")
+
+    with pytest.raises(RuntimeError):
+        upload_stream(s3, "b", "k", chunks(), part_size=MIN_PART_SIZE)
+
+    assert s3.aborted == ["upload-0"]
+    assert ("b", "k") not in s3.objects
+
+
+def test_many_objects_under_prefix(s3: FakeS3) -> None:
+    for day in ("2024-01-01", "2024-01-02", "2024-01-03"):
+        s3.objects[("datasets", f"raw/{day}/titanic.csv")] = RAW.encode("utf-8")
+    s3.objects[("datasets", "raw/2024-01-02/broken.csv")] = b"\xff\xfe not utf-8"
+
+    results = pipeline.run_pipeline_many(
+        raw_prefix="raw/", processed_prefix="processed", max_workers=4
+    )
+
+    by_key = {r.raw_key: r for r in results}
+    assert len(results) == 4
+    assert by_key["raw/2024-01-02/broken.csv"].error is not None
+    assert by_key["raw/2024-01-03/titanic.csv"].error is None
+    assert by_key["raw/2024-01-03/titanic.csv"].processed_key == (
+        "processed/2024-01-03/titanic.csv"
+    )
+    assert ("datasets", "processed/2024-01-01/titanic.csv") in s3.objects
+
+
+def test_explicit_keys_keep_their_partition(s3: FakeS3) -> None:
+    keys = ["raw/dt=2024-01-01/titanic.csv", "raw/dt=2024-01-02/titanic.csv"]
+    for key in keys:
+        s3.objects[("datasets", key)] = RAW.encode("utf-8")
+
+    results = pipeline.run_pipeline_many(raw_keys=keys, raw_prefix="", max_workers=2)
+
+    assert [r.processed_key for r in results] == [
+        "processed/raw/dt=2024-01-01/titanic.csv",
+        "processed/raw/dt=2024-01-02/titanic.csv",
+    ]
+    assert all(r.error is None for r in results)
+
+
+def test_whole_bucket_listing_skips_outputs_and_markers(s3: FakeS3) -> None:
+    for key in ("titanic.csv", "2024/titanic.csv", "processed/old.csv"):
+        s3.objects[("datasets", key)] = RAW.encode("utf-8")
+    s3.objects[("datasets", "2024/")] = b""
+
+    results = pipeline.run_pipeline_many(raw_prefix="", max_workers=2)
+
+    assert [(r.raw_key, r.processed_key) for r in results] == [
+        ("2024/titanic.csv", "processed/2024/titanic.csv"),
+        ("titanic.csv", "processed/titanic.csv"),
+    ]
+    assert all(r.error is None for r in results)
+    assert ("datasets", "processed/processed/old.csv") not in s3.objects
+
+    with pytest.raises(ValueError, match="overwrite"):
+        pipeline.run_pipeline_many(raw_prefix="", processed_prefix="")
+
+
+def test_processed_key_matches_prefix_at_path_boundary() -> None:
+    assert pipeline.processed_key_for("raw/a.csv", "raw", "processed") == "processed/a.csv"
+    assert pipeline.processed_key_for("rawdata/a.csv", "raw", "processed") == (
+        "processed/rawdata/a.csv"
+    )
+
+
+def test_duplicate_processed_keys_are_rejected(s3: FakeS3) -> None:
+    for key in ("raw/a.csv", "a.csv"):
+        s3.objects[("datasets", key)] = RAW.encode("utf-8")
+
+    # "raw/a.csv" loses its prefix, "a.csv" is outside it: both become processed/a.csv.
+    with pytest.raises(ValueError, match="same processed key"):
+        pipeline.run_pipeline_many(raw_keys=["raw/a.csv", "a.csv"], raw_prefix="raw")
+    assert not any(k.startswith("processed/") for _, k in s3.objects)
+
+
+def test_ranged_parallel_download(tmp_path: Path) -> None:
+    s3 = FakeS3()
+    body = bytes(range(256)) * 41
+    s3.objects[("b", "k")] = body
+    profile = TransferProfile(part_size=1000, max_concurrency=4, threshold=1000)
+
+    stats = download_file(s3, "b", "k", tmp_path / "out.bin", profile=profile)
+
+    assert (tmp_path / "out.bin").read_bytes() == body
+    assert stats.bytes == len(body)
+    assert stats.parts == 11
+    assert "s3://b/k" in str(stats)
+
+    # A changed object fails the download and leaves nothing behind.
+    with pytest.raises(RuntimeError):
+        download_file(s3, "b", "k", tmp_path / "new.bin", profile=profile,
+                      size=len(body), etag="other")
+    assert list(tmp_path.iterdir()) == [tmp_path / "out.bin"]
+
+
+def test_failed_range_cancels_the_rest(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    s3 = FakeS3()
+    s3.objects[("b", "k")] = bytes(10_000)
+    calls: list[str] = []
+
+    def get_object(**kwargs: Any) -> dict[str, Any]:
+        calls.append(kwargs["Range"])
+        raise RuntimeError("connection reset")
+
+    monkeypatch.setattr(s3, "get_object", get_object)
+    profile = TransferProfile(part_size=100, max_concurrency=2, threshold=100)
+
+    with pytest.raises(RuntimeError, match="connection reset"):
+        download_file(s3, "b", "k", tmp_path / "out.bin", profile=profile)
+    assert len(calls) < 100
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_small_download_is_pinned_to_etag(tmp_path: Path) -> None:
+    s3 = FakeS3()
+    s3.objects[("b", "k")] = b"small"
+
+    stats = download_file(s3, "b", "k", tmp_path / "out.bin")
+    assert (tmp_path / "out.bin").read_bytes() == b"small"
+    assert stats.parts == 1
+
+    with pytest.raises(RuntimeError, match="PreconditionFailed"):
+        download_file(s3, "b", "k", tmp_path / "new.bin", size=5, etag="other")
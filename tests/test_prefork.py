@@ -0,0 +1,83 @@
+"""Tests for the pre-fork launcher in `ds_git_homework.serving.prefork`."""
+from __future__ import annotations
+
+import os
+import pickle
+import signal
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import numpy as np
+import pytest
+from sklearn.tree import DecisionTreeClassifier
+
+from ds_git_homework.serving import model_loader
+from tests.test_model_loader import KEY, REF, FakeS3
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port: int = sock.getsockname()[1]
+        return port
+
+
+def _wait_healthy(url: str, proc: subprocess.Popen[str], timeout: float = 20.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        assert proc.poll() is None, proc.communicate()[0]
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    pytest.fail(f"{url} did not become healthy")
+
+
+def test_workers_share_the_model_loaded_by_the_parent(tmp_path: Path) -> None:
+    X = np.random.default_rng(0).normal(size=(200, 6))
+    model = DecisionTreeClassifier(max_depth=3).fit(X, (X[:, 1] > 0).astype(int))
+    fake = FakeS3({KEY: pickle.dumps(model)})
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(model_loader, "load_s3_config_from_env", lambda: None)
+        mp.setattr(model_loader, "get_s3_client", lambda cfg: fake)
+        mp.setenv("SERVE_MODEL_CACHE_DIR", str(tmp_path / "serving"))
+        model_loader.load_serving_model(REF)
+    manifest = tmp_path / "manifest.json"
+    model_loader.write_model_manifest(REF, manifest)
+
+    port = _free_port()
+    env = {
+        **os.environ,
+        "SERVE_MODEL_MANIFEST": str(manifest),
+        "SERVE_MODEL_CACHE_TRUST_RUN_ID": "1",
+        "SERVE_MODEL_CACHE_DIR": str(tmp_path / "serving"),
+    }
+    proc = subprocess.Popen(
+        [
+            sys.executable, "-m", "ds_git_homework.serving.prefork",
+            "--host", "127.0.0.1", "--port", str(port), "--workers", "2",
+            "--log-level", "warning",
+        ],
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+    )
+    try:
+        _wait_healthy(f"http://127.0.0.1:{port}/health", proc)
+        for _ in range(4):
+            assert httpx.get(f"http://127.0.0.1:{port}/health").json()["run_id"] == "run1"
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        output = proc.communicate(timeout=30)[0]
+
+    assert proc.returncode == 0, output
+    assert "Started 2 worker(s)" in output
+    # Loaded once by the parent, not again by each worker.
+    assert output.count("Loaded run run1") == 1
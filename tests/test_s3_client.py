@@ -0,0 +1,99 @@
+"""Tests for `ds_git_homework.s3.client`."""
+from __future__ import annotations
+
+import io
+import os
+from typing import Any, Iterator
+
+import pytest
+from botocore.awsrequest import AWSResponse
+
+from ds_git_homework.s3.client import (
+    S3Config,
+    S3Metrics,
+    get_s3_client,
+    load_s3_config_from_env,
+    make_s3_client,
+)
+
+CFG = S3Config(endpoint_url="http://s3.local", access_key="a", secret_key="s")
+
+
+def test_config_accepts_both_env_names(monkeypatch: pytest.MonkeyPatch) -> None:
+    for name in ("S3_ACCESS_KEY", "S3_SECRET_KEY", "AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("S3_ENDPOINT_URL", "http://minio:9000")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "aws-key")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "aws-secret")
+
+    cfg = load_s3_config_from_env()
+    assert (cfg.access_key, cfg.secret_key) == ("aws-key", "aws-secret")
+    assert cfg.retry_mode == "adaptive"
+
+    monkeypatch.setenv("S3_ACCESS_KEY", "s3-key")
+    assert load_s3_config_from_env().access_key == "s3-key"
+
+    monkeypatch.delenv("AWS_SECRET_ACCESS_KEY")
+    with pytest.raises(KeyError):
+        load_s3_config_from_env()
+
+
+def test_shared_client_per_config() -> None:
+    assert get_s3_client(CFG) is get_s3_client(S3Config("http://s3.local", "a", "s"))
+    assert get_s3_client(CFG) is not get_s3_client(S3Config("http://s3.local", "b", "s"))
+    config = get_s3_client(CFG).meta.config
+    assert config.retries == {"mode": "adaptive", "total_max_attempts": 5}
+    assert config.tcp_keepalive is True
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+def test_forked_child_gets_its_own_client() -> None:
+    parent = get_s3_client(CFG)
+    pid = os.fork()
+    if pid == 0:
+        # Nothing inherited from the parent's cache: a fresh client is made.
+        fresh = get_s3_client.cache_info().currsize == 0 and get_s3_client(CFG) is not parent
+        os._exit(0 if fresh else 1)
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert get_s3_client(CFG) is parent
+
+
+class _Raw:
+    def __init__(self, data: bytes) -> None:
+        self._data = io.BytesIO(data)
+
+    def stream(self, *args: Any, **kwargs: Any) -> Iterator[bytes]:
+        yield self._data.read()
+
+    def read(self, *args: Any, **kwargs: Any) -> bytes:
+        return self._data.read(*args)
+
+
+def test_metrics_record_latency_and_bytes() -> None:
+    metrics = S3Metrics()
+    client = make_s3_client(CFG, metrics=metrics)
+    responses = [
+        (200, {"Content-Length": "5"}, b"12345"),
+        (200, {}, b""),
+        (404, {}, b""),
+    ]
+
+    # Answer requests in place of the network, after botocore's call events.
+    def send(request: Any, **kwargs: Any) -> AWSResponse:
+        status, headers, body = responses.pop(0)
+        return AWSResponse(request.url, status, headers, _Raw(body))
+
+    client.meta.events.register("before-send.s3", send)
+
+    assert client.get_object(Bucket="b", Key="k")["Body"].read() == b"12345"
+    client.put_object(Bucket="b", Key="k", Body=b"abc")
+    with pytest.raises(client.exceptions.ClientError):
+        client.head_object(Bucket="b", Key="k")
+
+    stats = metrics.snapshot()
+    assert stats["GetObject"].calls == 1
+    assert stats["GetObject"].bytes_received == 5
+    assert stats["PutObject"].bytes_sent == 3
+    assert stats["HeadObject"].errors == 1
+    assert "GetObject: 1 calls" in metrics.report()
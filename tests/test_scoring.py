@@ -0,0 +1,114 @@
+"""Tests for `ds_git_homework.scoring` and the `score` command."""
+from __future__ import annotations
+
+import io
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.tree import DecisionTreeClassifier
+from typer.testing import CliRunner
+
+from ds_git_homework import scoring
+from ds_git_homework.cli import app
+from ds_git_homework.serving.features import FEATURES, encode_frame, encode_record
+from ds_git_homework.serving.model_loader import ModelRef, write_model_manifest
+
+REF = ModelRef(experiment_name="exp", run_id="run1", artifact_uri="s3://mlflow/artifacts/run1")
+
+
+def _frame(n: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "PassengerId": np.arange(n),
+        "Pclass": rng.integers(1, 4, n),
+        "Name": "x",
+        "Sex": rng.choice(["male", "female", "Female"], n),
+        "Age": np.where(rng.random(n) < 0.2, np.nan, rng.uniform(1, 80, n)),
+        "SibSp": rng.integers(0, 5, n),
+        "Parch": rng.integers(0, 4, n),
+        "Fare": rng.uniform(5, 300, n),
+    })
+
+
+@pytest.fixture
+def model(monkeypatch: pytest.MonkeyPatch) -> DecisionTreeClassifier:
+    df = _frame(500)
+    X = encode_frame(df)
+    y = ((X[:, 1] == 1) | (df["Pclass"] == 1)).astype(int)
+    fitted = DecisionTreeClassifier(max_depth=4, random_state=0).fit(X, y)
+    monkeypatch.setattr(scoring, "load_serving_model", lambda ref, compile: fitted)
+    return fitted
+
+
+def test_encode_frame_matches_serving_encoding() -> None:
+    df = _frame(20)
+    df.loc[0, "Sex"] = None
+    X = encode_frame(df)
+
+    for i in range(1, len(df)):
+        np.testing.assert_array_equal(X[i], encode_record(df.iloc[i]))
+    assert np.isnan(X[0, FEATURES.index("Sex")])
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_scores_chunks_in_input_order(
+    model: DecisionTreeClassifier, tmp_path: Path, workers: int
+) -> None:
+    df = _frame(1000)
+    df.to_csv(tmp_path / "in.csv", index=False)
+    chunks: list[int] = []
+
+    result = scoring.score_file(
+        REF,
+        str(tmp_path / "in.csv"),
+        str(tmp_path / "out" / "pred.csv"),
+        keep=["PassengerId"],
+        chunk_rows=64,
+        workers=workers,
+        on_chunk=chunks.append,
+    )
+
+    out = pd.read_csv(tmp_path / "out" / "pred.csv")
+    assert result.rows == 1000 and sum(chunks) == 1000 and max(chunks) == 64
+    assert list(out.columns) == ["PassengerId", "prediction"]
+    assert out["PassengerId"].tolist() == df["PassengerId"].tolist()
+    assert out["prediction"].tolist() == model.predict(encode_frame(df)).tolist()
+
+
+class FakeS3:
+    def __init__(self, body: bytes) -> None:
+        self.body = body
+
+    def get_object(self, Bucket: str, Key: str) -> dict[str, Any]:
+        return {"Body": io.BytesIO(self.body)}
+
+
+def test_score_command_reads_from_s3(
+    model: DecisionTreeClassifier, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    df = _frame(300)
+    fake = FakeS3(df.to_csv(index=False).encode())
+    monkeypatch.setattr(scoring, "load_s3_config_from_env", lambda: None)
+    monkeypatch.setattr(scoring, "get_s3_client", lambda cfg: fake)
+    manifest = tmp_path / "manifest.json"
+    write_model_manifest(REF, manifest)
+
+    result = CliRunner().invoke(app, [
+        "score", "s3://datasets/raw/titanic.csv", str(tmp_path / "pred.csv"),
+        "--manifest", str(manifest), "--chunk-rows", "100", "--workers", "1",
+    ])
+
+    assert result.exit_code == 0, result.output
+    assert "Scored 300 rows" in result.output
+    out = pd.read_csv(tmp_path / "pred.csv")
+    assert out["prediction"].tolist() == model.predict(encode_frame(df)).tolist()
+
+
+def test_cli_without_a_command_still_runs_main() -> None:
+    result = CliRunner().invoke(app, [])
+
+    assert result.exit_code == 0, result.output
+    assert "ds_git_homework.cli.main" in result.output
@@ -0,0 +1,319 @@
+"""Tests for the `ds_git_homework.serving.app` endpoints."""
+from __future__ import annotations
+
+import copy
+import json
+from typing import Any, Iterator
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+from sklearn.tree import DecisionTreeClassifier
+
+from ds_git_homework.serving import app as serving_app
+from ds_git_homework.serving.cache import PredictionCache
+from ds_git_homework.serving.features import FEATURES
+from ds_git_homework.serving.model_loader import (
+    ModelRef,
+    ModelRegistry,
+    drop_feature_names,
+    model_nbytes,
+)
+
+ROWS = [
+    {"Pclass": 3, "Sex": "male", "Age": 22, "SibSp": 1, "Parch": 0, "Fare": 7.25},
+    {"Pclass": 1, "Sex": "female", "Age": 38, "SibSp": 1, "Parch": 0, "Fare": 71.28},
+    {"Pclass": 2, "Sex": "Female", "Age": 4, "SibSp": 0, "Parch": 2, "Fare": 16.7},
+]
+
+
+def _fit_model() -> DecisionTreeClassifier:
+    rng = np.random.default_rng(0)
+    n = 300
+    df = pd.DataFrame({
+        "Pclass": rng.integers(1, 4, n),
+        "Sex": rng.integers(0, 2, n).astype(float),
+        "Age": rng.uniform(1, 80, n),
+        "SibSp": rng.integers(0, 5, n),
+        "Parch": rng.integers(0, 4, n),
+        "Fare": rng.uniform(5, 300, n),
+    })
+    y = ((df["Sex"] == 1) | (df["Pclass"] == 1)).astype(int)
+    return DecisionTreeClassifier(max_depth=4, random_state=0).fit(
+        df[FEATURES], y
+    )
+
+
+@pytest.fixture
+def model() -> DecisionTreeClassifier:
+    return _fit_model()
+
+
+@pytest.fixture
+def client(
+    model: DecisionTreeClassifier, monkeypatch: pytest.MonkeyPatch
+) -> Iterator[TestClient]:
+    served = drop_feature_names(copy.deepcopy(model))
+    monkeypatch.setattr(serving_app, "SERVED", serving_app.ServedModel("run-a", served, 0.0))
+    monkeypatch.setattr(serving_app, "CACHE", PredictionCache(max_size=2))
+    # No context manager: startup hooks would try to reach MLflow.
+    yield TestClient(serving_app.app)
+
+
+def _expected(model: Any, rows: list[dict[str, Any]]) -> list[int]:
+    df = pd.DataFrame(rows)
+    df["Sex"] = (df["Sex"].str.lower() != "male").astype(float)
+    return [int(p) for p in model.predict(df[FEATURES])]
+
+
+def test_predict_batch_matches_single_predict(
+    client: TestClient, model: DecisionTreeClassifier
+) -> None:
+    batch = client.post("/predict_batch", json={"rows": ROWS})
+    assert batch.status_code == 200
+    assert batch.json()["predictions"] == _expected(model, ROWS)
+
+    singles = [client.post("/predict", json=row).json()["prediction"] for row in ROWS]
+    assert singles == batch.json()["predictions"]
+
+
+def test_predict_batch_empty(client: TestClient) -> None:
+    response = client.post("/predict_batch", json={"rows": []})
+    assert response.status_code == 200
+    assert response.json() == {"predictions": []}
+
+
+def test_predict_batch_too_large(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(serving_app, "MAX_BATCH_SIZE", 2)
+    response = client.post("/predict_batch", json={"rows": ROWS})
+    assert response.status_code == 413
+
+
+def test_repeated_rows_are_served_from_cache(
+    client: TestClient, model: DecisionTreeClassifier
+) -> None:
+    expected = _expected(model, ROWS)
+
+    assert client.post("/predict", json=ROWS[0]).json()["prediction"] == expected[0]
+    assert client.post("/predict", json=ROWS[0]).json()["prediction"] == expected[0]
+    assert client.post("/predict_batch", json={"rows": ROWS}).json()["predictions"] == expected
+
+    cache = client.get("/health").json()["cache"]
+    assert cache["hits"] == 2
+    assert cache["misses"] == 3
+    assert cache["evictions"] == 1
+    assert cache["size"] == 2
+
+
+def test_refresh_swaps_in_new_run(
+    client: TestClient, model: DecisionTreeClassifier,
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Any,
+) -> None:
+    loaded: list[str] = []
+
+    def fake_load(model_ref: Any) -> DecisionTreeClassifier:
+        loaded.append(model_ref.run_id)
+        return drop_feature_names(copy.deepcopy(model))
+
+    monkeypatch.setattr(serving_app, "resolve_model_ref", lambda experiment_name, run_id: (
+        ModelRef(experiment_name, run_id, f"s3://mlflow/{run_id}")
+    ))
+    monkeypatch.setattr(serving_app, "load_serving_model", lambda ref, compile: fake_load(ref))
+    run_id_file = tmp_path / "run_id"
+    monkeypatch.setenv("SERVE_RUN_ID_FILE", str(run_id_file))
+
+    run_id_file.write_text("run-a\n")
+    assert serving_app.refresh_model() is False
+
+    run_id_file.write_text("run-b\n")
+    assert serving_app.refresh_model() is True
+    assert loaded == ["run-b"]
+
+    assert client.get("/health").json()["run_id"] == "run-b"
+    assert client.post("/predict", json=ROWS[0]).json()["prediction"] == _expected(model, ROWS)[0]
+
+
+def test_refresh_keeps_pinned_routes_and_follows_best_runs(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch, tmp_path: Any
+) -> None:
+    best = {"exp": "run-a"}
+    monkeypatch.setattr(serving_app, "resolve_model_ref", lambda experiment_name, run_id: (
+        ModelRef(experiment_name, run_id, f"s3://mlflow/{run_id}")
+    ))
+    monkeypatch.setattr(serving_app, "get_best_run_id", lambda name, metric: best[name])
+    monkeypatch.setattr(serving_app, "ROUTES", {})
+    run_id_file = tmp_path / "run_id"
+    run_id_file.write_text("run-a\n")
+    monkeypatch.setenv("SERVE_RUN_ID_FILE", str(run_id_file))
+
+    pinned = serving_app._resolve_route(("exp", "run-x"))
+    assert serving_app._resolve_route(("exp", None)).run_id == "run-a"
+
+    assert serving_app.refresh_model() is False
+    assert serving_app.refresh_routes() == []
+    assert serving_app.ROUTES[("exp", "run-x")] is pinned
+
+    best["exp"] = "run-b"
+    assert serving_app.refresh_routes() == [("exp", "run-b")]
+    assert serving_app.ROUTES == {
+        ("exp", "run-x"): pinned,
+        ("exp", None): ModelRef("exp", "run-b", "s3://mlflow/run-b"),
+    }
+
+
+def test_metrics_endpoint_reports_stages(client: TestClient) -> None:
+    client.post("/predict", json=ROWS[0])
+    client.post("/predict_batch", json={"rows": ROWS})
+    client.post("/predict", json={"Pclass": "not a number"})
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+
+    assert 'http_requests_total{path="/predict",status="200"}' in text
+    assert 'http_requests_total{path="/predict",status="422"}' in text
+    assert 'model_info{run_id="run-a"} 1' in text
+    assert 'prediction_cache_events_total{event="miss"}' in text
+    for stage in ("parse", "encode", "predict", "serialize"):
+        labels = f'path="/predict_batch",stage="{stage}"'
+        assert f"predict_stage_duration_seconds_count{{{labels}}}" in text
+    assert 'http_request_duration_seconds_bucket{path="/predict",le="+Inf"}' in text
+
+
+def test_requests_are_routed_to_registry_models(
+    client: TestClient, model: DecisionTreeClassifier, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # run-b always predicts 1, whatever the row.
+    other = DecisionTreeClassifier().fit(np.zeros((2, len(FEATURES))), [1, 1])
+    loaded: list[str] = []
+
+    def fake_load(model_ref: Any, compile: bool) -> DecisionTreeClassifier:
+        loaded.append(model_ref.run_id)
+        return other
+
+    monkeypatch.setattr(serving_app, "resolve_model_ref", lambda experiment_name, run_id: (
+        ModelRef(experiment_name, run_id, f"s3://mlflow/{run_id}")
+    ))
+    monkeypatch.setattr(serving_app, "load_serving_model", fake_load)
+    monkeypatch.setattr(serving_app, "ROUTES", {})
+    monkeypatch.setattr(serving_app, "MODELS", ModelRegistry(
+        serving_app._load_routed_model, max_bytes=10**9,
+        size_of=lambda served: model_nbytes(served.model),
+    ))
+
+    male = ROWS[0]
+    assert _expected(model, [male]) == [0]
+    assert client.post("/predict", json=male).json()["prediction"] == 0
+    assert client.post("/predict?run_id=run-b", json=male).json()["prediction"] == 1
+    batch = client.post("/predict_batch?run_id=run-b", json={"rows": ROWS})
+    assert batch.json()["predictions"] == [1, 1, 1]
+    assert client.post("/predict?run_id=run-a", json=male).json()["prediction"] == 0
+    assert loaded == ["run-b"]
+
+    # A weighted split sends each route_key to the same run every time.
+    monkeypatch.setattr(serving_app, "AB_SPLIT", serving_app._parse_split("run-a=1,run-b=1"))
+    first = {
+        key: client.post(f"/predict?route_key={key}", json=male).json()["prediction"]
+        for key in map(str, range(20))
+    }
+    again = {
+        key: client.post(f"/predict?route_key={key}", json=male).json()["prediction"]
+        for key in map(str, range(20))
+    }
+    assert first == again
+    assert set(first.values()) == {0, 1}
+
+    assert client.get("/health").json()["models"] == ["run-b"]
+    text = client.get("/metrics").text
+    assert 'model_requests_total{run_id="run-b"}' in text
+    assert 'model_registry_loads_total{run_id="run-b"} 1' in text
+    assert 'model_registry_resident_bytes{run_id="run-b"}' in text
+
+
+def test_routes_are_checked_and_bounded(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch, tmp_path: Any
+) -> None:
+    experiments = {"run-b": "exp", "run-c": "exp", "run-d": "other"}
+
+    def resolve(experiment_name: str | None, run_id: str) -> ModelRef:
+        if experiment_name not in (None, experiments[run_id]):
+            raise LookupError(f"Run {run_id} is not in experiment '{experiment_name}'")
+        return ModelRef(experiments[run_id], run_id, f"s3://mlflow/{run_id}")
+
+    monkeypatch.setattr(serving_app, "resolve_model_ref", resolve)
+    monkeypatch.setattr(serving_app, "ROUTES", {})
+    monkeypatch.setattr(serving_app, "MAX_ROUTES", 2)
+    monkeypatch.setenv("SERVE_MODEL_CACHE_DIR", str(tmp_path / "serving"))
+
+    for query in ("experiment=../../somewhere&run_id=run-b", "run_id=../run-b"):
+        assert client.post(f"/predict?{query}", json=ROWS[0]).status_code == 404
+    assert client.post("/predict?experiment=exp&run_id=run-d", json=ROWS[0]).status_code == 404
+    assert serving_app.ROUTES == {}
+    assert not (tmp_path / "somewhere").exists()
+
+    for route in (("exp", "run-b"), (None, "run-c"), (None, "run-d")):
+        serving_app._resolve_route(route)
+    assert list(serving_app.ROUTES) == [(None, "run-c"), (None, "run-d")]
+    assert serving_app.ROUTES[(None, "run-d")].experiment_name == "other"
+
+
+def test_predict_stream_ndjson_and_binary(
+    client: TestClient, model: DecisionTreeClassifier, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(serving_app, "STREAM_CHUNK_ROWS", 2)
+    rows = ROWS * 3
+    expected = _expected(model, rows)
+
+    # Objects and pre-encoded arrays can be mixed; blank lines are skipped.
+    lines = [json.dumps(row) for row in rows[:-1]]
+    lines += ["", json.dumps(list(serving_app.encode_row(serving_app.PredictRequest(**rows[-1]))))]
+    response = client.post(
+        "/predict_stream",
+        content="\n".join(lines).encode(),
+        headers={"content-type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [int(line) for line in response.text.splitlines()] == expected
+
+    X = serving_app.encode_rows([serving_app.PredictRequest(**row) for row in rows])
+    response = client.post(
+        "/predict_stream",
+        content=X.astype("<f4").tobytes(),
+        headers={"content-type": "application/octet-stream"},
+    )
+    assert response.status_code == 200
+    assert np.frombuffer(response.content, dtype="<i4").tolist() == expected
+
+
+def test_predict_stream_rejects_bad_bodies(client: TestClient) -> None:
+    response = client.post(
+        "/predict_stream", content=b"\0" * 10, headers={"content-type": "application/octet-stream"}
+    )
+    assert response.status_code == 400
+    assert "whole number of rows" in response.json()["detail"]
+
+    response = client.post(
+        "/predict_stream",
+        content=b'{"Pclass": 1}\n',
+        headers={"content-type": "application/x-ndjson"},
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Line 1")
+
+    def no_newline() -> Iterator[bytes]:
+        for _ in range(1000):
+            yield b" " * 1024
+
+    response = client.post(
+        "/predict_stream", content=no_newline(), headers={"content-type": "application/x-ndjson"}
+    )
+    assert response.status_code == 400
+    assert "longer than" in response.json()["detail"]
+
+    response = client.post("/predict_stream", json=ROWS[0])
+    assert response.status_code == 415
@@ -0,0 +1,162 @@
+"""Tests for the training helpers in `ds_git_homework.experiments`."""
+from __future__ import annotations
+
+import pickle
+import shutil
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ds_git_homework.experiments.dataset_cache import (
+    build_column_cache,
+    is_cached,
+    load_columns,
+    stratified_folds,
+)
+from ds_git_homework.experiments import parallel
+from ds_git_homework.experiments.halving import halving_schedule, successive_halving
+from ds_git_homework.experiments.train import _iterate_param_grid, _run_cv, _run_trials
+from ds_git_homework.experiments.trial_index import TrialIndex, trial_fingerprint
+
+
+@pytest.fixture
+def data() -> dict[str, np.ndarray]:
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(400, 6))
+    y = (X[:, 0] + X[:, 1] + rng.normal(0, 0.5, 400) > 0).astype(int)
+    return {"X_train": X[:300], "y_train": y[:300], "X_test": X[300:], "y_test": y[300:]}
+
+
+def test_shared_arrays_fall_back_when_shm_is_small(
+    data: dict[str, np.ndarray], tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.delenv("TRAIN_SHARED_DIR", raising=False)
+    monkeypatch.setattr(shutil, "disk_usage", lambda path: SimpleNamespace(free=0))
+    with parallel.SharedArrays(data) as shared:
+        assert not shared.paths["X_train"].startswith("/dev/shm/")
+        loaded = parallel.load_shared_arrays(shared.paths)
+        np.testing.assert_array_equal(loaded["X_train"], data["X_train"])
+
+    monkeypatch.setenv("TRAIN_SHARED_DIR", str(tmp_path))
+    with parallel.SharedArrays(data) as shared:
+        assert Path(shared.paths["X_train"]).parent.parent == tmp_path
+
+
+def test_parallel_grid_matches_serial(data: dict[str, np.ndarray]) -> None:
+    grid = _iterate_param_grid({"max_depth": [2, 4, None], "criterion": ["gini", "entropy"]})
+
+    serial = list(_run_trials(grid, 42, data, workers=1))
+    parallel = list(_run_trials(grid, 42, data, workers=2))
+
+    assert [r.params for r in parallel] == grid
+    assert [r.metrics for r in parallel] == [r.metrics for r in serial]
+
+    model = pickle.loads(parallel[0].model_bytes)
+    np.testing.assert_array_equal(
+        model.predict(data["X_test"]),
+        pickle.loads(serial[0].model_bytes).predict(data["X_test"]),
+    )
+
+
+def test_column_cache_round_trip(tmp_path: Path) -> None:
+    csv_path = tmp_path / "titanic.csv"
+    pd.DataFrame({
+        "Name": ["a", "b", "c"],
+        "Sex": ["male", "female", "male"],
+        "Age": [22.0, None, 4.0],
+        "Survived": [0, 1, 1],
+    }).to_csv(csv_path, index=False)
+
+    cache_dir = tmp_path / "cache" / "fingerprint"
+    assert not is_cached(cache_dir)
+    build_column_cache(csv_path, cache_dir)
+    assert is_cached(cache_dir)
+
+    columns = load_columns(cache_dir, ["Sex", "Age"])
+    assert set(columns) == {"Sex", "Age"}
+    assert isinstance(columns["Age"], np.memmap)
+    np.testing.assert_array_equal(columns["Sex"], [0.0, 1.0, 0.0])
+    np.testing.assert_array_equal(columns["Age"], [22.0, np.nan, 4.0])
+
+    with pytest.raises(KeyError):
+        load_columns(cache_dir, ["Name"])
+
+
+def test_trial_fingerprint_and_index(tmp_path: Path) -> None:
+    split = {"test_size": 0.2, "random_state": 42, "stratify": True}
+    features = ["Pclass", "Sex"]
+
+    fp = trial_fingerprint("data-v1", split, features, "Survived", "tree", {"max_depth": 3})
+    assert fp == trial_fingerprint(
+        "data-v1", dict(reversed(split.items())), features, "Survived", "tree", {"max_depth": 3}
+    )
+    assert fp != trial_fingerprint(
+        "data-v2", split, features, "Survived", "tree", {"max_depth": 3}
+    )
+    assert fp != trial_fingerprint(
+        "data-v1", split, features, "Survived", "tree", {"max_depth": 5}
+    )
+
+    index = TrialIndex(tmp_path / "trials")
+    assert index.fingerprints() == set()
+    assert index.get(fp) is None
+
+    index.record(fp, "run-1", {"max_depth": 3}, {"accuracy": 0.8})
+    assert index.fingerprints() == {fp}
+    assert index.get(fp) == {
+        "run_id": "run-1", "params": {"max_depth": 3}, "metrics": {"accuracy": 0.8}
+    }
+
+
+def test_halving_schedule() -> None:
+    # 12 -> 4 -> 2 candidates in two rounds on n/9 and n/3 rows.
+    assert halving_schedule(12, 900, factor=3, finalists=2, min_samples=10) == [100, 300]
+    assert halving_schedule(12, 900, factor=3, finalists=2, min_samples=200) == [200, 300]
+    assert halving_schedule(2, 900, factor=3, finalists=2) == []
+
+
+def test_successive_halving_keeps_best(data: dict[str, np.ndarray]) -> None:
+    grid = _iterate_param_grid({"max_depth": [1, 2, 3, 4, 5, 6]})
+    sizes: list[int] = []
+
+    def run_trials(
+        combos: list[dict[str, Any]], round_data: dict[str, np.ndarray]
+    ) -> list[tuple[dict[str, Any], dict[str, float]]]:
+        sizes.append(len(round_data["y_train"]))
+        # Deeper is better, so the survivors are known in advance.
+        return [(p, {"roc_auc": float(p["max_depth"])}) for p in combos]
+
+    rounds: list[tuple[int, int]] = []
+    finalists = successive_halving(
+        grid, data, run_trials, random_state=0, factor=2, finalists=1, min_samples=10,
+        on_round=lambda i, n, scores, kept: rounds.append((len(scores), len(kept))),
+    )
+
+    assert finalists == [{"max_depth": 6}]
+    assert rounds == [(6, 3), (3, 2), (2, 1)]
+    assert sizes == [37, 75, 150]
+
+
+def test_cross_validation_with_cached_folds(
+    data: dict[str, np.ndarray], tmp_path: Path
+) -> None:
+    y = data["y_train"]
+    folds = stratified_folds(tmp_path, y, 3, 0, split_key="ts0.2_rs0")
+    assert sorted(set(folds.tolist())) == [0, 1, 2]
+    assert list(tmp_path.glob("folds_*.npy"))
+    np.testing.assert_array_equal(stratified_folds(tmp_path, y, 3, 1, "ts0.2_rs0"), folds)
+
+    grid = _iterate_param_grid({"max_depth": [2, 4]})
+    cv_data = {"X_train": data["X_train"], "y_train": y, "folds": folds}
+    serial = _run_cv(grid, 42, cv_data, 3, workers=1)
+    parallel = _run_cv(grid, 42, cv_data, 3, workers=2)
+
+    assert parallel == serial
+    assert set(serial[0]) == {
+        f"cv_{m}_{s}" for m in ("accuracy", "f1", "roc_auc") for s in ("mean", "std")
+    }
+    assert 0.5 < serial[0]["cv_accuracy_mean"] <= 1.0